@@ -0,0 +1,120 @@
+"""Tabelas agregadas dos avisos do DETER.
+
+Os avisos brutos chegam aos milhões; o dashboard só consulta estas tabelas,
+montadas durante a ingestão (`get_data_amz.py`):
+
+- `dia_uf_classe`: área e número de avisos por dia × UF × classe;
+- `mes_municipio_classe`: área e número de avisos por mês × município × classe.
+
+A área somada é `areamunkm`, conforme recomendado no dicionário de dados.
+"""
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from armazenamento import compartilhar_categorias, reduzir_inteiros
+
+CHAVES_AGREGADOS = {
+    'dia_uf_classe': ['view_date', 'uf', 'classname'],
+    'mes_municipio_classe': ['mes', 'uf', 'municipality', 'geocodibge', 'classname'],
+}
+
+
+def caminho_agregado(destino, nome):
+    """Arquivo Parquet de um agregado dentro do diretório do DETER"""
+    return Path(destino) / 'agregados' / f'{nome}.parquet'
+
+
+def agregar_alertas(alertas):
+    """Agrega um lote de avisos normalizados em cada tabela de CHAVES_AGREGADOS"""
+    alertas = alertas.assign(
+        view_date=pd.to_datetime(alertas['view_date']),
+        classname=alertas['classname'].astype(str),
+        uf=alertas['uf'].astype(str),
+        municipality=alertas['municipality'].astype(str)
+    )
+    alertas['mes'] = alertas['view_date'].dt.to_period('M').dt.to_timestamp()
+
+    agregados = {}
+    for nome, chaves in CHAVES_AGREGADOS.items():
+        agregados[nome] = (
+            alertas.groupby(chaves, dropna=False, sort=False)
+            .agg(area_km2=('areamunkm', 'sum'), avisos=('fid', 'size'))
+            .reset_index()
+        )
+    return agregados
+
+
+def mesclar_agregados(*partes):
+    """Soma agregados parciais (de lotes ou de execuções diferentes)"""
+    mesclados = {}
+    for nome, chaves in CHAVES_AGREGADOS.items():
+        frames = [parte[nome][chaves + ['area_km2', 'avisos']]
+                  for parte in partes if parte and nome in parte]
+        if not frames:
+            continue
+        mesclados[nome] = (
+            pd.concat(frames, ignore_index=True)
+            .groupby(chaves, dropna=False, sort=True)[['area_km2', 'avisos']]
+            .sum()
+            .reset_index()
+        )
+        mesclados[nome]['area_km2'] = mesclados[nome]['area_km2'].astype('float32')
+    return mesclados
+
+
+def carregar_agregados(destino):
+    """Agregados gravados em `destino`, prontos para consulta
+
+    Colunas de texto viram categóricas (com o dicionário de termos comum,
+    ver `armazenamento.compartilhar_categorias`), contagens cabem em int32 e
+    o agregado diário ganha a coluna `mes`, usada nas séries mensais.
+    """
+    agregados = {}
+    for nome in CHAVES_AGREGADOS:
+        caminho = caminho_agregado(destino, nome)
+        if caminho.exists():
+            df = pd.read_parquet(caminho)
+            for coluna in ('uf', 'classname', 'municipality'):
+                if coluna in df.columns:
+                    df[coluna] = df[coluna].astype('category')
+            if 'view_date' in df.columns:
+                df['mes'] = df['view_date'].dt.to_period('M').dt.to_timestamp()
+            agregados[nome] = reduzir_inteiros(df)
+    if agregados:
+        compartilhar_categorias(*agregados.values())
+    return agregados
+
+
+def gravar_agregados(destino, agregados):
+    """Grava os agregados de forma atômica (leitores veem a versão anterior ou a nova)"""
+    for nome, df in agregados.items():
+        caminho = caminho_agregado(destino, nome)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_suffix('.parquet.tmp')
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, caminho)
+
+
+def reconstruir_agregados(destino, tamanho_lote=500_000):
+    """Recalcula os agregados a partir de todos os avisos gravados em `destino`"""
+    # Só a reconstrução lê o dataset; o dashboard não paga esta importação
+    import pyarrow.dataset as ds
+
+    alertas = ds.dataset(Path(destino) / 'alertas', format='parquet', partitioning='hive')
+    colunas = ['fid', 'view_date', 'uf', 'classname', 'municipality', 'geocodibge', 'areamunkm']
+    agregados = {}
+    for lote in alertas.to_batches(columns=colunas, batch_size=tamanho_lote):
+        agregados = mesclar_agregados(agregados, agregar_alertas(lote.to_pandas()))
+    gravar_agregados(destino, agregados)
+    return agregados
+
+
+def filtrar_periodo(df, coluna_data, ano_inicio, ano_fim, ufs=None):
+    """Linhas de um agregado no intervalo de anos e (opcionalmente) nas UFs dadas"""
+    anos = df[coluna_data].dt.year
+    mascara = (anos >= ano_inicio) & (anos <= ano_fim)
+    if ufs:
+        mascara &= df['uf'].isin(ufs)
+    return df[mascara]
@@ -0,0 +1,375 @@
+"""API HTTP somente leitura com os agregados do dashboard, sem o Streamlit.
+
+Serviço Starlette (executado pelo uvicorn) que reutiliza os loaders e as
+funções de processamento de `dashboard_ambiental.py`, importado fora do
+`streamlit run` como em `relatorio.py`, e devolve os mesmos números dos
+`st.metric` da página: emissões por ano e categoria, PRODES por estado (ou
+município) numa janela de anos, eficiência industrial num conjunto de anos
+e os totais da agricultura familiar.
+
+Cada resposta traz `versao` (dos arquivos de `tratado/`), `indicadores` e
+`dados` (a tabela, em registros), em JSON ou, com `?formato=arrow` ou
+`Accept: application/vnd.apache.arrow.stream`, como stream IPC do Arrow (os
+indicadores vão nos metadados do schema). As respostas ficam num cache LRU
+em memória, já serializadas e comprimidas com gzip, indexadas pela rota,
+pelos parâmetros, pelo formato e pela versão dos dados: uma requisição
+repetida não recalcula nem recomprime nada. O ETag deriva da mesma chave,
+então `If-None-Match` é respondido com 304 sem consultar o cache; trocar um
+CSV de `tratado/` muda a versão e, com ela, o ETag.
+
+Uso:
+    python api_dados.py [--host 127.0.0.1] [--porta 8502]
+    curl -s 'http://127.0.0.1:8502/emissoes?ano=2022'
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+import pandas as pd
+import pyarrow as pa
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from armazenamento import ErroEsquema
+from correlacoes import MINIMO_ANOS
+from instrumentacao import INSTRUMENTACAO
+from relatorio import importar_dashboard
+
+TIPO_JSON = 'application/json'
+TIPO_ARROW = 'application/vnd.apache.arrow.stream'
+
+# Muda quando o formato das respostas muda (invalida os ETags já emitidos)
+VERSAO_RESPOSTAS = 1
+
+# Respostas menores que isto não são comprimidas
+TAMANHO_MINIMO_GZIP = 1024
+
+# Módulo do dashboard (importado no início do serviço)
+_dashboard = None
+
+# As consultas compartilham estado do dashboard (ex.: a tabela incremental de
+# eficiência): as falhas do cache são calculadas uma de cada vez
+_trava_calculo = threading.Lock()
+
+
+class ErroParametro(ValueError):
+    """Parâmetro de consulta ausente ou inválido (resposta 400)"""
+
+
+def ler_inteiro(parametros, nome, padrao=None):
+    """Parâmetro inteiro da query string"""
+    valor = parametros.get(nome)
+    if valor is None or valor == '':
+        return padrao
+    try:
+        return int(valor)
+    except ValueError:
+        raise ErroParametro(f"'{nome}' deve ser um inteiro: '{valor}'") from None
+
+
+def ler_lista(parametros, nome):
+    """Parâmetro com valores separados por vírgula"""
+    return [item.strip() for item in parametros.get(nome, '').split(',') if item.strip()]
+
+
+def ler_anos(parametros, nome, disponiveis, padrao):
+    """Lista de anos da query string, restrita aos `disponiveis`"""
+    try:
+        anos = sorted({int(ano) for ano in ler_lista(parametros, nome)}) or padrao
+    except ValueError:
+        raise ErroParametro(f"'{nome}' deve ser uma lista de anos separados por vírgula") from None
+    ausentes = sorted(set(anos) - set(disponiveis))
+    if ausentes:
+        raise ErroParametro(f"Anos sem dados: {ausentes} (disponíveis: {disponiveis[0]}-{disponiveis[-1]})")
+    return anos
+
+
+def ler_janela(parametros, anos):
+    """(inicio, fim) da query string dentro dos `anos`; o padrão são os dez últimos, como no heatmap"""
+    inicio = ler_inteiro(parametros, 'inicio', anos[-10] if len(anos) >= 10 else anos[0])
+    fim = ler_inteiro(parametros, 'fim', anos[-1])
+    if inicio > fim:
+        raise ErroParametro(f"'inicio' ({inicio}) depois de 'fim' ({fim})")
+    if inicio < anos[0] or fim > anos[-1]:
+        raise ErroParametro(f"Janela {inicio}-{fim} fora dos anos com dados ({anos[0]}-{anos[-1]})")
+    return inicio, fim
+
+
+def ler_ufs(parametros, disponiveis):
+    """Lista de UFs da query string, restrita às `disponiveis`"""
+    ufs = ler_lista(parametros, 'ufs')
+    desconhecidas = sorted(set(ufs) - set(disponiveis))
+    if desconhecidas:
+        raise ErroParametro(f"UFs sem dados: {desconhecidas} (disponíveis: {sorted(set(disponiveis))})")
+    return ufs
+
+
+def nativo(valor):
+    """Converte escalares do numpy para tipos do Python (NaN vira None) para o JSON"""
+    if isinstance(valor, dict):
+        return {chave: nativo(item) for chave, item in valor.items()}
+    if hasattr(valor, 'item'):
+        valor = valor.item()
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    return valor
+
+
+def consultar_emissoes(d, parametros):
+    """Emissões por categoria num ano (com total e maior emissor) ou de todos os anos"""
+    tabela = parametros.get('tabela', 'brutas')
+    if tabela not in d.TABELAS_SEEG:
+        raise ErroParametro(f"'tabela' deve ser uma de {list(d.TABELAS_SEEG)}")
+    cubo = d.load_cubo_emissoes()
+    anos = cubo.anos_disponiveis(tabela)
+    ano = ler_inteiro(parametros, 'ano')
+    if ano is None:
+        return cubo.long(tabela), {'anos': anos}
+    if ano not in anos:
+        raise ErroParametro(f"Ano sem dados em '{tabela}': {ano} (disponíveis: {anos[0]}-{anos[-1]})")
+    return cubo.fatia_ano(ano, tabela), d.indicadores_emissoes(cubo, ano, tabela)
+
+
+def consultar_prodes(d, parametros):
+    """Área desmatada por estado (ou município) numa janela de anos, da maior para a menor"""
+    nivel = parametros.get('nivel', 'Estado')
+    if nivel not in d.niveis_prodes():
+        raise ErroParametro(f"'nivel' deve ser um de {d.niveis_prodes()}")
+    matriz = d.load_matriz_prodes(nivel)
+    inicio, fim = ler_janela(parametros, [int(ano) for ano in matriz.anos])
+    ufs = ler_ufs(parametros, matriz.ufs)
+    n = ler_inteiro(parametros, 'n', matriz.n_locais)
+    if n < 1:
+        raise ErroParametro(f"'n' deve ser pelo menos 1: {n}")
+    ranking = matriz.ranking(inicio, fim, ufs, n)
+    indicadores = {'inicio': inicio, 'fim': fim, **d.indicadores_desmatamento(d.load_motor_tendencias('Estado'))}
+    return ranking, indicadores
+
+
+def consultar_tendencias(d, parametros):
+    """Média móvel, variação anual, z-score e tendência de cada estado (ou município) no ano final"""
+    nivel = parametros.get('nivel', 'Estado')
+    if nivel not in d.niveis_prodes():
+        raise ErroParametro(f"'nivel' deve ser um de {d.niveis_prodes()}")
+    motor = d.load_motor_tendencias(nivel)
+    anos = [int(ano) for ano in motor.periodos]
+    inicio, fim = ler_janela(parametros, anos)
+    matriz = d.load_matriz_prodes(nivel)
+    ufs = ler_ufs(parametros, matriz.ufs)
+    janela = ler_inteiro(parametros, 'janela', 5)
+    if not 2 <= janela < len(anos):
+        raise ErroParametro(f"'janela' deve estar entre 2 e {len(anos) - 1}")
+    resumo = d.resumo_tendencias(motor, matriz, inicio, fim, janela, ufs)
+    return resumo, {'inicio': inicio, 'fim': fim, 'janela': janela, 'limiar_anomalia': d.LIMIAR_ANOMALIA,
+                    'anomalias': int(resumo['Anomalia'].sum())}
+
+
+def consultar_correlacoes(d, parametros):
+    """Pares (local do PRODES, série do SEEG, defasagem) com maior |correlação|, com a elasticidade"""
+    motor = d.load_motor_correlacoes()
+    defasagem_min = ler_inteiro(parametros, 'defasagem_min', d.DEFASAGENS_PADRAO[0])
+    defasagem_max = ler_inteiro(parametros, 'defasagem_max', d.DEFASAGENS_PADRAO[1])
+    if not 0 <= defasagem_min <= defasagem_max <= d.DEFASAGEM_MAXIMA:
+        raise ErroParametro(f"As defasagens devem satisfazer 0 <= defasagem_min <= defasagem_max <= {d.DEFASAGEM_MAXIMA}")
+    locais, tabelas = ler_lista(parametros, 'locais'), ler_lista(parametros, 'tabelas')
+    desconhecidos = sorted(set(locais) - set(motor.locais)) + sorted(set(tabelas) - set(motor.tabelas))
+    if desconhecidos:
+        raise ErroParametro(f"Locais ou tabelas sem dados: {desconhecidos}")
+    n = ler_inteiro(parametros, 'n', 50)
+    ranking = motor.ranking(defasagem_min, defasagem_max, locais, tabelas, n)
+    return ranking, {'defasagem_min': defasagem_min, 'defasagem_max': defasagem_max, 'minimo_anos': MINIMO_ANOS}
+
+
+def consultar_eficiencia(d, parametros):
+    """Receita, emissões e eficiência de cada ano do conjunto pedido"""
+    tabela = d.compute_eficiencia_anual()
+    disponiveis = [int(ano) for ano in tabela.index]
+    anos = ler_anos(parametros, 'anos', disponiveis, disponiveis[-3:])
+    dados = tabela.loc[anos].reset_index()
+    return dados, {'anos': anos, 'eficiencia_media': dados['Eficiencia'].mean()}
+
+
+def consultar_setores(d, parametros):
+    """Receita, empresas, emissões e eficiência de cada atividade industrial nos anos pedidos"""
+    industria = d.load_industria_data()
+    disponiveis = sorted(int(ano) for ano in industria['Ano'].unique())
+    anos = ler_anos(parametros, 'anos', disponiveis, disponiveis[-3:])
+    metricas, _ = d.compute_metricas_industriais(industria, d.load_cubo_emissoes().long('brutas'), anos)
+    return metricas, {'anos': anos, 'sem_setor_emissao': d.load_atividades_sem_setor()}
+
+
+def consultar_agricultura(d, parametros):
+    """Estabelecimentos familiares e não familiares por região num ano do censo"""
+    ano = ler_inteiro(parametros, 'ano', 2017)
+    combined_ag, familiar_df = d.load_agricultura_processada()
+    if ano not in set(familiar_df['Ano']):
+        raise ErroParametro(f"'ano' deve ser um de {sorted(set(familiar_df['Ano']))}")
+    return familiar_df[familiar_df['Ano'] == ano], d.indicadores_agricultura(combined_ag, ano)
+
+
+def consultar_indicadores(d, parametros):
+    """Todos os KPIs da página no estado inicial (ano mais recente de cada seção)"""
+    cubo = d.load_cubo_emissoes()
+    combined_ag, _ = d.load_agricultura_processada()
+    indicadores = {
+        'emissoes': d.indicadores_emissoes(cubo, cubo.anos_disponiveis('brutas')[-1]),
+        'desmatamento': d.indicadores_desmatamento(d.load_motor_tendencias('Estado')),
+        'agricultura': d.indicadores_agricultura(combined_ag, 2017),
+    }
+    linha = {f'{secao}_{nome}': valor for secao, valores in indicadores.items() for nome, valor in valores.items()}
+    return pd.DataFrame([nativo(linha)]), indicadores
+
+
+# Rotas: consulta e arquivos de `tratado/` de que ela depende (entram na versão e no ETag)
+def fontes_rotas(d):
+    """{caminho: (consulta, arquivos de origem)}"""
+    seeg = list(d.TABELAS_SEEG.values())
+    return {
+        '/emissoes': (consultar_emissoes, seeg),
+        '/prodes': (consultar_prodes, [d.ARQUIVO_PRODES, d.ARQUIVO_PRODES_MUNICIPIOS]),
+        '/prodes/tendencias': (consultar_tendencias, [d.ARQUIVO_PRODES, d.ARQUIVO_PRODES_MUNICIPIOS]),
+        '/correlacoes': (consultar_correlacoes, [d.ARQUIVO_PRODES, *seeg]),
+        '/industria/eficiencia': (consultar_eficiencia, [d.ARQUIVO_INDUSTRIA, *seeg]),
+        '/industria/setores': (consultar_setores, [d.ARQUIVO_INDUSTRIA, *seeg]),
+        '/agricultura': (consultar_agricultura, [d.ARQUIVO_AGRICULTURA_2017, d.ARQUIVO_AGRICULTURA_2006]),
+        '/indicadores': (consultar_indicadores, [
+            *seeg, d.ARQUIVO_PRODES, d.ARQUIVO_AGRICULTURA_2017, d.ARQUIVO_AGRICULTURA_2006]),
+    }
+
+
+def serializar(dados, indicadores, versao, formato):
+    """Corpo da resposta em JSON ou Arrow"""
+    indicadores = json.dumps(nativo(indicadores), ensure_ascii=False)
+    if formato == 'arrow':
+        tabela = pa.Table.from_pandas(dados, preserve_index=False)
+        tabela = tabela.replace_schema_metadata({'versao': versao, 'indicadores': indicadores})
+        saida = pa.BufferOutputStream()
+        with pa.ipc.new_stream(saida, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        return saida.getvalue().to_pybytes()
+    registros = dados.to_json(orient='records', force_ascii=False)
+    return f'{{"versao":{json.dumps(versao)},"indicadores":{indicadores},"dados":{registros}}}'.encode('utf-8')
+
+
+class CacheRespostas:
+    """Respostas já serializadas (e comprimidas) com descarte LRU"""
+
+    def __init__(self, tamanho_maximo=256):
+        self.tamanho_maximo = tamanho_maximo
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave):
+        """(corpo, corpo em gzip ou None) da chave, ou None"""
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                self._entradas.move_to_end(chave)
+        INSTRUMENTACAO.contar_cache('respostas', entrada is not None)
+        return entrada
+
+    def guardar(self, chave, corpo):
+        """Guarda o corpo e sua versão comprimida; retorna a entrada"""
+        comprimido = gzip.compress(corpo, compresslevel=6) if len(corpo) >= TAMANHO_MINIMO_GZIP else None
+        entrada = (corpo, comprimido)
+        with self._trava:
+            self._entradas[chave] = entrada
+            while len(self._entradas) > self.tamanho_maximo:
+                self._entradas.popitem(last=False)
+        return entrada
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+CACHE_RESPOSTAS = CacheRespostas()
+
+
+def escolher_formato(requisicao):
+    """'arrow' ou 'json', pela query string ou pelo cabeçalho Accept"""
+    formato = requisicao.query_params.get('formato')
+    if formato is None:
+        formato = 'arrow' if TIPO_ARROW in requisicao.headers.get('accept', '') else 'json'
+    if formato not in ('json', 'arrow'):
+        raise ErroParametro("'formato' deve ser 'json' ou 'arrow'")
+    return formato
+
+
+def calcular(consulta, parametros, versao, formato, chave):
+    """Executa a consulta e guarda a resposta serializada (numa thread, fora do event loop)"""
+    with _trava_calculo:
+        entrada = CACHE_RESPOSTAS.obter(chave)
+        if entrada is None:
+            with INSTRUMENTACAO.span(f'api:{consulta.__name__}'):
+                dados, indicadores = consulta(_dashboard, parametros)
+                entrada = CACHE_RESPOSTAS.guardar(chave, serializar(dados, indicadores, versao, formato))
+        return entrada
+
+
+def criar_endpoint(caminho, consulta, fontes):
+    """Endpoint GET com negociação de formato, ETag/304, cache de respostas e gzip"""
+    async def endpoint(requisicao):
+        try:
+            formato = escolher_formato(requisicao)
+        except ErroParametro as e:
+            return JSONResponse({'erro': str(e)}, status_code=400)
+        parametros = {nome: valor for nome, valor in sorted(requisicao.query_params.items()) if nome != 'formato'}
+        versao = _dashboard.versao_dados(*fontes)
+        chave = (caminho, tuple(parametros.items()), formato, versao, VERSAO_RESPOSTAS)
+        etag = 'W/"' + hashlib.sha256(repr(chave).encode()).hexdigest()[:32] + '"'
+        cabecalhos = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept, Accept-Encoding'}
+
+        if etag in requisicao.headers.get('if-none-match', ''):
+            return Response(status_code=304, headers=cabecalhos)
+
+        entrada = CACHE_RESPOSTAS.obter(chave)
+        if entrada is None:
+            try:
+                entrada = await asyncio.to_thread(calcular, consulta, parametros, versao, formato, chave)
+            except ErroParametro as e:
+                return JSONResponse({'erro': str(e)}, status_code=400)
+            except (ErroEsquema, FileNotFoundError) as e:
+                return JSONResponse({'erro': f"Dados indisponíveis: {e}"}, status_code=503)
+
+        corpo, comprimido = entrada
+        if comprimido is not None and 'gzip' in requisicao.headers.get('accept-encoding', ''):
+            corpo = comprimido
+            cabecalhos['Content-Encoding'] = 'gzip'
+        tipo = TIPO_ARROW if formato == 'arrow' else TIPO_JSON
+        return Response(corpo, media_type=tipo, headers=cabecalhos)
+
+    return endpoint
+
+
+@asynccontextmanager
+async def iniciar(app):
+    """Importa o dashboard (sem o runtime do Streamlit) antes de aceitar requisições"""
+    global _dashboard
+    _dashboard = await asyncio.to_thread(importar_dashboard)
+    for caminho, (consulta, fontes) in fontes_rotas(_dashboard).items():
+        app.router.routes.append(Route(caminho, criar_endpoint(caminho, consulta, fontes), methods=['GET']))
+    yield
+
+
+app = Starlette(lifespan=iniciar)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8502)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.porta, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
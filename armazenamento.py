@@ -0,0 +1,496 @@
+"""Armazenamento colunar dos dados tratados.
+
+Compila os CSVs de `tratado/` em arquivos Parquet tipados (em `compilado/`)
+e oferece `carregar_tabela`, usada pelos loaders do dashboard. Cada artefato
+é imutável e identificado pelo hash do conteúdo do CSV de origem (e pelo
+esquema): `carregar_tabela` lê sempre o artefato da versão em uso, com
+memory map, e nunca o CSV do disco no lugar de outra versão. Um artefato
+ausente só é compilado se o CSV do disco for exatamente a versão pedida.
+
+Os CSVs são lidos com os tipos declarados em ESQUEMAS, sem inferência. Uma
+célula vazia ou não numérica numa coluna numérica, ou uma linha malformada,
+gera `ErroEsquema` com a linha, a coluna e o valor de cada célula inválida,
+em vez de virar NaN.
+
+As tabelas ficam compactas em memória: textos repetidos como categóricas
+(com um dicionário de termos por nome de coluna, compartilhado por todas as
+tabelas do processo) e inteiros reduzidos a int32 quando os valores cabem.
+
+`versao_dados` identifica a versão dos arquivos de `tratado/` e entra nas
+chaves dos caches. Com o monitor de recarga (`recarga.py`) ativo, ela
+devolve as versões publicadas por ele, e não as do disco: um arquivo
+alterado só passa a valer depois que os caches dependentes foram
+reconstruídos em segundo plano. Dentro de `fixar_versoes` (usado pelos
+loaders), a versão de cada arquivo fica fixa na thread: a chave do cache e
+as tabelas carregadas correspondem sempre à mesma versão.
+
+Uso:
+    python armazenamento.py            # compila apenas o que mudou
+    python armazenamento.py --forcar   # recompila tudo
+    python armazenamento.py --validar  # só valida os CSVs contra os esquemas
+"""
+import hashlib
+import io
+import os
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DIRETORIO_TRATADO = Path('tratado')
+DIRETORIO_COMPILADO = Path('compilado')
+
+COLUNA_CNAE = 'Classificação Nacional de Atividades Econômicas (CNAE 2.0)'
+COLUNA_RECEITA = 'Receita - total (Mil Reais)'
+COLUNA_EMPRESAS = 'Número de empresas (Unidades)'
+
+# Esquema de cada arquivo de `tratado/`:
+# - categoricas, inteiras: colunas com esses tipos (obrigatórias);
+# - numericas: tipo das demais colunas;
+# - colunas (opcional): colunas lidas (`usecols`), obrigatórias; as outras são ignoradas;
+# - padrao_numericas (opcional): expressão que o nome das demais colunas deve seguir.
+ESQUEMAS = {
+    'dados agricultura/dados-agricultura-2006.csv': {
+        'categoricas': ['Região', 'Tipo'], 'inteiras': [], 'numericas': 'int64'},
+    'dados agricultura/dados-agricultura-2017.csv': {
+        'categoricas': ['Região', 'Tipo'], 'inteiras': [], 'numericas': 'int64'},
+    'dados industria/dados-industriais.csv': {
+        'categoricas': [COLUNA_CNAE], 'inteiras': ['Ano'], 'numericas': 'int64',
+        'colunas': ['Ano', COLUNA_CNAE, COLUNA_EMPRESAS, COLUNA_RECEITA]},
+    'desmatamento/taxa_prodes_1988_2024-tratado.csv': {
+        'categoricas': [], 'inteiras': ['Ano/Estados'], 'numericas': 'int64'},
+    'desmatamento/prodes_municipios.csv': {
+        'categoricas': ['UF', 'Município'], 'inteiras': ['Ano', 'Código IBGE'], 'numericas': 'float32'},
+    'desmatamento/desmatamento_prodes_2017.csv': {
+        'categoricas': ['UF', 'Fonte'], 'inteiras': ['Ano'], 'numericas': 'int64'},
+    'desmatamento/seeg/emissões_brutas.csv': {
+        'categoricas': ['Categoria'], 'inteiras': [], 'numericas': 'float32', 'padrao_numericas': r'\d{4}'},
+    'desmatamento/seeg/emissões_liquidas.csv': {
+        'categoricas': ['Categoria'], 'inteiras': [], 'numericas': 'float32', 'padrao_numericas': r'\d{4}'},
+    'desmatamento/seeg/emissão_metano.csv': {
+        'categoricas': ['Categoria'], 'inteiras': [], 'numericas': 'float32', 'padrao_numericas': r'\d{4}'},
+    'desmatamento/seeg/categoria_emissora_no_setor_de_energia.csv': {
+        'categoricas': ['Categoria'], 'inteiras': [], 'numericas': 'float32', 'padrao_numericas': r'\d{4}'},
+}
+
+# Chaves gravadas nos metadados do Parquet (a versão também está no nome do arquivo)
+_META_HASH = b'fonte_sha256'
+_META_ESQUEMA = b'esquema'
+
+# Muda quando a conversão dos CSVs muda (os artefatos antigos são recompilados)
+VERSAO_LEITURA = 3
+
+# Artefatos mantidos por arquivo: versões anteriores ainda publicadas em outros workers
+ARTEFATOS_MANTIDOS = 3
+
+# Células inválidas listadas na mensagem de ErroEsquema (todas ficam em `celulas`)
+MAX_CELULAS_MENSAGEM = 10
+
+
+class ErroEsquema(ValueError):
+    """CSV de `tratado/` fora do esquema declarado
+
+    `celulas` lista (linha do arquivo, coluna, valor) de cada célula inválida.
+    """
+
+    def __init__(self, relativo, problema, celulas=()):
+        self.relativo = relativo
+        self.celulas = list(celulas)
+        mensagem = f"{DIRETORIO_TRATADO / relativo}: {problema}"
+        if self.celulas:
+            exemplos = '; '.join(f"linha {linha}, coluna '{coluna}': {valor!r}"
+                                 for linha, coluna, valor in self.celulas[:MAX_CELULAS_MENSAGEM])
+            if len(self.celulas) > MAX_CELULAS_MENSAGEM:
+                exemplos += f"; e mais {len(self.celulas) - MAX_CELULAS_MENSAGEM}"
+            mensagem += f" ({exemplos})"
+        super().__init__(mensagem)
+
+
+class VersaoIndisponivel(LookupError):
+    """A versão pedida de um arquivo de `tratado/` não está compilada e o CSV do disco já é outra"""
+
+    def __init__(self, relativo, versao):
+        self.relativo = relativo
+        self.versao = versao
+        super().__init__(f"{DIRETORIO_TRATADO / relativo}: versão {versao[:12]} indisponível "
+                         f"(o arquivo mudou); recarregue a página")
+
+
+def caminho_artefato(relativo, versao):
+    """Caminho do Parquet compilado de uma versão (hash do conteúdo) de um CSV de `tratado/`"""
+    return DIRETORIO_COMPILADO / relativo[:-len('.csv')] / f'{versao}-{versao_esquema(relativo)[:12]}.parquet'
+
+
+def hash_arquivo(caminho):
+    """SHA-256 do conteúdo de um arquivo"""
+    digest = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+# Hash do conteúdo por (caminho, mtime, tamanho): o arquivo só é relido quando muda
+_hashes = {}
+
+
+def hash_memorizado(caminho):
+    """SHA-256 do conteúdo de um arquivo, recalculado só quando mtime ou tamanho mudam"""
+    estado = Path(caminho).stat()
+    assinatura = (estado.st_mtime_ns, estado.st_size)
+    memorizado = _hashes.get(str(caminho))
+    if memorizado is None or memorizado[0] != assinatura:
+        memorizado = (assinatura, hash_arquivo(caminho))
+        _hashes[str(caminho)] = memorizado
+    return memorizado[1]
+
+
+def versao_arquivos(*caminhos):
+    """Identificador da versão atual (conteúdo) de um conjunto de arquivos
+
+    Baseado no SHA-256 de cada arquivo, e não no mtime, o identificador é o
+    mesmo em todas as réplicas que tenham os mesmos dados e serve de chave
+    para o cache compartilhado. Arquivos inexistentes também entram no
+    identificador, como ausentes.
+    """
+    digest = hashlib.sha1()
+    for caminho in caminhos:
+        try:
+            digest.update(f'{caminho}:{hash_memorizado(caminho)};'.encode())
+        except FileNotFoundError:
+            digest.update(f'{caminho}:ausente;'.encode())
+    return digest.hexdigest()
+
+
+# Versões publicadas pelo monitor de recarga: relativo -> hash do conteúdo
+VERSOES_PUBLICADAS = {}
+_contexto = threading.local()
+
+
+def hash_tratado(relativo):
+    """Hash do conteúdo atual de um arquivo de `tratado/` ('ausente' se não existir)"""
+    try:
+        return hash_memorizado(DIRETORIO_TRATADO / relativo)
+    except FileNotFoundError:
+        return 'ausente'
+
+
+def versao_fonte(relativo):
+    """Hash da versão em uso de um arquivo de `tratado/`
+
+    Na ordem: a fixada nesta thread por `fixar_versoes`, a publicada pelo
+    monitor de recarga e o conteúdo atual do disco.
+    """
+    fixadas = getattr(_contexto, 'fixadas', {})
+    if relativo in fixadas:
+        return fixadas[relativo]
+    return VERSOES_PUBLICADAS.get(relativo) or hash_tratado(relativo)
+
+
+@contextmanager
+def fixar_versoes(versoes):
+    """Dentro do bloco (só nesta thread), usa as versões dadas ({relativo: hash})
+
+    Versões já fixadas por um bloco externo prevalecem: um loader chamado por
+    outro vê os mesmos arquivos que ele.
+    """
+    anteriores = getattr(_contexto, 'fixadas', {})
+    _contexto.fixadas = {**versoes, **anteriores}
+    try:
+        yield
+    finally:
+        _contexto.fixadas = anteriores
+
+
+def versao_dados(*relativos):
+    """Identificador da versão de arquivos de `tratado/` (ver `versao_fonte`)"""
+    digest = hashlib.sha1()
+    for relativo in relativos:
+        digest.update(f'{relativo}:{versao_fonte(relativo)};'.encode())
+    return digest.hexdigest()
+
+
+def versao_esquema(relativo):
+    """Hash do esquema declarado de um arquivo (artefatos de outro esquema são recompilados)"""
+    return hashlib.sha1(repr((VERSAO_LEITURA, sorted(ESQUEMAS[relativo].items()))).encode()).hexdigest()
+
+
+def tipos_colunas(relativo, colunas):
+    """Tipo declarado de cada coluna"""
+    esquema = ESQUEMAS[relativo]
+    tipos = {}
+    for coluna in colunas:
+        if coluna in esquema['categoricas']:
+            tipos[coluna] = 'category'
+        elif coluna in esquema['inteiras']:
+            tipos[coluna] = 'int64'
+        else:
+            tipos[coluna] = esquema['numericas']
+    return tipos
+
+
+def origem_csv(relativo, conteudo=None):
+    """O que passar ao `read_csv`: o conteúdo já lido (bytes) ou o caminho do arquivo"""
+    return DIRETORIO_TRATADO / relativo if conteudo is None else io.BytesIO(conteudo)
+
+
+def colunas_esquema(relativo, conteudo=None):
+    """Confere o cabeçalho do CSV com o esquema; retorna as colunas a ler"""
+    esquema = ESQUEMAS[relativo]
+    # utf-8-sig: as exportações do SEEG começam com BOM
+    cabecalho = list(pd.read_csv(origem_csv(relativo, conteudo), nrows=0, encoding='utf-8-sig').columns)
+    obrigatorias = esquema.get('colunas') or esquema['categoricas'] + esquema['inteiras']
+    ausentes = [coluna for coluna in obrigatorias if coluna not in cabecalho]
+    if ausentes:
+        raise ErroEsquema(relativo, f"coluna(s) ausente(s): {ausentes}")
+
+    colunas = esquema.get('colunas') or cabecalho
+    padrao = esquema.get('padrao_numericas')
+    if padrao:
+        inesperadas = [coluna for coluna in colunas
+                       if coluna not in esquema['categoricas'] + esquema['inteiras']
+                       and not re.fullmatch(padrao, coluna)]
+        if inesperadas:
+            raise ErroEsquema(relativo, f"coluna(s) inesperada(s): {inesperadas}")
+    return colunas
+
+
+def celulas_invalidas(relativo, colunas, conteudo=None):
+    """Relê o CSV como texto e localiza as células incompatíveis com o tipo declarado"""
+    try:
+        texto = pd.read_csv(origem_csv(relativo, conteudo), usecols=colunas_lidas(relativo, colunas), dtype=str,
+                            keep_default_na=False, encoding='utf-8-sig')
+    except pd.errors.ParserError as e:
+        raise ErroEsquema(relativo, f"linha malformada: {e}") from e
+
+    celulas = []
+    for coluna, tipo in tipos_colunas(relativo, colunas).items():
+        valores = texto[coluna].str.strip()
+        if tipo == 'category':
+            invalidas = valores == ''
+        else:
+            numeros = pd.to_numeric(valores, errors='coerce')
+            invalidas = numeros.isna()
+            if tipo.startswith('int'):
+                invalidas |= numeros.mod(1).fillna(0) != 0
+        for posicao in invalidas.to_numpy().nonzero()[0]:
+            # +2: o cabeçalho é a linha 1
+            celulas.append((int(posicao) + 2, coluna, texto[coluna].iat[posicao]))
+    return sorted(celulas)
+
+
+def colunas_lidas(relativo, colunas):
+    """`usecols` da leitura: só quando o esquema declara um subconjunto
+
+    Sem `usecols`, o parser rejeita linhas com campos a mais; com ele, os
+    campos excedentes no fim da linha são ignorados.
+    """
+    return colunas if ESQUEMAS[relativo].get('colunas') else None
+
+
+def reduzir_inteiros(df):
+    """Converte para int32 as colunas int64 cujos valores cabem (somas e médias voltam a 64 bits)"""
+    limites = np.iinfo('int32')
+    for coluna in df.columns:
+        serie = df[coluna]
+        if serie.dtype == 'int64' and (serie.empty or (serie.min() >= limites.min and serie.max() <= limites.max)):
+            df[coluna] = serie.astype('int32')
+    return df
+
+
+# Dicionário de termos: categorias de cada nome de coluna, comuns a todas as tabelas
+_dicionarios = {}
+_trava_dicionarios = threading.Lock()
+
+
+def compartilhar_categorias(*tabelas):
+    """Faz as colunas categóricas de mesmo nome usarem o mesmo dicionário de termos
+
+    Os textos de cada coluna (regiões, setores, UFs, atividades) ficam uma
+    única vez na memória do processo, e tabelas com o mesmo dicionário podem
+    ser concatenadas sem voltar a texto. Termos novos são acrescentados ao
+    fim do dicionário, sem alterar os códigos dos existentes. Altera as
+    tabelas no lugar e as retorna.
+    """
+    with _trava_dicionarios:
+        for df in tabelas:
+            for coluna in df.select_dtypes('category').columns:
+                categorias = df[coluna].cat.categories
+                dicionario = _dicionarios.get(coluna)
+                if dicionario is None:
+                    _dicionarios[coluna] = categorias
+                    continue
+                novas = categorias[dicionario.get_indexer(categorias) < 0]
+                if len(novas):
+                    _dicionarios[coluna] = dicionario.append(novas)
+        for df in tabelas:
+            for coluna in df.select_dtypes('category').columns:
+                serie = df[coluna]
+                dicionario = _dicionarios[coluna]
+                categorias = serie.cat.categories
+                if categorias is dicionario:
+                    continue
+                posicoes = dicionario.get_indexer(categorias)
+                if (posicoes == np.arange(len(categorias))).all():
+                    # Termos na mesma ordem do dicionário (caso de uma recarga): os
+                    # códigos valem como estão e não são copiados
+                    valores = pd.Categorical.from_codes(serie.array.codes, validate=False,
+                                                        dtype=pd.CategoricalDtype(dicionario))
+                    df[coluna] = pd.Series(valores, index=df.index, name=coluna, copy=False)
+                else:
+                    df[coluna] = serie.cat.set_categories(dicionario)
+    return tabelas[0] if len(tabelas) == 1 else tabelas
+
+
+def memoria_tabelas(tabelas):
+    """Memória (com os textos) de cada tabela de um dicionário {nome: DataFrame}"""
+    return pd.DataFrame([
+        {'Tabela': nome, 'Linhas': len(df), 'Colunas': df.shape[1],
+         'MB': round(df.memory_usage(deep=True).sum() / 2**20, 3)}
+        for nome, df in tabelas.items()
+    ])
+
+
+def ler_csv(relativo, conteudo=None):
+    """Lê um CSV de `tratado/` com os tipos declarados em ESQUEMAS, sem inferência de tipos
+
+    Com `conteudo` (bytes já lidos do arquivo), não volta a abrir o arquivo.
+    """
+    colunas = colunas_esquema(relativo, conteudo)
+    try:
+        df = pd.read_csv(origem_csv(relativo, conteudo), usecols=colunas_lidas(relativo, colunas),
+                         dtype=tipos_colunas(relativo, colunas), encoding='utf-8-sig')
+    except ValueError as e:
+        erro = e
+    else:
+        # Células vazias viram NaN sem erro na leitura tipada
+        if not df.isna().to_numpy().any():
+            return reduzir_inteiros(df)
+        erro = None
+
+    celulas = celulas_invalidas(relativo, colunas, conteudo)
+    if not celulas:
+        raise ErroEsquema(relativo, str(erro)) from erro
+    raise ErroEsquema(relativo, f"{len(celulas)} célula(s) inválida(s)", celulas) from erro
+
+
+def artefato_atualizado(relativo):
+    """Indica se existe o Parquet compilado da versão atual do CSV (e do esquema)"""
+    return caminho_artefato(relativo, hash_tratado(relativo)).exists()
+
+
+def compilar_tabela(relativo, versao=None):
+    """Compila um CSV de `tratado/` em Parquet com o esquema declarado; retorna o artefato
+
+    O hash (lido em blocos) e a conversão são do mesmo arquivo: se ele for
+    trocado durante a leitura (inode, mtime ou tamanho diferentes), a
+    compilação recomeça, de modo que o artefato nunca fica com o nome de
+    outra versão. Com `versao`, falha com `VersaoIndisponivel` se o arquivo
+    do disco não for essa versão.
+    """
+    fonte = DIRETORIO_TRATADO / relativo
+    while True:
+        antes = fonte.stat()
+        compilada = hash_arquivo(fonte)
+        if versao is not None and compilada != versao:
+            raise VersaoIndisponivel(relativo, versao)
+        artefato = caminho_artefato(relativo, compilada)
+        if artefato.exists():
+            return artefato
+        df = ler_csv(relativo)
+        depois = fonte.stat()
+        if (antes.st_ino, antes.st_mtime_ns, antes.st_size) == (depois.st_ino, depois.st_mtime_ns, depois.st_size):
+            break
+
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    del df
+    tabela = tabela.replace_schema_metadata({
+        **(tabela.schema.metadata or {}),
+        _META_HASH: compilada.encode(),
+        _META_ESQUEMA: versao_esquema(relativo).encode(),
+    })
+
+    artefato.parent.mkdir(parents=True, exist_ok=True)
+    # Escrita atômica: outro worker pode estar compilando a mesma versão
+    temporario = artefato.with_name(f'{artefato.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    pq.write_table(tabela, temporario)
+    os.replace(temporario, artefato)
+    remover_artefatos_antigos(relativo)
+    return artefato
+
+
+def remover_artefatos_antigos(relativo):
+    """Remove os artefatos de um arquivo além dos ARTEFATOS_MANTIDOS mais recentes
+
+    A versão publicada neste processo nunca é removida. Um worker que ainda
+    tenha mapeado um artefato removido continua lendo-o (o sistema só libera
+    o espaço ao fim do mapeamento).
+    """
+    diretorio = DIRETORIO_COMPILADO / relativo[:-len('.csv')]
+    publicada = VERSOES_PUBLICADAS.get(relativo)
+    artefatos = sorted(diretorio.glob('*.parquet'), key=lambda caminho: caminho.stat().st_mtime_ns, reverse=True)
+    for artefato in artefatos[ARTEFATOS_MANTIDOS:]:
+        if publicada is None or not artefato.name.startswith(publicada):
+            artefato.unlink(missing_ok=True)
+
+
+def compilar_tratado(forcar=False):
+    """Compila todos os CSVs de `tratado/`; retorna os artefatos gerados"""
+    gerados = []
+    for relativo in ESQUEMAS:
+        if not (DIRETORIO_TRATADO / relativo).exists():
+            continue
+        if forcar:
+            caminho_artefato(relativo, hash_tratado(relativo)).unlink(missing_ok=True)
+        if forcar or not artefato_atualizado(relativo):
+            gerados.append(compilar_tabela(relativo))
+    return gerados
+
+
+def carregar_tabela(relativo):
+    """Carrega uma tabela de `tratado/` na versão em uso (`versao_fonte`), do Parquet compilado
+
+    Se o artefato dessa versão não existir, ele é compilado a partir do CSV,
+    desde que o disco tenha essa mesma versão (senão, `VersaoIndisponivel`).
+    """
+    versao = versao_fonte(relativo)
+    if versao == 'ausente':
+        raise FileNotFoundError(f"Arquivo não encontrado: {DIRETORIO_TRATADO / relativo}")
+    artefato = caminho_artefato(relativo, versao)
+    if not artefato.exists():
+        artefato = compilar_tabela(relativo, versao)
+    df = pq.read_table(artefato, memory_map=True).to_pandas()
+    return compartilhar_categorias(df)
+
+
+def validar_tratado():
+    """Valida todos os CSVs de `tratado/`; retorna {relativo: erro} dos inválidos"""
+    erros = {}
+    for relativo in ESQUEMAS:
+        if not (DIRETORIO_TRATADO / relativo).exists():
+            continue
+        try:
+            ler_csv(relativo)
+        except ErroEsquema as e:
+            erros[relativo] = e
+    return erros
+
+
+if __name__ == '__main__':
+    if '--validar' in sys.argv[1:]:
+        erros = validar_tratado()
+        for erro in erros.values():
+            print(f"❌ {erro}")
+        print(f"{len(erros)} arquivo(s) fora do esquema.")
+        sys.exit(1 if erros else 0)
+
+    gerados = compilar_tratado(forcar='--forcar' in sys.argv[1:])
+    for artefato in gerados:
+        print(f"Compilado: {artefato}")
+    print(f"{len(gerados)} artefato(s) atualizado(s) em '{DIRETORIO_COMPILADO}/'.")
@@ -0,0 +1,349 @@
+"""Atualização concorrente das fontes de dados do dashboard.
+
+Substitui o antigo `get_csv_from_html.py`: baixa todas as fontes ao mesmo
+tempo (asyncio + aiohttp), com requisições condicionais (ETag /
+If-Modified-Since), e grava diretamente os arquivos de `tratado/` (ou de
+`dados_brutos/`, para as planilhas do IBGE, convertidas em seguida por
+`etl_planilhas.py`). Só os arquivos cujo conteúdo mudou são regravados, e
+apenas os artefatos compilados correspondentes (`armazenamento.py`) são
+recompilados; os caches do dashboard dependem da versão dos arquivos e por
+isso só são invalidados para essas fontes.
+
+As exportações do SEEG, o PRODES por município (TerraBrasilis) e as tabelas
+do IBGE não têm URL fixa: informe-as num arquivo JSON
+(`{"seeg_brutas": "https://...", ...}`) com `--config`, ou com
+`--url nome=URL`. Fontes sem URL são ignoradas.
+
+Uso:
+    python atualizar_fontes.py [--config fontes.json] [--url nome=URL ...] [nomes ...]
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+import aiohttp
+import lxml.html
+
+import armazenamento
+import etl_planilhas
+
+URL_PRODES = 'http://www.obt.inpe.br/OBT/assuntos/programas/amazonia/prodes'
+
+# Colunas da tabela do PRODES usadas pelo dashboard (a página pode trazer outras)
+ESTADOS_PRODES = ['AC', 'AM', 'AP', 'MA', 'MT', 'PA', 'RO', 'RR', 'TO', 'AMZ LEGAL']
+
+CAMINHO_ESTADO = armazenamento.DIRETORIO_COMPILADO / 'estado_fontes.json'
+
+TIMEOUT_SEGUNDOS = 60
+
+
+class ErroFonte(Exception):
+    """Conteúdo baixado de uma fonte não está no formato esperado"""
+
+
+def processar_prodes(conteudo):
+    """Extrai a tabela de taxas PRODES da página do INPE como CSV tratado
+
+    Falha com `ErroFonte` se faltar alguma coluna de ESTADOS_PRODES ou se
+    nenhuma linha de ano for reconhecida, em vez de gravar uma tabela vazia.
+    """
+    try:
+        texto = conteudo.decode('utf-8')
+    except UnicodeDecodeError:
+        texto = conteudo.decode('latin-1')
+    documento = lxml.html.fromstring(texto)
+    tabelas = documento.xpath(
+        "//h3[contains(normalize-space(.), 'Taxas PRODES Amazônia')]/following-sibling::table[1]"
+    )
+    if not tabelas:
+        raise ErroFonte("Tabela 'Taxas PRODES Amazônia' não encontrada na página")
+
+    linhas = [
+        [celula.text_content().strip() for celula in linha.xpath('./th|./td')]
+        for linha in tabelas[0].iter('tr')
+    ]
+    cabecalho, *corpo = [linha for linha in linhas if linha]
+    estados = [re.sub(r'\s+', ' ', coluna).upper() for coluna in cabecalho[1:]]
+    ausentes = [estado for estado in ESTADOS_PRODES if estado not in estados]
+    if ausentes:
+        raise ErroFonte(f"Coluna(s) ausente(s) na tabela do PRODES: {ausentes} (encontradas: {estados})")
+
+    saida = io.StringIO()
+    escritor = csv.writer(saida, lineterminator='\n')
+    escritor.writerow(['Ano/Estados'] + estados)
+    anos = 0
+    for linha in corpo:
+        # O ano pode vir com separador de milhar ("1.988") e com notas ("2024*")
+        ano = re.match(r'(\d)\.?(\d{3})(?!\d)', linha[0])
+        if ano is None:
+            continue
+        if len(linha) < len(estados) + 1:
+            raise ErroFonte(f"Linha incompleta na tabela do PRODES: {linha}")
+        # Valores em km² inteiros; remove separadores de milhar e notas
+        valores = [re.sub(r'\D', '', valor) or '0' for valor in linha[1:len(estados) + 1]]
+        escritor.writerow([ano.group(1) + ano.group(2)] + valores)
+        anos += 1
+    if not anos:
+        raise ErroFonte("Nenhuma linha de ano reconhecida na tabela do PRODES")
+    return saida.getvalue().encode('utf-8')
+
+
+def processar_seeg(conteudo):
+    """Valida uma exportação do SEEG (Categoria + colunas de ano) e a mantém como está"""
+    cabecalho = conteudo.decode('utf-8-sig').splitlines()[0]
+    colunas = [coluna.strip('"') for coluna in cabecalho.split(',')]
+    if colunas[0] != 'Categoria' or not all(re.fullmatch(r'\d{4}', coluna) for coluna in colunas[1:]):
+        raise ErroFonte(f"Cabeçalho inesperado na exportação do SEEG: {cabecalho[:80]}")
+    return conteudo
+
+
+# Nomes aceitos para cada coluna da exportação municipal do PRODES (TerraBrasilis)
+COLUNAS_PRODES_MUNICIPIOS = {
+    'Ano': ('year', 'ano'),
+    'UF': ('state', 'uf', 'estado'),
+    'Município': ('municipality', 'municipio', 'município', 'nome'),
+    'Código IBGE': ('geocode', 'geocode_ibge', 'geocodigo', 'cod_ibge', 'código ibge'),
+    'Área (km²)': ('areakm', 'area_km', 'area', 'área (km²)', 'increment'),
+}
+
+
+def processar_prodes_municipios(conteudo):
+    """Normaliza o incremento anual de desmatamento por município (formato longo)
+
+    Aceita CSV separado por vírgula ou ponto e vírgula, com as colunas de
+    COLUNAS_PRODES_MUNICIPIOS em qualquer ordem; grava só as linhas com área
+    não nula, ordenadas por ano.
+    """
+    texto = conteudo.decode('utf-8-sig')
+    dialeto = csv.Sniffer().sniff(texto[:4096], delimiters=',;')
+    linhas = csv.reader(io.StringIO(texto), dialeto)
+    cabecalho = [coluna.strip().lower() for coluna in next(linhas)]
+
+    indices = {}
+    for coluna, nomes in COLUNAS_PRODES_MUNICIPIOS.items():
+        encontrados = [cabecalho.index(nome) for nome in nomes if nome in cabecalho]
+        if not encontrados:
+            raise ErroFonte(f"Coluna '{coluna}' não encontrada na exportação municipal do PRODES: {cabecalho}")
+        indices[coluna] = encontrados[0]
+
+    registros = []
+    for linha in linhas:
+        if not linha:
+            continue
+        area = float(linha[indices['Área (km²)']].replace(',', '.') or 0)
+        if area:
+            registros.append((int(float(linha[indices['Ano']])), linha[indices['UF']].strip().upper(),
+                              linha[indices['Município']].strip(), int(float(linha[indices['Código IBGE']])),
+                              area))
+    registros.sort()
+
+    saida = io.StringIO()
+    escritor = csv.writer(saida, lineterminator='\n')
+    escritor.writerow(list(COLUNAS_PRODES_MUNICIPIOS))
+    escritor.writerows(registros)
+    return saida.getvalue().encode('utf-8')
+
+
+# Fontes conhecidas: destino (relativo à raiz do projeto) e processamento do conteúdo
+FONTES = {
+    'prodes': {
+        'url': URL_PRODES,
+        'destino': 'tratado/desmatamento/taxa_prodes_1988_2024-tratado.csv',
+        'processar': processar_prodes,
+    },
+    'prodes_municipios': {
+        'url': None,
+        'destino': 'tratado/desmatamento/prodes_municipios.csv',
+        'processar': processar_prodes_municipios,
+    },
+    'seeg_brutas': {
+        'url': None,
+        'destino': 'tratado/desmatamento/seeg/emissões_brutas.csv',
+        'processar': processar_seeg,
+    },
+    'seeg_liquidas': {
+        'url': None,
+        'destino': 'tratado/desmatamento/seeg/emissões_liquidas.csv',
+        'processar': processar_seeg,
+    },
+    'seeg_metano': {
+        'url': None,
+        'destino': 'tratado/desmatamento/seeg/emissão_metano.csv',
+        'processar': processar_seeg,
+    },
+    'seeg_energia': {
+        'url': None,
+        'destino': 'tratado/desmatamento/seeg/categoria_emissora_no_setor_de_energia.csv',
+        'processar': processar_seeg,
+    },
+    'ibge_agricultura_2006': {
+        'url': None,
+        'destino': 'dados_brutos/dados_agricultura_2006.xlsx',
+        'processar': None,
+    },
+    'ibge_agricultura_2017': {
+        'url': None,
+        'destino': 'dados_brutos/dados_agricultura_2017.xlsx',
+        'processar': None,
+    },
+    'ibge_industria': {
+        'url': None,
+        'destino': 'dados_brutos/dados_industriais.xlsx',
+        'processar': None,
+    },
+}
+
+
+def carregar_estado(caminho=CAMINHO_ESTADO):
+    """ETag, Last-Modified e hash gravados na última atualização de cada fonte"""
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return {}
+    return json.loads(caminho.read_text(encoding='utf-8'))
+
+
+def gravar_atomico(caminho, conteudo):
+    """Grava `conteudo` sem que leitores vejam um arquivo parcial"""
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(caminho.name + '.tmp')
+    temporario.write_bytes(conteudo)
+    os.replace(temporario, caminho)
+
+
+def relativo_tratado(destino):
+    """Caminho de `destino` relativo a `tratado/`, ou None se estiver fora dele"""
+    prefixo = armazenamento.DIRETORIO_TRATADO.as_posix() + '/'
+    return destino[len(prefixo):] if destino.startswith(prefixo) else None
+
+
+async def atualizar_fonte(sessao, nome, fonte, estado, raiz):
+    """Baixa e grava uma fonte; retorna (nome, situação, novo estado)"""
+    anterior = estado.get(nome, {})
+    destino = Path(raiz) / fonte['destino']
+    cabecalhos = {}
+    # Requisição condicional só se o arquivo local ainda é o que foi baixado
+    if (anterior.get('url') != fonte['url'] or not destino.exists() or
+            armazenamento.hash_arquivo(destino) != anterior.get('sha256')):
+        anterior = {}
+    if anterior.get('etag'):
+        cabecalhos['If-None-Match'] = anterior['etag']
+    if anterior.get('last_modified'):
+        cabecalhos['If-Modified-Since'] = anterior['last_modified']
+
+    async with sessao.get(fonte['url'], headers=cabecalhos) as resposta:
+        if resposta.status == 304:
+            return nome, 'sem alterações', anterior
+        resposta.raise_for_status()
+        conteudo = await resposta.read()
+        novo_estado = {
+            'url': fonte['url'],
+            'etag': resposta.headers.get('ETag'),
+            'last_modified': resposta.headers.get('Last-Modified'),
+        }
+
+    if fonte['processar'] is not None:
+        # Parsing é CPU: roda fora do event loop para não atrasar os downloads
+        conteudo = await asyncio.to_thread(fonte['processar'], conteudo)
+    relativo = relativo_tratado(fonte['destino'])
+    if relativo in armazenamento.ESQUEMAS:
+        # Só substitui o arquivo de `tratado/` se for lido com o esquema do dashboard
+        # (ErroEsquema vira 'erro: ...' desta fonte, sem tocar no arquivo atual)
+        await asyncio.to_thread(armazenamento.ler_csv, relativo, conteudo)
+
+    novo_estado['sha256'] = hashlib.sha256(conteudo).hexdigest()
+    if destino.exists() and armazenamento.hash_arquivo(destino) == novo_estado['sha256']:
+        return nome, 'sem alterações', novo_estado
+
+    gravar_atomico(destino, conteudo)
+    return nome, 'atualizada', novo_estado
+
+
+async def atualizar_fontes(fontes, raiz='.', caminho_estado=CAMINHO_ESTADO):
+    """Atualiza as fontes concorrentemente; retorna {nome: situação}"""
+    estado = carregar_estado(caminho_estado)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT_SEGUNDOS)
+    async with aiohttp.ClientSession(timeout=timeout) as sessao:
+        resultados = await asyncio.gather(
+            *(atualizar_fonte(sessao, nome, fonte, estado, raiz) for nome, fonte in fontes.items()),
+            return_exceptions=True
+        )
+
+    situacoes = {}
+    for nome, resultado in zip(fontes, resultados):
+        if isinstance(resultado, Exception):
+            situacoes[nome] = f'erro: {resultado}'
+            continue
+        _, situacao, novo_estado = resultado
+        estado[nome] = novo_estado
+        situacoes[nome] = situacao
+
+    gravar_atomico(caminho_estado, json.dumps(estado, indent=2, ensure_ascii=False).encode('utf-8'))
+    return situacoes
+
+
+def recompilar_alteradas(fontes, situacoes):
+    """Recompila os artefatos Parquet apenas das fontes de `tratado/` que mudaram"""
+    recompilados = []
+    for nome, situacao in situacoes.items():
+        relativo = relativo_tratado(fontes[nome]['destino'])
+        if situacao == 'atualizada' and relativo in armazenamento.ESQUEMAS:
+            recompilados.append(armazenamento.compilar_tabela(relativo))
+    return recompilados
+
+
+def converter_planilhas_alteradas(fontes, situacoes):
+    """Converte para `tratado/` apenas as planilhas do IBGE que mudaram (`etl_planilhas.py`)"""
+    atualizadas = {fontes[nome]['destino'] for nome, situacao in situacoes.items() if situacao == 'atualizada'}
+    planilhas = [nome for nome, planilha in etl_planilhas.PLANILHAS.items() if planilha['origem'] in atualizadas]
+    return etl_planilhas.executar_etl(planilhas) if planilhas else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('nomes', nargs='*', help=f"fontes a atualizar (padrão: todas com URL): {', '.join(FONTES)}")
+    parser.add_argument('--config', help='JSON com {nome da fonte: URL}')
+    parser.add_argument('--url', action='append', default=[], metavar='NOME=URL', help='URL de uma fonte')
+    args = parser.parse_args()
+
+    urls = {}
+    if args.config:
+        urls.update(json.loads(Path(args.config).read_text(encoding='utf-8')))
+    # Caminhos de `tratado/` e `compilado/` são relativos à raiz do projeto
+    os.chdir(Path(__file__).resolve().parent)
+    for item in args.url:
+        nome, _, url = item.partition('=')
+        urls[nome] = url
+
+    desconhecidas = (set(urls) | set(args.nomes)) - set(FONTES)
+    if desconhecidas:
+        parser.error(f"Fontes desconhecidas: {', '.join(sorted(desconhecidas))}")
+
+    fontes = {}
+    for nome, fonte in FONTES.items():
+        fonte = dict(fonte, url=urls.get(nome, fonte['url']))
+        if fonte['url'] and (not args.nomes or nome in args.nomes):
+            fontes[nome] = fonte
+
+    situacoes = asyncio.run(atualizar_fontes(fontes))
+    for nome, situacao in situacoes.items():
+        print(f"{nome}: {situacao}")
+    for artefato in recompilar_alteradas(fontes, situacoes):
+        print(f"Recompilado: {artefato}")
+    for nome, situacao in converter_planilhas_alteradas(fontes, situacoes).items():
+        situacoes[f'planilha {nome}'] = situacao
+        print(f"Planilha {nome}: {situacao}")
+
+    if any(situacao.startswith('erro') for situacao in situacoes.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
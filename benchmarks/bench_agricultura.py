@@ -0,0 +1,66 @@
+"""Benchmark de `process_agricultura_data` com tabelas municipais sintéticas.
+
+Gera tabelas no formato dos Censos 2006 e 2017 (com os nomes de faixas de
+área de cada ano) e mede o tempo de processamento de 10 mil a 1 milhão de
+linhas. O custo por linha deve ficar aproximadamente constante.
+
+Uso:
+    python benchmarks/bench_agricultura.py [--max-linhas 1000000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import streamlit.logger  # noqa: E402
+
+# Importar o dashboard fora do `streamlit run` gera avisos de "bare mode"
+streamlit.logger.set_log_level('error')
+
+from dados_sinteticos import FAIXAS_AREA, FAIXAS_AREA_CENSO_2006, gerar_censo  # noqa: E402
+from dashboard_ambiental import process_agricultura_data  # noqa: E402
+
+# Tolerância para o custo por linha entre o menor e o maior tamanho
+TOLERANCIA_LINEAR = 3.0
+
+
+def medir(n_linhas, repeticoes=3):
+    """Menor tempo de processamento para n_linhas por ano de censo"""
+    ag_2017 = gerar_censo(n_linhas, FAIXAS_AREA, semente=2017)
+    ag_2006 = gerar_censo(n_linhas, FAIXAS_AREA_CENSO_2006, semente=2006)
+
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        process_agricultura_data(ag_2017, ag_2006)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-linhas', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    tamanhos = [n for n in (10_000, 100_000, 1_000_000) if n <= args.max_linhas]
+    custos = []
+    print(f"{'linhas':>10} {'tempo (s)':>10} {'µs/linha':>10}")
+    for n in tamanhos:
+        tempo = medir(n)
+        custo = tempo / (2 * n) * 1e6
+        custos.append(custo)
+        print(f"{n:>10,} {tempo:>10.3f} {custo:>10.3f}")
+
+    razao = custos[-1] / custos[0]
+    print(f"Razão do custo por linha (maior/menor tamanho): {razao:.2f}")
+    if razao > TOLERANCIA_LINEAR:
+        print(f"❌ Crescimento acima do linear (tolerância {TOLERANCIA_LINEAR}x)")
+        sys.exit(1)
+    print("✅ Escala linear")
+
+
+if __name__ == '__main__':
+    main()
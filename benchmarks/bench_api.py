@@ -0,0 +1,120 @@
+"""Benchmark de vazão da API de dados (`api_dados.py`).
+
+Sobe a API com o uvicorn numa thread, numa porta livre, com os dados de
+`tratado/`, e dispara requisições de vários clientes (`http.client`, com
+conexões persistentes) durante alguns segundos em cada cenário: a primeira
+requisição de cada rota (cálculo e serialização), acertos do cache de
+respostas em JSON, com gzip e em Arrow, e revalidações com `If-None-Match`
+(304). Falha se algum cenário de cache ficar abaixo de MINIMO_REQUISICOES
+por segundo.
+
+Uso:
+    python benchmarks/bench_api.py [--clientes 8] [--segundos 3]
+"""
+import argparse
+import http.client
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import uvicorn  # noqa: E402
+
+import api_dados  # noqa: E402
+
+ROTAS = ['/indicadores', '/emissoes?ano=2022', '/prodes?inicio=2015&fim=2024',
+         '/industria/eficiencia?anos=2020,2021,2022', '/industria/setores', '/agricultura?ano=2017']
+
+# Vazão mínima (requisições por segundo) esperada nos cenários servidos pelo cache
+MINIMO_REQUISICOES = 200
+
+
+def porta_livre():
+    """Porta TCP livre na interface local"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def requisitar(conexao, rota, cabecalhos):
+    """Uma requisição GET; retorna (status, ETag)"""
+    conexao.request('GET', rota, headers=cabecalhos)
+    resposta = conexao.getresponse()
+    resposta.read()
+    return resposta.status, resposta.getheader('ETag')
+
+
+def medir_vazao(porta, cabecalhos_rota, clientes, segundos):
+    """Requisições por segundo com `clientes` threads percorrendo as rotas"""
+    total = [0] * clientes
+    fim = time.perf_counter() + segundos
+
+    def cliente(i):
+        conexao = http.client.HTTPConnection('127.0.0.1', porta)
+        while time.perf_counter() < fim:
+            for rota in ROTAS:
+                status, _ = requisitar(conexao, rota, cabecalhos_rota(rota))
+                if status not in (200, 304):
+                    raise RuntimeError(f"{rota}: HTTP {status}")
+                total[i] += 1
+        conexao.close()
+
+    threads = [threading.Thread(target=cliente, args=(i,)) for i in range(clientes)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(total) / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clientes', type=int, default=8)
+    parser.add_argument('--segundos', type=float, default=3)
+    args = parser.parse_args()
+
+    porta = porta_livre()
+    servidor = uvicorn.Server(uvicorn.Config(api_dados.app, host='127.0.0.1', port=porta, log_level='warning'))
+    thread = threading.Thread(target=servidor.run, daemon=True)
+    thread.start()
+    while not servidor.started:
+        time.sleep(0.05)
+
+    conexao = http.client.HTTPConnection('127.0.0.1', porta)
+    etags = {}
+    print(f"{'cenário':<32} {'resultado':>14}")
+    for rota in ROTAS:
+        inicio = time.perf_counter()
+        status, etags[rota] = requisitar(conexao, rota, {})
+        print(f"{'primeira ' + rota.split('?')[0]:<32} {(time.perf_counter() - inicio) * 1000:>11.1f} ms")
+        requisitar(conexao, rota, {'Accept': api_dados.TIPO_ARROW})
+    conexao.close()
+
+    cenarios = {
+        'cache (JSON)': lambda rota: {},
+        'cache (JSON + gzip)': lambda rota: {'Accept-Encoding': 'gzip'},
+        'cache (Arrow)': lambda rota: {'Accept': api_dados.TIPO_ARROW},
+        'revalidação (304)': lambda rota: {'If-None-Match': etags[rota]},
+    }
+    lentos = []
+    for nome, cabecalhos_rota in cenarios.items():
+        vazao = medir_vazao(porta, cabecalhos_rota, args.clientes, args.segundos)
+        print(f"{nome:<32} {vazao:>9,.0f} req/s")
+        if vazao < MINIMO_REQUISICOES:
+            lentos.append(nome)
+
+    servidor.should_exit = True
+    thread.join()
+    if lentos:
+        print(f"❌ Abaixo de {MINIMO_REQUISICOES} req/s: {', '.join(lentos)}")
+        sys.exit(1)
+    print(f"✅ Todos os cenários de cache acima de {MINIMO_REQUISICOES} req/s")
+
+
+if __name__ == '__main__':
+    main()
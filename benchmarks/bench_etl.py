@@ -0,0 +1,122 @@
+"""Benchmark da conversão das planilhas do IBGE (`etl_planilhas.py`).
+
+Gera, num diretório temporário, as três planilhas no formato das originais
+com uma linha por município (Censos 2006 e 2017) e por atividade × ano
+(PIA-Empresa), e mede a conversão em série (um processo), em paralelo (um
+processo por planilha) e a segunda execução, em que as planilhas sem
+alterações são puladas pelo hash.
+
+Uso:
+    python benchmarks/bench_etl.py [--municipios 1000 5570]
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import openpyxl
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import etl_planilhas  # noqa: E402
+
+FAIXAS_2006 = ['Menos de 2 ha', '2 a menos de 5 ha', '5 a menos de 10 ha', '10 a menos de 20 ha',
+               '20 a menos de 50 ha', '50 a menos de 100 ha', '100 ha e mais']
+FAIXAS_2017 = ['Mais de 0 a menos de 0,1 ha', 'De 0,1 a menos de 0,2 ha', 'De 0,2 a menos de 0,5 ha',
+               'De 0,5 a menos de 1 ha', 'De 1 a menos de 2 ha', 'De 2 a menos de 3 ha',
+               'De 3 a menos de 4 ha', 'De 4 a menos de 5 ha', 'De 5 a menos de 10 ha',
+               'De 10 a menos de 20 ha', 'De 20 a menos de 50 ha', 'De 50 a menos de 100 ha',
+               'De 100 a menos de 200 ha', 'De 200 a menos de 500 ha', 'De 500 a menos de 1.000 ha',
+               'De 1.000 a menos de 2.500 ha', 'De 2.500 a menos de 10.000 ha', 'De 10.000 ha e mais',
+               'Produtor sem área']
+COLUNAS_INDUSTRIA = ['Número de empresas (Unidades)', 'Receita - total (Mil Reais)',
+                     'Receita líquida de vendas - total (Mil Reais)', 'Valor bruto da produção industrial (Mil Reais)']
+
+
+def gravar_planilha(caminho, linhas):
+    """Grava uma planilha com a aba 'Tabela' (modo write-only do openpyxl)"""
+    pasta = openpyxl.Workbook(write_only=True)
+    aba = pasta.create_sheet('Tabela')
+    for linha in linhas:
+        aba.append(linha)
+    pasta.save(caminho)
+
+
+def valores(aleatorio, n):
+    """n contagens aleatórias, com alguns zeros absolutos ('-')"""
+    return [aleatorio.choice(['-', aleatorio.randint(1, 10_000)]) for _ in range(n)]
+
+
+def montar_planilhas(diretorio, municipios, semente=0):
+    """Grava as planilhas sintéticas e o complemento de 2006 com a agricultura não familiar"""
+    aleatorio = random.Random(semente)
+    raiz = Path(diretorio)
+    (raiz / 'dados_brutos').mkdir()
+    regioes = [f'Município {i:05d}' for i in range(municipios)]
+
+    linhas = [['Município', 'Tipo de agricultor', 'Total', *FAIXAS_2006]]
+    for regiao in regioes:
+        linhas.append([regiao, 'Total', aleatorio.randint(1, 10_000), *valores(aleatorio, len(FAIXAS_2006))])
+        for tipo in 'ABCD':
+            linhas.append([None, f'Familiar - tipo {tipo}', *valores(aleatorio, len(FAIXAS_2006) + 1)])
+        linhas.append([None, 'Agriculltor não familiar', *['-'] * (len(FAIXAS_2006) + 1)])
+    gravar_planilha(raiz / 'dados_brutos/dados_agricultura_2006.xlsx', linhas)
+
+    complemento = raiz / etl_planilhas.PLANILHAS['agricultura_2006']['complemento']
+    with open(complemento, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f, lineterminator='\n')
+        escritor.writerow(['Região', 'Tipo', *etl_planilhas.FAIXAS_2006, 'Total'])
+        for regiao in regioes:
+            escritor.writerow([regiao, 'Agricultura não familiar',
+                               *(aleatorio.randint(0, 10_000) for _ in range(len(etl_planilhas.FAIXAS_2006) + 1))])
+
+    linhas = [['Município', 'Tipologia', 'Total', *FAIXAS_2017]]
+    for regiao in regioes:
+        for tipo in ['Total', 'Agricultura familiar - não', 'Agricultura familiar - sim']:
+            linhas.append([regiao, tipo, *valores(aleatorio, len(FAIXAS_2017) + 1)])
+    gravar_planilha(raiz / 'dados_brutos/dados_agricultura_2017.xlsx', linhas)
+
+    linhas = [['Ano', 'Classificação Nacional de Atividades Econômicas (CNAE 2.0)', *COLUNAS_INDUSTRIA]]
+    for ano in range(2007, 2023):
+        linhas.append([ano, 'Total', *valores(aleatorio, len(COLUNAS_INDUSTRIA))])
+        for atividade in range(municipios // 4):
+            linhas.append([ano, f'{atividade:05d} Atividade {atividade}', *valores(aleatorio, len(COLUNAS_INDUSTRIA))])
+    gravar_planilha(raiz / 'dados_brutos/dados_industriais.xlsx', linhas)
+
+
+def medir(processos, forcar):
+    """Tempo de uma execução do ETL no diretório atual"""
+    inicio = time.perf_counter()
+    situacoes = etl_planilhas.executar_etl(forcar=forcar, processos=processos)
+    if any(situacao.startswith('erro') for situacao in situacoes.values()):
+        raise RuntimeError(situacoes)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--municipios', type=int, nargs='+', default=[1000, 5570])
+    args = parser.parse_args()
+
+    print(f"{'municípios':>10} {'em série':>10} {'paralelo':>10} {'sem alterações':>15}")
+    anterior = os.getcwd()
+    for municipios in args.municipios:
+        with tempfile.TemporaryDirectory() as diretorio:
+            montar_planilhas(diretorio, municipios)
+            os.chdir(diretorio)
+            try:
+                serie = medir(processos=1, forcar=True)
+                paralelo = medir(processos=len(etl_planilhas.PLANILHAS), forcar=True)
+                pulado = medir(processos=None, forcar=False)
+            finally:
+                os.chdir(anterior)
+        print(f"{municipios:>10,} {serie:>9.2f}s {paralelo:>9.2f}s {pulado:>14.3f}s")
+
+
+if __name__ == '__main__':
+    main()
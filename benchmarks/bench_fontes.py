@@ -0,0 +1,139 @@
+"""Atualização das fontes (`atualizar_fontes.py`) contra um servidor HTTP local.
+
+Sobe, numa porta livre, um servidor (aiohttp) que serve as páginas e
+exportações de `benchmarks/fixtures_fontes/` no lugar do INPE, do
+TerraBrasilis e do SEEG, com ETag, Last-Modified e respostas 304, e um atraso
+fixo por requisição. Grava num diretório temporário e mede:
+
+- a primeira atualização (todas as fontes baixadas e gravadas);
+- a repetição, em que todas as fontes respondem 304;
+- a troca por páginas num formato equivalente (anos como "1.988"), que não
+  regrava nada;
+- páginas inválidas (tabela sem anos, sem colunas de UF, cabeçalho do SEEG
+  inesperado, célula do SEEG que não é número), que devem terminar em erro
+  sem alterar os arquivos gravados.
+
+Confere que o CSV do PRODES extraído da página é igual ao de `tratado/`.
+
+Uso:
+    python benchmarks/bench_fontes.py [--atraso-ms 200]
+"""
+import argparse
+import asyncio
+import hashlib
+import socket
+import sys
+import tempfile
+import time
+from email.utils import formatdate
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from aiohttp import web  # noqa: E402
+
+import armazenamento  # noqa: E402
+from atualizar_fontes import FONTES, atualizar_fontes  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures_fontes'
+
+# Arquivo servido para cada fonte em cada cenário
+CENARIOS = [
+    ('primeira', {'prodes': 'prodes.html', 'prodes_municipios': 'prodes_municipios.csv',
+                  'seeg_brutas': 'seeg_brutas.csv'}, 'atualizada'),
+    ('repetida (304)', {'prodes': 'prodes.html', 'prodes_municipios': 'prodes_municipios.csv',
+                        'seeg_brutas': 'seeg_brutas.csv'}, 'sem alterações'),
+    ('anos como 1.988', {'prodes': 'prodes_anos_com_ponto.html'}, 'sem alterações'),
+    ('tabela sem anos', {'prodes': 'prodes_sem_anos.html'}, 'erro'),
+    ('tabela sem UF', {'prodes': 'prodes_sem_uf.html'}, 'erro'),
+    ('SEEG inválido', {'seeg_brutas': 'seeg_invalido.csv'}, 'erro'),
+    ('SEEG com n/d', {'seeg_brutas': 'seeg_celula_invalida.csv'}, 'erro'),
+]
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def criar_servidor(atraso, contagem):
+    """Aplicação que serve os arquivos de FIXTURES com requisições condicionais"""
+    async def servir(requisicao):
+        await asyncio.sleep(atraso)
+        caminho = FIXTURES / requisicao.match_info['nome']
+        if not caminho.is_file():
+            raise web.HTTPNotFound()
+        conteudo = caminho.read_bytes()
+        etag = f'"{hashlib.sha256(conteudo).hexdigest()[:16]}"'
+        cabecalhos = {'ETag': etag, 'Last-Modified': formatdate(caminho.stat().st_mtime, usegmt=True)}
+        if requisicao.headers.get('If-None-Match') == etag:
+            contagem['304'] += 1
+            return web.Response(status=304, headers=cabecalhos)
+        contagem['200'] += 1
+        return web.Response(body=conteudo, headers=cabecalhos)
+
+    app = web.Application()
+    app.router.add_get('/{nome}', servir)
+    return app
+
+
+async def executar(atraso):
+    contagem = {'200': 0, '304': 0}
+    porta = porta_livre()
+    executor = web.AppRunner(criar_servidor(atraso, contagem))
+    await executor.setup()
+    await web.TCPSite(executor, '127.0.0.1', porta).start()
+
+    falhas = []
+    try:
+        with tempfile.TemporaryDirectory() as raiz:
+            estado = Path(raiz) / 'estado_fontes.json'
+            print(f"{'cenário':<18} {'fontes':>6} {'tempo':>9} {'200':>5} {'304':>5}  situação")
+            for nome, arquivos, esperado in CENARIOS:
+                fontes = {fonte: dict(FONTES[fonte], url=f'http://127.0.0.1:{porta}/{arquivo}')
+                          for fonte, arquivo in arquivos.items()}
+                hashes = {fonte: armazenamento.hash_arquivo(Path(raiz) / FONTES[fonte]['destino'])
+                          for fonte in fontes if (Path(raiz) / FONTES[fonte]['destino']).exists()}
+                antes = dict(contagem)
+                inicio = time.perf_counter()
+                situacoes = await atualizar_fontes(fontes, raiz, estado)
+                tempo = time.perf_counter() - inicio
+
+                resumo = ', '.join(sorted({situacao.split(':')[0] for situacao in situacoes.values()}))
+                print(f"{nome:<18} {len(fontes):>6} {tempo * 1000:>7.0f}ms {contagem['200'] - antes['200']:>5} "
+                      f"{contagem['304'] - antes['304']:>5}  {resumo}")
+                if any(not situacao.startswith(esperado) for situacao in situacoes.values()):
+                    falhas.append(f"{nome}: esperado '{esperado}', obtido {situacoes}")
+                # Uma fonte com erro não pode ter alterado o arquivo já gravado
+                for fonte, anterior in hashes.items():
+                    destino = Path(raiz) / FONTES[fonte]['destino']
+                    if situacoes[fonte].startswith('erro') and armazenamento.hash_arquivo(destino) != anterior:
+                        falhas.append(f"{nome}: '{fonte}' foi regravada apesar do erro")
+
+            extraido = (Path(raiz) / FONTES['prodes']['destino']).read_text(encoding='utf-8')
+            atual = (armazenamento.DIRETORIO_TRATADO / 'desmatamento/taxa_prodes_1988_2024-tratado.csv')
+            if extraido.strip() != (RAIZ / atual).read_text(encoding='utf-8').strip():
+                falhas.append("O CSV do PRODES extraído da página difere do de tratado/")
+    finally:
+        await executor.cleanup()
+    return falhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--atraso-ms', type=float, default=200, help='atraso do servidor por requisição')
+    args = parser.parse_args()
+
+    falhas = asyncio.run(executar(args.atraso_ms / 1000))
+    for falha in falhas:
+        print(f"❌ {falha}")
+    if falhas:
+        sys.exit(1)
+    print(f"✅ Todos os cenários com o resultado esperado (atraso de {args.atraso_ms:.0f}ms por requisição: "
+          f"as fontes são baixadas ao mesmo tempo)")
+
+
+if __name__ == '__main__':
+    main()
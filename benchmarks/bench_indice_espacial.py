@@ -0,0 +1,113 @@
+"""Benchmark do índice espacial dos avisos do DETER (`indice_espacial.py`) × varredura.
+
+Gera polígonos aleatórios (avisos de até alguns km²) espalhados pela Amazônia
+Legal, guardados em WKB como no dataset de `get_data_amz.py`, e mede:
+
+- a montagem do índice (STRtree sobre as caixas envolventes);
+- consultas por caixa (um estado, um município) e por polígono irregular
+  (recorte de um município ou de uma unidade de conservação);
+- a mesma consulta testando todos os polígonos com `shapely.intersects`,
+  decodificando o WKB (varredura) e com os polígonos já decodificados.
+
+Confere que o índice e a varredura encontram os mesmos avisos.
+
+Uso:
+    python benchmarks/bench_indice_espacial.py [--avisos 100000 1000000] [--repeticoes 20]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from indice_espacial import IndiceAlertas  # noqa: E402
+
+# Extensão aproximada da Amazônia Legal (graus)
+EXTENSAO = (-74.0, -18.0, -44.0, 5.3)
+
+
+def gerar_avisos(n, rng):
+    """Atributos, caixas e WKB de `n` polígonos aleatórios"""
+    xmin, ymin, xmax, ymax = EXTENSAO
+    centros = np.column_stack([rng.uniform(xmin, xmax, n), rng.uniform(ymin, ymax, n)])
+    # Raio de ~50 m a ~3 km; 8 vértices com raios diferentes, para não serem regulares
+    angulos = np.linspace(0, 2 * np.pi, 9)[:-1]
+    raios = rng.gamma(2.0, 0.005, (n, 1)) * rng.uniform(0.6, 1.0, (n, 8))
+    vertices = centros[:, np.newaxis, :] + raios[..., np.newaxis] * np.stack([np.cos(angulos), np.sin(angulos)], axis=1)
+    poligonos = shapely.polygons(np.concatenate([vertices, vertices[:, :1]], axis=1))
+    atributos = pd.DataFrame({
+        'fid': np.arange(n),
+        'view_date': pd.Timestamp('2016-08-01') + pd.to_timedelta(rng.integers(0, 3300, n), unit='D'),
+        'classname': pd.Categorical.from_codes(rng.integers(0, 3, n), ['DESMATAMENTO_CR', 'DEGRADACAO', 'MINERACAO']),
+        'uf': pd.Categorical.from_codes(rng.integers(0, 9, n), ['AC', 'AM', 'AP', 'MA', 'MT', 'PA', 'RO', 'RR', 'TO']),
+        'municipality': pd.Categorical.from_codes(rng.integers(0, 800, n), [f'Município {i}' for i in range(800)]),
+        'geocodibge': rng.integers(1100000, 1800000, n),
+        'uc': pd.Categorical.from_codes(np.full(n, -1), ['UC']),
+        'areamunkm': shapely.area(poligonos) * 12321,
+    })
+    return atributos, shapely.bounds(poligonos), shapely.to_wkb(poligonos)
+
+
+def regioes(rng):
+    """Regiões de consulta: caixas de um estado e de um município e polígonos irregulares"""
+    municipio = shapely.buffer(shapely.Point(-52.0, -6.0), 0.6, quad_segs=16)
+    contorno = shapely.get_coordinates(municipio)[:-1]
+    contorno = contorno + rng.normal(0, 0.08, contorno.shape)
+    municipio = shapely.make_valid(shapely.Polygon(contorno))
+    return {
+        'caixa estado': (-58.0, -9.0, -46.0, 2.0),
+        'caixa município': (-52.5, -6.5, -51.5, -5.5),
+        'polígono município': municipio,
+        'polígono UC': shapely.Polygon([(-62, -4), (-60, -3.2), (-59.5, -4.8), (-60.5, -5.5), (-61.8, -5.1)]),
+    }
+
+
+def medir(funcao, repeticoes):
+    """Mediana do tempo de `funcao` (segundos) e o último resultado"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return float(np.median(tempos)), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--avisos', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in args.avisos:
+        atributos, caixas, wkb = gerar_avisos(n, rng)
+        inicio = time.perf_counter()
+        indice = IndiceAlertas(atributos, caixas, wkb)
+        tempo_montagem = time.perf_counter() - inicio
+        geometrias = shapely.from_wkb(wkb)
+        print(f"\n{n:,} avisos: índice montado em {tempo_montagem:.2f}s, "
+              f"{indice.nbytes / 2 ** 20:.0f} MB (WKB {sum(map(len, wkb)) / 2 ** 20:.0f} MB)")
+        print(f"{'consulta':<20} {'avisos':>8} {'índice':>10} {'varredura WKB':>14} "
+              f"{'decodificados':>14} {'ganho':>8}")
+
+        for nome, regiao in regioes(rng).items():
+            geometria = shapely.box(*regiao) if isinstance(regiao, tuple) else regiao
+            tempo_indice, encontrados = medir(lambda: indice.consultar(regiao), args.repeticoes)
+            tempo_varredura, varredura = medir(
+                lambda: np.flatnonzero(shapely.intersects(geometria, shapely.from_wkb(wkb))), 1)
+            tempo_decodificados, decodificados = medir(
+                lambda: np.flatnonzero(shapely.intersects(geometria, geometrias)), 3)
+            if not (np.array_equal(encontrados, varredura) and np.array_equal(encontrados, decodificados)):
+                raise AssertionError(f"'{nome}': o índice e a varredura encontraram avisos diferentes")
+            print(f"{nome:<20} {len(encontrados):>8,} {tempo_indice * 1000:>8.2f}ms {tempo_varredura * 1000:>12.0f}ms "
+                  f"{tempo_decodificados * 1000:>12.0f}ms {tempo_decodificados / tempo_indice:>7.0f}×")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Benchmark da inicialização a frio do dashboard.
+
+Cada medição roda num processo Python novo, como um worker recém-criado:
+
+- importação: tempo para importar o Streamlit e `dashboard_ambiental.py`;
+- primeira renderização: execução completa da página (seções 4 e 5 abertas)
+  pelo `AppTest`, sem e com o pré-aquecimento de `servidor.py` antes;
+- compartilhada: primeira renderização de um worker novo depois que outro
+  worker já preencheu o cache compartilhado (`cache_compartilhado.py`);
+- memória: pico de memória residente (RSS) do processo ao final.
+
+Cada medição usa um diretório de cache compartilhado novo e vazio, exceto
+na etapa "compartilhada", em que um worker anterior o preenche.
+
+Uso:
+    python benchmarks/bench_inicializacao.py [--repeticoes 3]
+"""
+import argparse
+import json
+import resource
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+PAGINA = RAIZ / 'dashboard_ambiental.py'
+
+ETAPAS = ['importacao', 'renderizacao', 'preaquecida', 'compartilhada']
+
+
+def pico_rss_mb():
+    """Pico de memória residente do processo atual (MB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def medir_etapa(etapa):
+    """Executa uma etapa no processo atual; retorna os tempos (s) e o pico de RSS"""
+    sys.path.insert(0, str(RAIZ))
+    resultado = {}
+
+    inicio = time.perf_counter()
+    import streamlit.logger
+    streamlit.logger.set_log_level('error')
+    resultado['streamlit'] = time.perf_counter() - inicio
+
+    if etapa == 'importacao':
+        inicio = time.perf_counter()
+        import dashboard_ambiental  # noqa: F401
+        resultado['dashboard'] = time.perf_counter() - inicio
+    else:
+        from streamlit.testing.v1 import AppTest
+
+        if etapa == 'preaquecida':
+            import servidor
+            inicio = time.perf_counter()
+            servidor.preaquecer_pagina()
+            resultado['preaquecimento'] = time.perf_counter() - inicio
+
+        app = AppTest.from_file(str(PAGINA), default_timeout=300)
+        app.session_state['secao_desmatamento'] = True
+        app.session_state['secao_agricultura'] = True
+        inicio = time.perf_counter()
+        app.run()
+        resultado['primeira_renderizacao'] = time.perf_counter() - inicio
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+
+    resultado['rss_mb'] = pico_rss_mb()
+    return resultado
+
+
+def executar_etapa(etapa):
+    """Mede uma etapa num processo novo, com o cache compartilhado vazio"""
+    with tempfile.TemporaryDirectory() as diretorio_cache:
+        ambiente = {**os.environ, 'DASHBOARD_CACHE': 'disco', 'DASHBOARD_CACHE_DIR': diretorio_cache}
+
+        def executar(nome):
+            saida = subprocess.run(
+                [sys.executable, __file__, '--etapa', nome],
+                cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True
+            )
+            return json.loads(saida.stdout.strip().splitlines()[-1])
+
+        if etapa == 'compartilhada':
+            # Um primeiro worker preenche o cache; mede-se o seguinte
+            executar('renderizacao')
+            return executar('renderizacao')
+        return executar(etapa)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--etapa', choices=ETAPAS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.etapa:
+        print(json.dumps(medir_etapa(args.etapa)))
+        return
+
+    for etapa in ETAPAS:
+        # Menor tempo entre as repetições; o RSS é o da mesma execução
+        medicoes = [executar_etapa(etapa) for _ in range(args.repeticoes)]
+        chave = 'dashboard' if etapa == 'importacao' else 'primeira_renderizacao'
+        melhor = min(medicoes, key=lambda medicao: medicao[chave])
+        print(f"{etapa}:")
+        for nome, valor in melhor.items():
+            unidade = 'MB' if nome == 'rss_mb' else 's'
+            print(f"  {nome:<24} {valor:>8.3f} {unidade}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark da memória por worker com a representação compacta dos dados.
+
+Para cada fator de escala, grava um `tratado/` sintético e os agregados do
+DETER num diretório temporário (`dados_sinteticos.py`) e, num processo novo
+para cada representação, carrega todas as tabelas e mede a memória residente
+(RSS) antes e depois, além da memória das próprias tabelas:
+
+- inferida: `pd.read_csv`/`pd.read_parquet` com inferência de tipos (textos
+  repetidos em cada linha, inteiros em int64), como antes dos esquemas;
+- compacta: `carregar_tabela` e `carregar_agregados` (categóricas com
+  dicionário de termos compartilhado, inteiros em int32 quando cabem).
+
+Uso:
+    python benchmarks/bench_memoria.py [--fatores 10 100 1000]
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import armazenamento  # noqa: E402
+from agregados_deter import (CHAVES_AGREGADOS, agregar_alertas, caminho_agregado,  # noqa: E402
+                             carregar_agregados, gravar_agregados)
+from instrumentacao import rss_atual_mb  # noqa: E402
+
+REPRESENTACOES = ['inferida', 'compacta']
+DIRETORIO_DETER = 'deter'
+
+
+def carregar(representacao):
+    """Todas as tabelas do diretório atual na representação pedida"""
+    relativos = [relativo for relativo in armazenamento.ESQUEMAS
+                 if (armazenamento.DIRETORIO_TRATADO / relativo).exists()]
+    if representacao == 'inferida':
+        tabelas = {relativo: pd.read_csv(armazenamento.DIRETORIO_TRATADO / relativo) for relativo in relativos}
+        tabelas.update({nome: pd.read_parquet(caminho_agregado(DIRETORIO_DETER, nome))
+                        for nome in CHAVES_AGREGADOS})
+        return tabelas
+
+    tabelas = {relativo: armazenamento.carregar_tabela(relativo) for relativo in relativos}
+    tabelas.update(carregar_agregados(DIRETORIO_DETER))
+    return tabelas
+
+
+def medir(representacao):
+    """Mede a representação no processo atual (chamado num processo novo)"""
+    gc.collect()
+    antes = rss_atual_mb()
+    tabelas = carregar(representacao)
+    gc.collect()
+    depois = rss_atual_mb()
+    memoria = armazenamento.memoria_tabelas(tabelas)
+    return {'rss_antes_mb': antes, 'rss_depois_mb': depois, 'tabelas_mb': float(memoria['MB'].sum())}
+
+
+def executar(representacao, diretorio):
+    """Mede uma representação num processo novo, com `diretorio` como raiz dos dados"""
+    saida = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), '--medir', representacao],
+        cwd=diretorio, capture_output=True, text=True, check=True
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fatores', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--medir', choices=REPRESENTACOES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir(args.medir)))
+        return
+
+    # Só o processo principal gera os dados (o gerador importa o dashboard)
+    from dados_sinteticos import gerar_alertas_deter, montar_tratado
+
+    print(f"{'fator':>7} {'representação':<14} {'RSS antes':>12} {'RSS depois':>12} {'tabelas':>12}")
+    for fator in args.fatores:
+        with tempfile.TemporaryDirectory() as diretorio:
+            montar_tratado(diretorio, fator)
+            anterior = os.getcwd()
+            os.chdir(diretorio)
+            try:
+                armazenamento.compilar_tratado(forcar=True)
+                gravar_agregados(DIRETORIO_DETER, agregar_alertas(gerar_alertas_deter(fator)))
+            finally:
+                os.chdir(anterior)
+
+            for representacao in REPRESENTACOES:
+                resultado = executar(representacao, diretorio)
+                print(f"{fator:>6}x {representacao:<14} {resultado['rss_antes_mb']:>9.1f} MB "
+                      f"{resultado['rss_depois_mb']:>9.1f} MB {resultado['tabelas_mb']:>9.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""Benchmark de todas as etapas do dashboard com dados sintéticos ampliados.
+
+Para cada fator de escala (10× a 10.000× os dados distribuídos com o
+projeto), grava um `tratado/` sintético num diretório temporário
+(`dados_sinteticos.py`) e mede, etapa por etapa:
+
+- carregamento: leitura dos CSVs, compilação em Parquet e leitura do Parquet;
+- processamento: `process_*`, cubo de emissões, matriz esparsa do PRODES
+  municipal (montagem e ranking), métricas industriais e o motor de
+  tendências (estados, municípios e meses × municípios do DETER) e as
+  correlações defasadas entre PRODES e SEEG;
+- figuras: cada função `create_*`, incluindo a serialização em JSON, e o
+  tamanho do JSON enviado ao navegador;
+- DETER: agregação dos avisos e as figuras da seção de avisos.
+
+O tempo é o menor de algumas repetições; o pico de memória é medido numa
+execução separada, com `tracemalloc`. Os resultados são comparados com
+`benchmarks/baseline.json`; o script termina com erro se alguma etapa ficar
+mais lenta, usar mais memória ou gerar figuras maiores que a tolerância
+permite. Roda sem rede.
+
+Uso:
+    python benchmarks/bench_pipeline.py [--fatores 10 100 1000] [--etapas heatmap cubo]
+    python benchmarks/bench_pipeline.py --gravar-baseline   # após uma mudança intencional
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import plotly.io as pio
+
+# Importado primeiro: põe a raiz do projeto no sys.path e silencia o Streamlit
+from dados_sinteticos import gerar_alertas_deter, mapear_atividades, montar_tratado
+
+import armazenamento
+import dashboard_ambiental as d
+from agregados_deter import agregar_alertas, mesclar_agregados
+from correlacoes import MotorCorrelacoes
+from cubo_emissoes import TABELAS_SEEG, CuboEmissoes
+from matriz_prodes import MatrizProdes
+from metricas_industriais import calcular_eficiencia_anual, calcular_metricas_setores
+from tendencias import MotorTendencias
+
+CAMINHO_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+FATORES_PADRAO = [10, 100, 1000]
+
+# Regressão: mais lento que TOLERANCIA_TEMPO × baseline (e mais que
+# MINIMO_SEGUNDOS de diferença, para ignorar ruído em etapas rápidas) ou mais
+# memória que TOLERANCIA_MEMORIA × baseline (e mais que MINIMO_MB a mais)
+TOLERANCIA_TEMPO = 2.0
+MINIMO_SEGUNDOS = 0.01
+TOLERANCIA_MEMORIA = 1.25
+MINIMO_MB = 1.0
+# Figuras: JSON maior que TOLERANCIA_PAYLOAD × baseline
+TOLERANCIA_PAYLOAD = 1.25
+
+
+def figura_json(funcao, *args, **kwargs):
+    """Constrói e serializa uma figura, como o cache de figuras do dashboard"""
+    fig = funcao(*args, **kwargs)
+    return None if fig is None else pio.to_json(fig, validate=False)
+
+
+def resumo_tendencias(motor, janela_anos=5):
+    """Motor completo (todos os métodos) no último período, com a tendência dos dez últimos anos"""
+    janela = janela_anos * motor.periodos_por_ano
+    inicio = motor.periodos[max(len(motor.periodos) - 10 * motor.periodos_por_ano, 0)]
+    for metodo in ('variacao', 'tendencia'):
+        motor.calcular(metodo, janela)
+    return motor.resumo(inicio, motor.periodos[-1], janela)
+
+
+def preparar_etapas(fator):
+    """Etapas do pipeline para os dados sintéticos do diretório atual
+
+    Retorna {nome: função sem argumentos}. As entradas de cada etapa são
+    calculadas aqui, fora da medição.
+    """
+    relativos = [relativo for relativo in armazenamento.ESQUEMAS
+                 if (armazenamento.DIRETORIO_TRATADO / relativo).exists()]
+    armazenamento.compilar_tratado(forcar=True)
+
+    ag_2017 = armazenamento.carregar_tabela(d.ARQUIVO_AGRICULTURA_2017)
+    ag_2006 = armazenamento.carregar_tabela(d.ARQUIVO_AGRICULTURA_2006)
+    combined_ag, _ = d.process_agricultura_data(ag_2017, ag_2006)
+    prodes = armazenamento.carregar_tabela(d.ARQUIVO_PRODES)
+    prodes_municipios = armazenamento.carregar_tabela(d.ARQUIVO_PRODES_MUNICIPIOS)
+    matriz_estados = MatrizProdes.de_tabela_estados(prodes)
+    matriz_municipios = MatrizProdes.de_tabela_municipios(prodes_municipios)
+    anos_municipios = matriz_municipios.anos
+    industria = armazenamento.carregar_tabela(d.ARQUIVO_INDUSTRIA)
+    seeg = {nome: armazenamento.carregar_tabela(relativo) for nome, relativo in TABELAS_SEEG.items()}
+    seeg_long = {nome: d.process_emissoes_data(tabela) for nome, tabela in seeg.items()}
+    cubo = CuboEmissoes(seeg_long)
+    emissoes_long = cubo.long('brutas')
+
+    anos_industria = sorted(industria['Ano'].unique())[-3:]
+    anos_prodes = sorted(prodes['Ano/Estados'].unique())
+    eficiencia = calcular_eficiencia_anual(industria, cubo.totais_por_ano(cubo.anos))
+    mapeamento = mapear_atividades(industria)
+    metricas = calcular_metricas_setores(industria, emissoes_long, anos_industria, mapeamento)
+
+    alertas = gerar_alertas_deter(fator)
+    agregados = agregar_alertas(alertas)
+    anos_deter = sorted(agregados['dia_uf_classe']['view_date'].dt.year.unique())
+    # Mesmos tipos de `carregar_agregados`
+    for df in agregados.values():
+        for coluna in ('uf', 'classname', 'municipality'):
+            if coluna in df.columns:
+                df[coluna] = df[coluna].astype('category')
+        armazenamento.reduzir_inteiros(df)
+    armazenamento.compartilhar_categorias(*agregados.values())
+    diario = agregados['dia_uf_classe']
+    diario['mes'] = diario['view_date'].dt.to_period('M').dt.to_timestamp()
+    periodo_deter = {'start_year': anos_deter[0], 'end_year': anos_deter[-1]}
+    motor_estados = MotorTendencias.de_tabela_estados(prodes)
+    motor_correlacoes = MotorCorrelacoes.de_fontes(motor_estados, cubo)
+
+    return {
+        'carregar_csv': lambda: [armazenamento.ler_csv(relativo) for relativo in relativos],
+        'compilar_parquet': lambda: armazenamento.compilar_tratado(forcar=True),
+        'carregar_parquet': lambda: [armazenamento.carregar_tabela(relativo) for relativo in relativos],
+        'process_agricultura_data': lambda: d.process_agricultura_data(ag_2017, ag_2006),
+        'process_emissoes_data': lambda: [d.process_emissoes_data(tabela) for tabela in seeg.values()],
+        'cubo_emissoes': lambda: CuboEmissoes(seeg_long),
+        'calcular_metricas_setores': lambda: calcular_metricas_setores(industria, emissoes_long, anos_industria,
+                                                                       mapeamento),
+        'calcular_eficiencia_anual': lambda: calcular_eficiencia_anual(industria, cubo.totais_por_ano(cubo.anos)),
+        'treemap': lambda: figura_json(d.create_treemap_setores_degradacao, cubo,
+                                       cubo.anos_disponiveis('brutas')[-1]),
+        'barras_eficiencia': lambda: figura_json(d.create_barras_agrupadas_eficiencia_ambiental, metricas),
+        'linha_eficiencia': lambda: figura_json(d.create_linha_eficiencia_ambiental, eficiencia,
+                                                list(eficiencia.index)),
+        'matriz_prodes': lambda: MatrizProdes.de_tabela_municipios(prodes_municipios),
+        'ranking_prodes': lambda: matriz_municipios.ranking(anos_municipios[-10], anos_municipios[-1]),
+        'heatmap': lambda: figura_json(d.create_heatmap_desmatamento_regional, matriz_estados,
+                                       anos_prodes[0], anos_prodes[-1]),
+        'heatmap_municipios': lambda: figura_json(d.create_heatmap_desmatamento_regional, matriz_municipios,
+                                                  anos_municipios[0], anos_municipios[-1]),
+        'tendencias_estados': lambda: resumo_tendencias(MotorTendencias.de_tabela_estados(prodes)),
+        'tendencias_municipios': lambda: resumo_tendencias(MotorTendencias.de_matriz_prodes(matriz_municipios)),
+        'tendencias_deter': lambda: resumo_tendencias(
+            MotorTendencias.de_agregados_mes(agregados['mes_municipio_classe']), janela_anos=1),
+        'serie_tendencias': lambda: figura_json(d.create_serie_tendencias, motor_estados, 'zscore', 5,
+                                                ['AMZ LEGAL'], anos_prodes[0], anos_prodes[-1]),
+        'correlacoes': lambda: MotorCorrelacoes.de_fontes(motor_estados, cubo).ranking(*d.DEFASAGENS_PADRAO),
+        'heatmap_correlacoes': lambda: figura_json(d.create_heatmap_correlacoes, motor_correlacoes, 'brutas',
+                                                   'AMZ LEGAL', *d.DEFASAGENS_PADRAO),
+        'violin': lambda: figura_json(d.create_violin_agricultura_familiar, combined_ag),
+        'sunburst': lambda: figura_json(d.create_sunburst_agricultura_familiar, combined_ag, 2017),
+        'agregar_alertas_deter': lambda: mesclar_agregados(agregar_alertas(alertas)),
+        'serie_deter': lambda: figura_json(d.create_serie_alertas_deter, agregados['dia_uf_classe'],
+                                           'Mensal', 'Classe', [], **periodo_deter),
+        'ranking_deter': lambda: figura_json(d.create_ranking_municipios_deter,
+                                             agregados['mes_municipio_classe'], [], **periodo_deter),
+    }
+
+
+def medir_tempo(funcao, repeticoes):
+    """Menor tempo (s) entre as repetições"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def medir_memoria(funcao):
+    """Pico de memória alocada (MB) durante uma execução e o retorno da função"""
+    tracemalloc.start()
+    try:
+        saida = funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico / 2**20, saida
+
+
+def executar(fatores, filtro_etapas=None, repeticoes=3):
+    """Mede todas as etapas em cada fator; retorna {'fator:etapa': resultado}"""
+    resultados = {}
+    diretorio_original = os.getcwd()
+    for fator in fatores:
+        with tempfile.TemporaryDirectory(prefix=f'bench_{fator}x_') as diretorio:
+            montar_tratado(diretorio, fator)
+            # `armazenamento` usa caminhos relativos (`tratado/`, `compilado/`)
+            os.chdir(diretorio)
+            try:
+                etapas = preparar_etapas(fator)
+                for etapa, funcao in etapas.items():
+                    if filtro_etapas and etapa not in filtro_etapas:
+                        continue
+                    segundos = medir_tempo(funcao, repeticoes)
+                    pico_mb, saida = medir_memoria(funcao)
+                    resultado = {'segundos': round(segundos, 6), 'pico_mb': round(pico_mb, 3)}
+                    # Etapas de figura retornam o JSON enviado ao navegador
+                    if isinstance(saida, str):
+                        resultado['payload_kb'] = round(len(saida) / 1024, 1)
+                    payload = f"{resultado['payload_kb']:>10.1f} KB" if 'payload_kb' in resultado else ''
+                    resultados[f'{fator}:{etapa}'] = resultado
+                    print(f"{fator:>6}x {etapa:<28} {resultado['segundos']:>10.4f} s "
+                          f"{resultado['pico_mb']:>10.1f} MB{payload}", flush=True)
+            finally:
+                os.chdir(diretorio_original)
+    return resultados
+
+
+def comparar(resultados, baseline):
+    """Etapas com regressão em relação à baseline: lista de mensagens"""
+    regressoes = []
+    for chave, atual in resultados.items():
+        referencia = baseline.get(chave)
+        if referencia is None:
+            continue
+        if (atual['segundos'] > referencia['segundos'] * TOLERANCIA_TEMPO and
+                atual['segundos'] - referencia['segundos'] > MINIMO_SEGUNDOS):
+            regressoes.append(f"{chave}: {atual['segundos']:.4f} s (baseline {referencia['segundos']:.4f} s)")
+        if (atual['pico_mb'] > referencia['pico_mb'] * TOLERANCIA_MEMORIA and
+                atual['pico_mb'] - referencia['pico_mb'] > MINIMO_MB):
+            regressoes.append(f"{chave}: {atual['pico_mb']:.1f} MB (baseline {referencia['pico_mb']:.1f} MB)")
+        if ('payload_kb' in atual and 'payload_kb' in referencia and
+                atual['payload_kb'] > referencia['payload_kb'] * TOLERANCIA_PAYLOAD):
+            regressoes.append(f"{chave}: {atual['payload_kb']:.1f} KB (baseline {referencia['payload_kb']:.1f} KB)")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fatores', type=int, nargs='+', default=FATORES_PADRAO,
+                        help='fatores de escala sobre os dados do projeto (até 10000)')
+    parser.add_argument('--etapas', nargs='+', help='mede apenas estas etapas')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--baseline', default=CAMINHO_BASELINE, type=Path)
+    parser.add_argument('--gravar-baseline', action='store_true',
+                        help='grava os resultados como nova baseline em vez de comparar')
+    args = parser.parse_args()
+
+    print(f"{'fator':>7} {'etapa':<28} {'tempo':>12} {'pico':>13} {'figura':>13}")
+    resultados = executar(args.fatores, args.etapas, args.repeticoes)
+
+    if args.gravar_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8')) if args.baseline.exists() else {}
+        baseline.update(resultados)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+        print(f"Baseline gravada em {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print("Sem baseline para comparar (use --gravar-baseline).")
+        return
+    regressoes = comparar(resultados, json.loads(args.baseline.read_text(encoding='utf-8')))
+    if regressoes:
+        print("❌ Regressões em relação à baseline:")
+        for mensagem in regressoes:
+            print(f"  {mensagem}")
+        sys.exit(1)
+    print("✅ Nenhuma regressão em relação à baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark do motor de tendências (`tendencias.py`) × um laço por local.
+
+Gera séries aleatórias em tamanhos crescentes, de estados × anos (a tabela
+do PRODES) até municípios × meses (agregados mensais do DETER), e mede:
+
+- o motor: média móvel, variação anual, z-score e tendência de todos os
+  locais de uma vez, mais o resumo do último período;
+- o mesmo cálculo com pandas, um local por vez (`rolling` e `polyfit` por
+  série), como no cálculo por estado com `iloc`. Nos tamanhos grandes o laço
+  roda só sobre os primeiros MAXIMO_LOCAIS_LACO locais e o tempo é
+  extrapolado (marcado com ~);
+- o resumo repetido, servido pelos resultados já guardados no motor.
+
+Confere que o motor e o laço dão os mesmos valores nos locais medidos.
+
+Uso:
+    python benchmarks/bench_tendencias.py [--janela-anos 5]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from tendencias import MotorTendencias  # noqa: E402
+
+# (nome, períodos, locais, períodos por ano)
+TAMANHOS = [
+    ('estados × anos', 37, 10, 1),
+    ('municípios × anos', 37, 5570, 1),
+    ('municípios × meses', 240, 5570, 12),
+]
+
+# Locais calculados pelo laço antes de extrapolar o tempo
+MAXIMO_LOCAIS_LACO = 300
+
+
+def inclinacao(y):
+    """Inclinação da reta de mínimos quadrados de uma janela"""
+    return np.polyfit(np.arange(len(y)), y, 1)[0]
+
+
+def calcular_laco(valores, janela, periodos_por_ano):
+    """Mesmas estatísticas do motor, local por local"""
+    resultados = {'media_movel': [], 'variacao_percentual': [], 'zscore': [], 'tendencia': []}
+    for coluna in range(valores.shape[1]):
+        serie = pd.Series(valores[:, coluna])
+        anteriores = serie.shift(1).rolling(janela)
+        resultados['media_movel'].append(serie.rolling(janela).mean())
+        resultados['variacao_percentual'].append(serie.pct_change(periodos_por_ano, fill_method=None) * 100)
+        resultados['zscore'].append((serie - anteriores.mean()) / anteriores.std(ddof=0))
+        resultados['tendencia'].append(serie.rolling(janela).apply(inclinacao, raw=True) * periodos_por_ano)
+    return {metodo: np.column_stack(series).astype('float64') for metodo, series in resultados.items()}
+
+
+def calcular_motor(motor, janela):
+    """Todas as estatísticas e o resumo do último período"""
+    resultados = {metodo: motor.calcular(metodo, None if metodo == 'variacao_percentual' else janela)
+                  for metodo in ('media_movel', 'variacao_percentual', 'zscore', 'tendencia')}
+    motor.resumo(motor.periodos[0], motor.periodos[-1], janela)
+    return resultados
+
+
+def conferir(motor_resultados, laco_resultados):
+    """Falha se o motor e o laço divergirem nos locais calculados pelos dois"""
+    for metodo, esperado in laco_resultados.items():
+        obtido = motor_resultados[metodo][:, :esperado.shape[1]]
+        esperado = np.where(np.isinf(esperado), np.nan, esperado)
+        if not np.allclose(obtido, esperado, rtol=1e-6, atol=1e-6, equal_nan=True):
+            raise AssertionError(f"'{metodo}' diverge do cálculo por local")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--janela-anos', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'tamanho':<20} {'células':>10} {'motor':>10} {'laço por local':>15} {'ganho':>8} {'repetido':>10}")
+    for nome, n_periodos, n_locais, periodos_por_ano in TAMANHOS:
+        valores = rng.gamma(0.5, 20, size=(n_periodos, n_locais))
+        janela = args.janela_anos * periodos_por_ano if n_periodos > args.janela_anos * periodos_por_ano else 2
+
+        inicio = time.perf_counter()
+        motor = MotorTendencias(np.arange(n_periodos), [f'Local {i}' for i in range(n_locais)], valores,
+                                periodos_por_ano)
+        motor_resultados = calcular_motor(motor, janela)
+        tempo_motor = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        calcular_motor(motor, janela)
+        tempo_repetido = time.perf_counter() - inicio
+
+        locais_laco = min(n_locais, MAXIMO_LOCAIS_LACO)
+        inicio = time.perf_counter()
+        laco_resultados = calcular_laco(valores[:, :locais_laco], janela, periodos_por_ano)
+        tempo_laco = (time.perf_counter() - inicio) * n_locais / locais_laco
+        conferir(motor_resultados, laco_resultados)
+
+        estimado = '~' if locais_laco < n_locais else ' '
+        print(f"{nome:<20} {n_periodos * n_locais:>10,} {tempo_motor * 1000:>8.1f}ms "
+              f"{estimado}{tempo_laco:>12.2f}s {tempo_laco / tempo_motor:>7.0f}× {tempo_repetido * 1000:>8.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""Geradores de dados sintéticos no esquema dos arquivos de `tratado/`.
+
+Cada gerador amplia um conjunto de dados por um fator de escala: mais
+municípios (Censo Agropecuário), mais estados e anos (PRODES), mais
+municípios e anos (PRODES municipal, esparso), mais
+categorias e anos (SEEG), mais atividades e anos (PIA-Empresa) e mais
+avisos (DETER). Os nomes reais (regiões, estados da Amazônia Legal,
+setores do SEEG e atividades da CNAE) são mantidos, para que as funções do
+dashboard encontrem o que esperam. Os dados são determinísticos para uma
+mesma semente.
+"""
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import streamlit.logger  # noqa: E402
+
+# Importar o dashboard fora do `streamlit run` gera avisos de "bare mode"
+streamlit.logger.set_log_level('error')
+
+from armazenamento import COLUNA_CNAE  # noqa: E402
+from dashboard_ambiental import FAIXAS_AREA, FAIXAS_AREA_2006  # noqa: E402
+from metricas_industriais import COLUNA_EMPRESAS, COLUNA_RECEITA, MAPEAMENTO_CNAE_SEEG  # noqa: E402
+
+TIPOS = ['Agricultura familiar', 'Agricultura não familiar', 'Total']
+
+# Faixas de área com os nomes usados no Censo 2006
+FAIXAS_AREA_CENSO_2006 = [
+    next((antigo for antigo, novo in FAIXAS_AREA_2006.items() if novo == faixa), faixa)
+    for faixa in FAIXAS_AREA
+]
+
+REGIOES = ['Brasil', 'Norte', 'Nordeste', 'Sudeste', 'Sul', 'Centro-Oeste']
+ESTADOS_AMZ = ['AC', 'AM', 'AP', 'MA', 'MT', 'PA', 'RO', 'RR', 'TO']
+SETORES_SEEG = ['Mudança de Uso da Terra e Floresta', 'Agropecuária', 'Energia',
+                'Processos Industriais']
+CLASSES_DETER = ['DESMATAMENTO_CR', 'DESMATAMENTO_VEG', 'DEGRADACAO', 'CICATRIZ_DE_QUEIMADA',
+                 'CS_DESORDENADO', 'CS_GEOMETRICO', 'MINERACAO']
+
+# Tamanho dos dados distribuídos com o projeto (fator 1)
+ANOS_PRODES = 36
+MUNICIPIOS_PRODES = 800
+ANOS_PRODES_MUNICIPIOS = 37
+# Fração das células ano × município com desmatamento
+DENSIDADE_PRODES_MUNICIPIOS = 0.1
+ANOS_SEEG = 34
+ANOS_INDUSTRIA = 16
+AVISOS_DETER = 1_000
+
+
+def _escala(base, fator):
+    """Tamanho de uma dimensão quando o fator se divide entre duas dimensões"""
+    return max(base, round(base * math.sqrt(fator)))
+
+
+def gerar_censo(n_linhas, faixas=FAIXAS_AREA, semente=0):
+    """Tabela de estabelecimentos por região/município, tipo e faixa de área"""
+    rng = np.random.default_rng(semente)
+    n_municipios = -(-n_linhas // len(TIPOS))
+    nomes = REGIOES + [f'Município {i:06d}' for i in range(max(n_municipios - len(REGIOES), 0))]
+    municipios = np.array(nomes[:n_municipios])
+    dados = {
+        'Região': pd.Categorical(np.repeat(municipios, len(TIPOS))[:n_linhas]),
+        'Tipo': pd.Categorical(np.tile(TIPOS, n_municipios)[:n_linhas], categories=TIPOS),
+    }
+    valores = rng.integers(0, 5000, size=(n_linhas, len(faixas)))
+    for i, faixa in enumerate(faixas):
+        dados[faixa] = valores[:, i]
+    dados['Total'] = valores.sum(axis=1)
+    return pd.DataFrame(dados)
+
+
+def gerar_prodes(fator, semente=0):
+    """Taxa anual de desmatamento por estado: mais estados e mais anos"""
+    rng = np.random.default_rng(semente)
+    n_anos = _escala(ANOS_PRODES, fator)
+    n_estados = _escala(len(ESTADOS_AMZ), fator)
+    estados = ESTADOS_AMZ + [f'E{i:04d}' for i in range(n_estados - len(ESTADOS_AMZ))]
+    valores = rng.integers(0, 10_000, size=(n_anos, len(estados)))
+    df = pd.DataFrame(valores, columns=estados)
+    df.insert(0, 'Ano/Estados', np.arange(1988, 1988 + n_anos))
+    df['AMZ LEGAL'] = valores.sum(axis=1)
+    return df
+
+
+def gerar_prodes_municipios(fator, semente=0):
+    """Área desmatada por ano e município em formato longo, só com células não nulas"""
+    rng = np.random.default_rng(semente)
+    n_anos = _escala(ANOS_PRODES_MUNICIPIOS, fator)
+    n_municipios = _escala(MUNICIPIOS_PRODES, fator)
+    celulas = np.unique(rng.integers(0, n_anos * n_municipios,
+                                     size=int(n_anos * n_municipios * DENSIDADE_PRODES_MUNICIPIOS)))
+    municipios = celulas % n_municipios
+    return pd.DataFrame({
+        'Ano': 1988 + celulas // n_municipios,
+        'UF': np.array(ESTADOS_AMZ)[municipios % len(ESTADOS_AMZ)],
+        'Município': np.array([f'Município {i:05d}' for i in range(n_municipios)])[municipios],
+        'Código IBGE': 1_100_000 + municipios,
+        'Área (km²)': rng.exponential(5.0, size=len(celulas)).round(2),
+    })
+
+
+def gerar_seeg(fator, semente=0):
+    """Emissões por categoria (linhas) e ano (colunas): mais categorias e mais anos"""
+    rng = np.random.default_rng(semente)
+    n_anos = _escala(ANOS_SEEG, fator)
+    n_categorias = _escala(len(SETORES_SEEG), fator)
+    categorias = SETORES_SEEG + [f'Categoria {i:04d}' for i in range(n_categorias - len(SETORES_SEEG))]
+    valores = rng.uniform(1e6, 2e9, size=(n_categorias, n_anos)).astype('float32')
+    df = pd.DataFrame(valores, columns=[str(ano) for ano in range(1990, 1990 + n_anos)])
+    df.insert(0, 'Categoria', categorias)
+    return df
+
+
+def gerar_industria(fator, semente=0):
+    """PIA-Empresa por atividade da CNAE e ano: mais atividades e mais anos"""
+    rng = np.random.default_rng(semente)
+    n_anos = _escala(ANOS_INDUSTRIA, fator)
+    n_atividades = _escala(len(MAPEAMENTO_CNAE_SEEG), fator)
+    atividades = list(MAPEAMENTO_CNAE_SEEG) + [
+        f'Atividade {i:04d}' for i in range(n_atividades - len(MAPEAMENTO_CNAE_SEEG))
+    ]
+    anos = np.arange(2007, 2007 + n_anos)
+    linhas = len(anos) * len(atividades)
+    df = pd.DataFrame({
+        'Ano': np.repeat(anos, len(atividades)),
+        COLUNA_CNAE: np.tile(atividades, len(anos)),
+        COLUNA_EMPRESAS: rng.integers(10, 5_000, size=linhas),
+        COLUNA_RECEITA: rng.integers(10**5, 10**9, size=linhas),
+    })
+    totais = df.groupby('Ano', as_index=False)[[COLUNA_EMPRESAS, COLUNA_RECEITA]].sum()
+    totais[COLUNA_CNAE] = 'Total'
+    return pd.concat([totais, df], ignore_index=True)[df.columns].sort_values('Ano', kind='stable')
+
+
+def mapear_atividades(industria):
+    """Mapeamento CNAE → setor de emissão que cobre também as atividades sintéticas"""
+    setores = sorted(set(MAPEAMENTO_CNAE_SEEG.values()))
+    atividades = sorted(set(industria[COLUNA_CNAE].astype(str)) - set(MAPEAMENTO_CNAE_SEEG) - {'Total'})
+    mapeamento = dict(MAPEAMENTO_CNAE_SEEG)
+    mapeamento.update({atividade: setores[i % len(setores)] for i, atividade in enumerate(atividades)})
+    return mapeamento
+
+
+def gerar_alertas_deter(fator, semente=0):
+    """Avisos do DETER já normalizados (como em `get_data_amz.normalizar_lote`)"""
+    rng = np.random.default_rng(semente)
+    n = AVISOS_DETER * fator
+    n_municipios = max(50, n // 200)
+    municipios = np.array([f'Município {i:05d}' for i in range(n_municipios)])
+    indice_municipio = rng.integers(0, n_municipios, size=n)
+    datas = pd.Timestamp('2016-08-01') + pd.to_timedelta(rng.integers(0, 3_000, size=n), unit='D')
+    return pd.DataFrame({
+        'fid': [f'{i:09d}' for i in range(n)],
+        'classname': rng.choice(CLASSES_DETER, size=n),
+        'view_date': datas.date,
+        'areamunkm': rng.exponential(0.5, size=n).astype('float32'),
+        'municipality': municipios[indice_municipio],
+        'geocodibge': (1_100_000 + indice_municipio).astype('int32'),
+        'uf': np.array(ESTADOS_AMZ)[indice_municipio % len(ESTADOS_AMZ)],
+    })
+
+
+def montar_tratado(diretorio, fator, semente=0):
+    """Grava em `diretorio/tratado/` os CSVs sintéticos de todas as fontes"""
+    tratado = Path(diretorio) / 'tratado'
+    n_linhas_censo = len(REGIOES) * len(TIPOS) * fator
+    arquivos = {
+        'dados agricultura/dados-agricultura-2017.csv': gerar_censo(n_linhas_censo, FAIXAS_AREA, semente),
+        'dados agricultura/dados-agricultura-2006.csv': gerar_censo(n_linhas_censo, FAIXAS_AREA_CENSO_2006,
+                                                                   semente + 1),
+        'dados industria/dados-industriais.csv': gerar_industria(fator, semente),
+        'desmatamento/taxa_prodes_1988_2024-tratado.csv': gerar_prodes(fator, semente),
+        'desmatamento/prodes_municipios.csv': gerar_prodes_municipios(fator, semente),
+        'desmatamento/seeg/emissões_brutas.csv': gerar_seeg(fator, semente),
+        'desmatamento/seeg/emissões_liquidas.csv': gerar_seeg(fator, semente + 1),
+        'desmatamento/seeg/emissão_metano.csv': gerar_seeg(fator, semente + 2),
+        'desmatamento/seeg/categoria_emissora_no_setor_de_energia.csv': gerar_seeg(fator, semente + 3),
+    }
+    for relativo, df in arquivos.items():
+        caminho = tratado / relativo
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(caminho, index=False)
+    return tratado
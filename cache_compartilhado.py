@@ -0,0 +1,372 @@
+"""Cache compartilhado entre processos (workers e réplicas) do dashboard.
+
+O `st.cache_data` e o cache de figuras valem só dentro de um processo: cada
+réplica atrás do balanceador relê os CSVs e recalcula as tabelas derivadas.
+Este cache fica abaixo deles e guarda o resultado serializado num backend
+comum, de modo que N workers façam cada cálculo uma única vez:
+
+- `BackendDisco` (padrão): arquivos num diretório local, lidos com memory
+  map e gravados de forma atômica, com descarte dos menos usados quando o
+  total passa do limite de tamanho;
+- `BackendRedis`: qualquer cliente compatível com Redis (`get`, `set`,
+  `delete`); o limite de tamanho fica a cargo do servidor (`maxmemory` com
+  `maxmemory-policy allkeys-lru`).
+
+As entradas são endereçadas pelo conteúdo: a chave combina o SHA-256 dos
+arquivos de origem, os parâmetros e a versão do código do projeto. Uma trava
+por chave faz os demais workers esperarem o cálculo em andamento em vez de
+repeti-lo. Os valores são serializados com `pickle`, como no `st.cache_data`:
+o diretório e o servidor Redis devem ser de confiança.
+
+Configuração por variáveis de ambiente:
+    DASHBOARD_CACHE=disco|nenhum|redis://host:6379/0   (padrão: disco)
+    DASHBOARD_CACHE_DIR=compilado/cache                (backend em disco)
+    DASHBOARD_CACHE_MB=512                             (backend em disco)
+"""
+import functools
+import hashlib
+import inspect
+import logging
+import mmap
+import os
+import pickle
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: a trava vale só dentro do processo
+    fcntl = None
+
+from armazenamento import DIRETORIO_COMPILADO, versao_dados
+from instrumentacao import INSTRUMENTACAO
+
+VARIAVEL_BACKEND = 'DASHBOARD_CACHE'
+VARIAVEL_DIRETORIO = 'DASHBOARD_CACHE_DIR'
+VARIAVEL_TAMANHO = 'DASHBOARD_CACHE_MB'
+
+DIRETORIO_PADRAO = DIRETORIO_COMPILADO / 'cache'
+TAMANHO_PADRAO_MB = 512
+
+RAIZ = Path(__file__).resolve().parent
+
+logger = logging.getLogger(__name__)
+
+# Marca de entrada ausente (None é um resultado válido, p.ex. figura sem dados)
+_AUSENTE = object()
+
+
+def normalizar_parametro(valor):
+    """Converte um parâmetro de widget em um valor hashable e canônico"""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        # A ordem de seleção num multiselect não altera a análise
+        return tuple(sorted(normalizar_parametro(item) for item in valor))
+    return valor
+
+
+@functools.lru_cache(maxsize=1)
+def versao_codigo():
+    """Hash dos módulos do projeto: resultados de outra versão do código não são reaproveitados"""
+    digest = hashlib.sha256()
+    for caminho in sorted(RAIZ.glob('*.py')):
+        digest.update(caminho.name.encode())
+        digest.update(caminho.read_bytes())
+    return digest.hexdigest()
+
+
+class BackendDisco:
+    """Entradas em arquivos de um diretório local, com limite de tamanho total"""
+
+    SUFIXO = '.pkl'
+
+    def __init__(self, diretorio=DIRETORIO_PADRAO, tamanho_maximo=TAMANHO_PADRAO_MB * 2**20):
+        self.diretorio = Path(diretorio)
+        self.tamanho_maximo = tamanho_maximo
+        self._travas = {}
+        self._trava_travas = threading.Lock()
+
+    def _caminho(self, chave):
+        return self.diretorio / (chave + self.SUFIXO)
+
+    def obter(self, chave):
+        """Conteúdo da entrada mapeado em memória, ou None se ausente"""
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, 'rb') as arquivo:
+                if os.fstat(arquivo.fileno()).st_size == 0:
+                    return None
+                conteudo = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        # Uso recente: a data de modificação é a ordem de descarte
+        os.utime(caminho)
+        return conteudo
+
+    def gravar(self, chave, valor):
+        """Grava uma entrada (escrita atômica) e descarta as mais antigas se preciso"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        caminho = self._caminho(chave)
+        temporario = caminho.with_name(f'{caminho.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        temporario.write_bytes(valor)
+        os.replace(temporario, caminho)
+        self._limitar_tamanho()
+
+    def _limitar_tamanho(self):
+        """Remove as entradas usadas há mais tempo até caber no limite"""
+        entradas = []
+        total = 0
+        for entrada in os.scandir(self.diretorio):
+            if entrada.name.endswith(self.SUFIXO):
+                try:
+                    estado = entrada.stat()
+                except FileNotFoundError:  # descartada por outro processo
+                    continue
+                entradas.append((estado.st_mtime_ns, estado.st_size, entrada.path))
+                total += estado.st_size
+        if total <= self.tamanho_maximo:
+            return
+        for _, tamanho, caminho in sorted(entradas):
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                continue
+            total -= tamanho
+            if total <= self.tamanho_maximo:
+                break
+
+    @contextmanager
+    def trava(self, chave):
+        """Exclusão mútua por chave entre os processos da máquina (flock)
+
+        O arquivo `.trava` só existe enquanto alguém usa a chave: o dono o
+        remove antes de soltar a trava. Quem esperava nele obtém o `flock` de
+        um arquivo que já não está no diretório, percebe pela comparação com
+        o caminho e tenta de novo; assim as travas de chaves de versões
+        antigas não se acumulam.
+        """
+        if fcntl is None:
+            with self._trava_travas:
+                trava = self._travas.setdefault(chave, threading.Lock())
+            with trava:
+                yield
+            return
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        caminho = self.diretorio / f'{chave}.trava'
+        while True:
+            # Cada abertura é uma descrição de arquivo própria: também exclui threads
+            arquivo = open(caminho, 'a+b')
+            try:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+                try:
+                    atual = os.stat(caminho)
+                except FileNotFoundError:
+                    atual = None
+            except BaseException:
+                arquivo.close()
+                raise
+            if atual is not None and os.path.samestat(atual, os.fstat(arquivo.fileno())):
+                break
+            arquivo.close()  # removido pelo dono anterior enquanto esperávamos
+        try:
+            yield
+        finally:
+            try:
+                os.remove(caminho)
+            finally:
+                arquivo.close()  # solta o flock
+
+    def limpar(self):
+        """Remove todas as entradas (as travas em uso ficam, ver `trava`)"""
+        if not self.diretorio.exists():
+            return
+        for entrada in os.scandir(self.diretorio):
+            if entrada.name.endswith(self.SUFIXO):
+                try:
+                    os.remove(entrada.path)
+                except FileNotFoundError:
+                    continue
+
+    def __repr__(self):
+        return f'BackendDisco({str(self.diretorio)!r}, {self.tamanho_maximo // 2**20} MB)'
+
+
+class BackendRedis:
+    """Entradas num servidor compatível com Redis, por meio de um cliente com `get`/`set`/`delete`"""
+
+    def __init__(self, cliente, prefixo='dashboard:', ttl_segundos=None, espera_trava=120):
+        self.cliente = cliente
+        self.prefixo = prefixo
+        self.ttl_segundos = ttl_segundos
+        self.espera_trava = espera_trava
+
+    @classmethod
+    def de_url(cls, url, **opcoes):
+        """Backend a partir de uma URL `redis://` (requer o pacote `redis`)"""
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("O backend Redis requer o pacote `redis` (pip install redis)") from e
+        return cls(redis.Redis.from_url(url), **opcoes)
+
+    def obter(self, chave):
+        return self.cliente.get(self.prefixo + chave)
+
+    def gravar(self, chave, valor):
+        self.cliente.set(self.prefixo + chave, valor, ex=self.ttl_segundos)
+
+    @contextmanager
+    def trava(self, chave):
+        """Trava com `SET NX` e expiração; após `espera_trava` segue sem ela"""
+        nome = f'{self.prefixo}trava:{chave}'
+        token = os.urandom(16).hex().encode()
+        limite = time.monotonic() + self.espera_trava
+        obtida = False
+        while not obtida and time.monotonic() < limite:
+            obtida = bool(self.cliente.set(nome, token, nx=True, px=int(self.espera_trava * 1000)))
+            if not obtida:
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if obtida and self.cliente.get(nome) == token:
+                self.cliente.delete(nome)
+
+    def limpar(self):
+        """Remove todas as entradas com o prefixo"""
+        for nome in self.cliente.scan_iter(match=self.prefixo + '*'):
+            self.cliente.delete(nome)
+
+    def __repr__(self):
+        return f'BackendRedis({self.prefixo!r})'
+
+
+def backend_do_ambiente():
+    """Backend configurado nas variáveis de ambiente (None desativa o cache)"""
+    configuracao = os.environ.get(VARIAVEL_BACKEND, 'disco')
+    if configuracao == 'nenhum':
+        return None
+    if configuracao.startswith(('redis://', 'rediss://', 'unix://')):
+        return BackendRedis.de_url(configuracao)
+    return BackendDisco(
+        os.environ.get(VARIAVEL_DIRETORIO, DIRETORIO_PADRAO),
+        int(float(os.environ.get(VARIAVEL_TAMANHO, TAMANHO_PADRAO_MB)) * 2**20)
+    )
+
+
+class CacheCompartilhado:
+    """Resultados calculados uma vez e reaproveitados por todos os processos"""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.acertos = 0
+        self.falhas = 0
+        self.erros = 0
+
+    def _ler(self, chave):
+        try:
+            conteudo = self.backend.obter(chave)
+            if conteudo is None:
+                return _AUSENTE
+            valor = pickle.loads(conteudo)
+            if isinstance(conteudo, mmap.mmap):
+                conteudo.close()
+            return valor
+        except Exception as e:
+            # Um backend indisponível não derruba o dashboard: vira um cálculo local
+            self.erros += 1
+            logger.warning("Cache compartilhado indisponível (%s): %s", self.backend, e)
+            return _AUSENTE
+
+    def _gravar(self, chave, valor):
+        try:
+            self.backend.gravar(chave, pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            self.erros += 1
+            logger.warning("Falha ao gravar no cache compartilhado (%s): %s", self.backend, e)
+
+    @contextmanager
+    def _trava(self, chave):
+        """Trava do backend; se indisponível, segue sem exclusão mútua"""
+        with ExitStack() as pilha:
+            try:
+                pilha.enter_context(self.backend.trava(chave))
+            except Exception as e:
+                self.erros += 1
+                logger.warning("Trava do cache compartilhado indisponível (%s): %s", self.backend, e)
+            yield
+
+    def calcular_uma_vez(self, identificacao, calcular):
+        """Valor de `calcular()` para a `identificacao` dada, calculado uma vez entre os processos
+
+        `identificacao` é qualquer valor com `repr` estável que identifique o
+        resultado (função, versões dos dados, parâmetros); a versão do código
+        é acrescentada aqui.
+        """
+        if self.backend is None:
+            return calcular()
+
+        chave = hashlib.sha256(repr((versao_codigo(), identificacao)).encode()).hexdigest()
+        with INSTRUMENTACAO.span('compartilhado:ler'):
+            valor = self._ler(chave)
+        if valor is _AUSENTE:
+            # Outro worker pode estar calculando: espera e confere de novo
+            with self._trava(chave):
+                valor = self._ler(chave)
+                if valor is _AUSENTE:
+                    self.falhas += 1
+                    INSTRUMENTACAO.contar_cache('compartilhado', False)
+                    valor = calcular()
+                    with INSTRUMENTACAO.span('compartilhado:gravar'):
+                        self._gravar(chave, valor)
+                    return valor
+        self.acertos += 1
+        INSTRUMENTACAO.contar_cache('compartilhado', True)
+        return valor
+
+    def obter(self, funcao, dados, fontes, **parametros):
+        """Resultado de `funcao(*dados, **parametros)`, compartilhado entre os processos
+
+        Como em `CacheFiguras.obter`, `dados` não entra na chave: ela usa o
+        conteúdo dos arquivos de `fontes` (relativos a `tratado/`) de onde os
+        dados vêm, além dos parâmetros.
+        """
+        parametros = {nome: normalizar_parametro(valor) for nome, valor in parametros.items()}
+        identificacao = (funcao.__module__, funcao.__qualname__, versao_dados(*fontes),
+                         tuple(sorted(parametros.items())))
+        return self.calcular_uma_vez(identificacao, lambda: funcao(*dados, **parametros))
+
+    def memorizar(self, *fontes, dados=()):
+        """Decorador: compartilha os resultados de uma função que lê os arquivos `fontes`
+
+        Os argumentos nomeados em `dados` (DataFrames derivados das fontes) não
+        entram na chave; os demais sim.
+        """
+        def decorar(funcao):
+            assinatura = inspect.signature(funcao)
+
+            @functools.wraps(funcao)
+            def compartilhada(*args, **kwargs):
+                argumentos = assinatura.bind(*args, **kwargs)
+                argumentos.apply_defaults()
+                parametros = {nome: normalizar_parametro(valor)
+                              for nome, valor in argumentos.arguments.items() if nome not in dados}
+                identificacao = (funcao.__module__, funcao.__qualname__, versao_dados(*fontes),
+                                 tuple(sorted(parametros.items())))
+                return self.calcular_uma_vez(identificacao, lambda: funcao(*args, **kwargs))
+            return compartilhada
+        return decorar
+
+    def limpar(self):
+        """Remove todas as entradas do backend"""
+        if self.backend is not None:
+            self.backend.limpar()
+
+
+# Instância compartilhada pelas sessões do processo
+CACHE_COMPARTILHADO = CacheCompartilhado(backend_do_ambiente())
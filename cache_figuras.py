@@ -0,0 +1,94 @@
+"""Cache LRU de figuras Plotly já construídas.
+
+As funções `create_*` do dashboard são caras de executar e de serializar.
+O cache guarda cada figura (`go.Figure`), indexada pela função, pelos
+parâmetros normalizados (ano, período, anos selecionados) e pela versão dos
+dados de origem, de modo que um rerun que não altera esses valores não
+reconstrói a figura. Guardar o objeto, e não o JSON, importa: de um dict, o
+`st.plotly_chart` monta e valida de novo um `go.Figure` a cada exibição; de
+uma figura, só a converte e serializa. Numa falha local, o JSON é buscado no
+cache compartilhado entre processos (`cache_compartilhado.py`) antes de
+construir, e a figura é montada a partir dele uma vez por processo.
+"""
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+from cache_compartilhado import CACHE_COMPARTILHADO, normalizar_parametro
+from instrumentacao import INSTRUMENTACAO
+
+
+class CacheFiguras:
+    """Figuras Plotly com descarte LRU"""
+
+    def __init__(self, tamanho_maximo=128, compartilhado=CACHE_COMPARTILHADO):
+        self.tamanho_maximo = tamanho_maximo
+        self.compartilhado = compartilhado
+        self.acertos = 0
+        self.falhas = 0
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, funcao, dados, versao_dados, **parametros):
+        """Figura de `funcao(*dados, **parametros)`, construída só na primeira chamada
+
+        `dados` não entra na chave: quem chama informa `versao_dados`, que muda
+        sempre que os arquivos de origem mudam. Retorna None se a função não
+        produzir figura. A figura é compartilhada entre as sessões e não deve
+        ser alterada por quem a recebe.
+        """
+        parametros = {nome: normalizar_parametro(valor) for nome, valor in parametros.items()}
+        chave = (funcao.__module__, funcao.__qualname__, versao_dados,
+                 tuple(sorted(parametros.items())))
+
+        with self._trava:
+            acerto = chave in self._entradas
+            if acerto:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                fig = self._entradas[chave]
+            else:
+                self.falhas += 1
+        INSTRUMENTACAO.contar_cache('figuras', acerto)
+        if acerto:
+            return fig
+
+        construidas = []
+
+        def construir():
+            fig = funcao(*dados, **parametros)
+            construidas.append(fig)
+            with INSTRUMENTACAO.span(f'serializar:{funcao.__qualname__}'):
+                return None if fig is None else pio.to_json(fig, validate=False)
+
+        if self.compartilhado is None:
+            fig = funcao(*dados, **parametros)
+        else:
+            fig_json = self.compartilhado.calcular_uma_vez(('figura',) + chave, construir)
+            if construidas:
+                fig = construidas[0]
+            elif fig_json is None:
+                fig = None
+            else:
+                # Calculada por outro processo: valida o JSON uma vez, aqui
+                with INSTRUMENTACAO.span(f'desserializar:{funcao.__qualname__}'):
+                    fig = pio.from_json(fig_json)
+
+        with self._trava:
+            self._entradas[chave] = fig
+            while len(self._entradas) > self.tamanho_maximo:
+                self._entradas.popitem(last=False)
+        return fig
+
+    def limpar(self):
+        """Descarta todas as figuras"""
+        with self._trava:
+            self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+# Instância compartilhada pelas sessões do processo (o módulo sobrevive aos reruns)
+CACHE_FIGURAS = CacheFiguras()
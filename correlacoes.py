@@ -0,0 +1,179 @@
+"""Correlações defasadas entre o desmatamento (PRODES) e as emissões (SEEG).
+
+Alinha, pelo ano, cada série do PRODES (estados e Amazônia Legal) com cada
+série do SEEG (cada categoria de cada tabela do cubo de emissões, mais o
+total da tabela) e calcula, para todas as defasagens de um intervalo:
+
+- a correlação de Pearson entre o desmatamento do ano t - k e as emissões do
+  ano t;
+- a elasticidade das emissões em relação ao desmatamento: inclinação da
+  regressão de log(emissões) em log(desmatamento), ou seja, a variação %
+  das emissões associada a 1% a mais de área desmatada;
+- o número de anos usados em cada par.
+
+Tudo sai de produtos matriciais (defasagens × locais × séries do SEEG) sobre
+as matrizes de anos alinhadas, considerando em cada par só os anos com os
+dois valores (os NaN são mascarados). Os resultados ficam guardados no motor
+por intervalo de defasagens.
+"""
+import numpy as np
+import pandas as pd
+
+# Pares com menos anos em comum que isto ficam sem correlação (NaN)
+MINIMO_ANOS = 5
+
+# Nome da série com o total de cada tabela do SEEG
+TOTAL_TABELA = 'Total'
+
+MEDIDAS = {
+    'correlacao': 'Correlação',
+    'elasticidade': 'Elasticidade',
+}
+
+
+def somas_pareadas(x, y):
+    """Somas por par de colunas, só nos anos em que os dois valores existem
+
+    `x` tem forma (defasagens, anos, locais) e `y` (anos, séries). Retorna
+    (n, Σx, Σy, Σxy, Σx², Σy²) com forma (defasagens, locais, séries). As
+    colunas são centradas antes, o que não muda correlações nem inclinações
+    e evita perda de precisão com valores grandes (emissões em toneladas).
+    """
+    with np.errstate(invalid='ignore'):
+        x = x - np.nanmean(x, axis=1, keepdims=True)
+        y = y - np.nanmean(y, axis=0, keepdims=True)
+    mascara_x = (~np.isnan(x)).astype('float64')
+    mascara_y = (~np.isnan(y)).astype('float64')
+    x, y = np.nan_to_num(x), np.nan_to_num(y)
+    xt, mascara_xt = x.transpose(0, 2, 1), mascara_x.transpose(0, 2, 1)
+    return (
+        mascara_xt @ mascara_y,
+        xt @ mascara_y,
+        mascara_xt @ y,
+        xt @ y,
+        (xt ** 2) @ mascara_y,
+        mascara_xt @ (y ** 2),
+    )
+
+
+class MotorCorrelacoes:
+    """Correlações e elasticidades entre séries anuais do PRODES e do SEEG"""
+
+    def __init__(self, anos_prodes, locais, valores_prodes, anos_seeg, series_seeg, valores_seeg):
+        """`valores_prodes` é anos × locais; `valores_seeg` é anos × séries, com `series_seeg` = [(tabela, categoria)]"""
+        self.anos_prodes = np.asarray(anos_prodes, dtype='int64')
+        self.locais = np.asarray(locais, dtype=object)
+        self.valores_prodes = np.asarray(valores_prodes, dtype='float64')
+        self.anos = np.asarray(anos_seeg, dtype='int64')
+        self.tabelas = np.array([tabela for tabela, _ in series_seeg], dtype=object)
+        self.categorias = np.array([categoria for _, categoria in series_seeg], dtype=object)
+        self.valores_seeg = np.asarray(valores_seeg, dtype='float64')
+        self._resultados = {}
+
+    @classmethod
+    def de_fontes(cls, motor_estados, cubo):
+        """Motor a partir do motor de tendências por estado e do cubo de emissões
+
+        Cada tabela do cubo contribui com suas categorias preenchidas e com o
+        total da tabela.
+        """
+        series, colunas = [], []
+        for t, tabela in enumerate(cubo.tabelas):
+            for c in np.flatnonzero(~np.isnan(cubo.valores[t]).all(axis=1)):
+                series.append((tabela, cubo.categorias[c]))
+                colunas.append(cubo.valores[t, c])
+            series.append((tabela, TOTAL_TABELA))
+            colunas.append(np.where(cubo.maiores[t] >= 0, cubo.totais[t], np.nan))
+        valores_seeg = np.column_stack(colunas) if colunas else np.empty((len(cubo.anos), 0))
+        return cls(motor_estados.periodos, motor_estados.locais, motor_estados.valores,
+                   cubo.anos, series, valores_seeg)
+
+    def prodes_defasado(self, defasagens):
+        """Desmatamento do ano t - k nas linhas dos anos t do SEEG: (defasagens, anos, locais)"""
+        anos = self.anos[np.newaxis, :] - np.asarray(defasagens)[:, np.newaxis]
+        posicoes = anos - self.anos_prodes[0] if len(self.anos_prodes) else anos
+        validas = (posicoes >= 0) & (posicoes < len(self.anos_prodes))
+        defasado = np.full((*anos.shape, len(self.locais)), np.nan)
+        defasado[validas] = self.valores_prodes[posicoes[validas]]
+        return defasado
+
+    def calcular(self, defasagem_min=0, defasagem_max=5):
+        """Correlação, elasticidade e anos em comum para as defasagens de `defasagem_min` a `defasagem_max`
+
+        Retorna {'defasagens', 'correlacao', 'elasticidade', 'anos'}, com
+        matrizes defasagens × locais × séries do SEEG, guardado por intervalo.
+        """
+        if defasagem_min > defasagem_max:
+            raise ValueError(f"Intervalo de defasagens inválido: {defasagem_min} > {defasagem_max}")
+        chave = (int(defasagem_min), int(defasagem_max))
+        if chave not in self._resultados:
+            defasagens = np.arange(chave[0], chave[1] + 1)
+            x = self.prodes_defasado(defasagens)
+            y = self.valores_seeg
+
+            n, sx, sy, sxy, sxx, syy = somas_pareadas(x, y)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                covariancia = n * sxy - sx * sy
+                variancia_x = n * sxx - sx ** 2
+                variancia_y = n * syy - sy ** 2
+                correlacao = np.where((variancia_x > 0) & (variancia_y > 0),
+                                      covariancia / np.sqrt(variancia_x * variancia_y), np.nan)
+
+                # Elasticidade: regressão log-log, só com valores positivos
+                log_x = np.log(np.where(x > 0, x, np.nan))
+                log_y = np.log(np.where(y > 0, y, np.nan))
+                n_log, sx, sy, sxy, sxx, _ = somas_pareadas(log_x, log_y)
+                variancia_x = n_log * sxx - sx ** 2
+                elasticidade = np.where(variancia_x > 0, (n_log * sxy - sx * sy) / variancia_x, np.nan)
+
+            correlacao[n < MINIMO_ANOS] = np.nan
+            elasticidade[n_log < MINIMO_ANOS] = np.nan
+            self._resultados[chave] = {
+                'defasagens': defasagens,
+                'correlacao': np.clip(correlacao, -1, 1),
+                'elasticidade': elasticidade,
+                'anos': n.astype('int64'),
+            }
+        return self._resultados[chave]
+
+    def series_tabela(self, tabela):
+        """Índices das séries do SEEG de uma tabela"""
+        return np.flatnonzero(self.tabelas == tabela)
+
+    def matriz(self, tabela, local, defasagem_min=0, defasagem_max=5, medida='correlacao'):
+        """DataFrame categorias × defasagens de uma medida entre um local e uma tabela do SEEG"""
+        resultado = self.calcular(defasagem_min, defasagem_max)
+        l = int(np.flatnonzero(self.locais == local)[0])
+        series = self.series_tabela(tabela)
+        return pd.DataFrame(resultado[medida][:, l, series].T,
+                            index=pd.Index(self.categorias[series], name='Categoria'),
+                            columns=pd.Index(resultado['defasagens'], name='Defasagem'))
+
+    def tabela_longa(self, defasagem_min=0, defasagem_max=5):
+        """Todos os pares (local, tabela, categoria, defasagem) com correlação, elasticidade e anos"""
+        chave = ('longa', int(defasagem_min), int(defasagem_max))
+        if chave not in self._resultados:
+            resultado = self.calcular(defasagem_min, defasagem_max)
+            k, l, s = np.indices(resultado['correlacao'].shape).reshape(3, -1)
+            self._resultados[chave] = pd.DataFrame({
+                'Local': self.locais[l],
+                'Tabela': self.tabelas[s],
+                'Categoria': self.categorias[s],
+                'Defasagem': resultado['defasagens'][k],
+                'Correlação': resultado['correlacao'].ravel(),
+                'Elasticidade': resultado['elasticidade'].ravel(),
+                'Anos': resultado['anos'].ravel(),
+            })
+        return self._resultados[chave]
+
+    def ranking(self, defasagem_min=0, defasagem_max=5, locais=None, tabelas=None, n=15):
+        """Pares com maior |correlação|, opcionalmente só de alguns locais e tabelas"""
+        longa = self.tabela_longa(defasagem_min, defasagem_max)
+        selecao = longa['Correlação'].notna()
+        if locais:
+            selecao &= longa['Local'].isin(locais)
+        if tabelas:
+            selecao &= longa['Tabela'].isin(tabelas)
+        indices = np.flatnonzero(selecao.to_numpy())
+        ordem = np.argsort(-np.abs(longa['Correlação'].to_numpy()[indices]), kind='stable')
+        return longa.iloc[indices[ordem[:n]]].reset_index(drop=True)
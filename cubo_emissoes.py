@@ -0,0 +1,112 @@
+"""Cubo de emissões do SEEG indexado por (tabela, categoria, ano).
+
+O cubo é montado uma única vez a partir das tabelas em formato longo
+(`Categoria`, `Ano`, `Emissoes`) e guarda os valores num array
+tabela × categoria × ano, com totais, participações e maior emissor de cada
+ano já calculados. Consultas por ano são acessos diretos por índice, sem
+máscaras booleanas sobre o DataFrame.
+"""
+import numpy as np
+import pandas as pd
+
+# Tabelas do SEEG em `tratado/desmatamento/seeg/`
+TABELAS_SEEG = {
+    'brutas': 'desmatamento/seeg/emissões_brutas.csv',
+    'liquidas': 'desmatamento/seeg/emissões_liquidas.csv',
+    'metano': 'desmatamento/seeg/emissão_metano.csv',
+    'energia': 'desmatamento/seeg/categoria_emissora_no_setor_de_energia.csv',
+}
+
+
+class CuboEmissoes:
+    """Emissões por tabela, categoria e ano com agregados pré-calculados"""
+
+    def __init__(self, tabelas_long):
+        """Monta o cubo a partir de {nome da tabela: DataFrame longo}"""
+        self.tabelas = list(tabelas_long)
+        self._long = {
+            nome: df.reset_index(drop=True) for nome, df in tabelas_long.items()
+        }
+
+        categorias = []
+        anos = set()
+        for df in self._long.values():
+            for categoria in df['Categoria'].unique():
+                if categoria not in categorias:
+                    categorias.append(categoria)
+            anos.update(int(ano) for ano in df['Ano'].unique())
+
+        self.categorias = categorias
+        self.anos = np.array(sorted(anos))
+        self._indice_tabela = {nome: i for i, nome in enumerate(self.tabelas)}
+        self._indice_categoria = {nome: i for i, nome in enumerate(self.categorias)}
+        self._indice_ano = {int(ano): i for i, ano in enumerate(self.anos)}
+
+        # Células sem dado (categoria ausente na tabela) ficam como NaN
+        self.valores = np.full(
+            (len(self.tabelas), len(self.categorias), len(self.anos)), np.nan
+        )
+        for nome, df in self._long.items():
+            i_categoria = df['Categoria'].map(self._indice_categoria).to_numpy(dtype=int)
+            i_ano = df['Ano'].map(self._indice_ano).to_numpy(dtype=int)
+            self.valores[self._indice_tabela[nome], i_categoria, i_ano] = df['Emissoes'].to_numpy()
+
+        # Agregados por (tabela, ano)
+        presentes = ~np.isnan(self.valores)
+        self.totais = np.nansum(self.valores, axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.participacoes = self.valores / self.totais[:, np.newaxis, :]
+        self.maiores = np.where(
+            presentes.any(axis=1),
+            np.nan_to_num(self.valores, nan=-np.inf).argmax(axis=1),
+            -1
+        )
+
+        self._fatias = {}
+
+    def long(self, tabela='brutas'):
+        """Tabela em formato longo (Categoria, Ano, Emissoes)"""
+        return self._long[tabela]
+
+    def fatia_ano(self, ano, tabela='brutas'):
+        """Categorias, emissões e participações de uma tabela em um ano"""
+        chave = (tabela, int(ano))
+        if chave not in self._fatias:
+            t = self._indice_tabela[tabela]
+            a = self._indice_ano[int(ano)]
+            valores = self.valores[t, :, a]
+            presentes = ~np.isnan(valores)
+            self._fatias[chave] = pd.DataFrame({
+                'Categoria': np.array(self.categorias, dtype=object)[presentes],
+                'Emissoes': valores[presentes],
+                'Participacao': self.participacoes[t, presentes, a],
+            })
+        return self._fatias[chave]
+
+    def total(self, ano, tabela='brutas'):
+        """Total de emissões de uma tabela em um ano"""
+        return self.totais[self._indice_tabela[tabela], self._indice_ano[int(ano)]]
+
+    def totais_por_ano(self, anos, tabela='brutas'):
+        """Série de totais para os anos pedidos (anos sem dado são ignorados)"""
+        t = self._indice_tabela[tabela]
+        anos_validos = [int(ano) for ano in anos if int(ano) in self._indice_ano]
+        return pd.Series(
+            [self.totais[t, self._indice_ano[ano]] for ano in anos_validos],
+            index=pd.Index(anos_validos, name='Ano'),
+            name='Emissoes'
+        )
+
+    def maior_emissor(self, ano, tabela='brutas'):
+        """(categoria, emissões, participação) do maior emissor no ano"""
+        t = self._indice_tabela[tabela]
+        a = self._indice_ano[int(ano)]
+        c = self.maiores[t, a]
+        if c < 0:
+            return None, np.nan, np.nan
+        return self.categorias[c], self.valores[t, c, a], self.participacoes[t, c, a]
+
+    def anos_disponiveis(self, tabela='brutas'):
+        """Anos com ao menos uma categoria preenchida na tabela"""
+        t = self._indice_tabela[tabela]
+        return [int(ano) for ano in self.anos[self.maiores[t] >= 0]]
@@ -1,15 +1,40 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-from datetime import datetime
+from contextlib import contextmanager
+from functools import partial
+import threading
 import warnings
+
+from agregados_deter import caminho_agregado, carregar_agregados, CHAVES_AGREGADOS, filtrar_periodo
+from armazenamento import (DIRETORIO_TRATADO, ErroEsquema, carregar_tabela, compartilhar_categorias,
+                           memoria_tabelas, versao_arquivos, versao_dados)
+from cache_compartilhado import CACHE_COMPARTILHADO
+from cache_figuras import CACHE_FIGURAS
+from correlacoes import MEDIDAS, MotorCorrelacoes
+from instrumentacao import INSTRUMENTACAO, rss_atual_mb
+from metricas_industriais import (COLUNA_CNAE, atividades_sem_setor, calcular_eficiencia_anual,
+                                  calcular_medias_emissoes, calcular_metricas_setores, consultar_eficiencia)
+from nivel_detalhe import (MAX_COLUNAS_MATRIZ, MAX_PONTOS_MAPA, MAX_PONTOS_SERIE, escolher_frequencia,
+                           nome_frequencia, reduzir_matriz, reduzir_serie)
+from cubo_emissoes import TABELAS_SEEG, CuboEmissoes
+from indice_espacial import ErroRegiao, IndiceAlertas, ler_regiao
+from matriz_prodes import MatrizProdes
+from recarga import versionado
+from tendencias import LIMIAR_ANOMALIA, METODOS, MotorTendencias
+
 warnings.filterwarnings('ignore')
 
+def sessao_atual():
+    """Identificador da sessão do Streamlit em execução (None fora de uma sessão)"""
+    contexto = get_script_run_ctx()
+    return contexto.session_id if contexto is not None else None
+
+# Cada execução instrumentada guarda a sessão que a disparou (o painel só mostra as da sessão)
+INSTRUMENTACAO.identificar_sessao = sessao_atual
+
 # Configuração da página
 st.set_page_config(
     page_title="Dashboard Ambiental - Setores Econômicos e Degradação",
@@ -18,63 +43,121 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Cache para dados
-@st.cache_data
-def load_agricultura_data():
+# Arquivos de origem em `tratado/`
+ARQUIVO_AGRICULTURA_2017 = 'dados agricultura/dados-agricultura-2017.csv'
+ARQUIVO_AGRICULTURA_2006 = 'dados agricultura/dados-agricultura-2006.csv'
+ARQUIVO_PRODES = 'desmatamento/taxa_prodes_1988_2024-tratado.csv'
+# Opcional: PRODES por município (ver atualizar_fontes.py)
+ARQUIVO_PRODES_MUNICIPIOS = 'desmatamento/prodes_municipios.csv'
+ARQUIVO_INDUSTRIA = 'dados industria/dados-industriais.csv'
+
+# Avisos do DETER ingeridos por get_data_amz.py
+DIRETORIO_DETER = 'deter'
+ARQUIVOS_AGREGADOS_DETER = [caminho_agregado(DIRETORIO_DETER, nome) for nome in CHAVES_AGREGADOS]
+# Reescrito a cada ingestão: versão dos avisos (e das geometrias) gravados
+ARQUIVO_CHECKPOINT_DETER = f'{DIRETORIO_DETER}/checkpoint.json'
+
+# Cores das barras por setor industrial
+CORES_SETORES = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7',
+                 '#DDA0DD', '#F4A261', '#8D99AE', '#90BE6D', '#F28482']
+
+# Cache para dados: a versão dos arquivos de origem entra na chave (ver recarga.py),
+# e as duas últimas versões ficam em memória. `st.cache_resource` devolve a
+# mesma tabela a todas as sessões, sem a cópia por execução do `st.cache_data`;
+# as tabelas carregadas são tratadas como somente leitura.
+@versionado(ARQUIVO_AGRICULTURA_2017, ARQUIVO_AGRICULTURA_2006)
+@INSTRUMENTACAO.medir_cache(st.cache_resource(max_entries=2))
+def load_agricultura_data(versao):
     """Carrega dados de agricultura"""
-    ag_2017 = pd.read_csv('tratado/dados agricultura/dados-agricultura-2017.csv')
-    ag_2006 = pd.read_csv('tratado/dados agricultura/dados-agricultura-2006.csv')
-    return ag_2017, ag_2006
+    ag_2017 = carregar_tabela(ARQUIVO_AGRICULTURA_2017)
+    ag_2006 = carregar_tabela(ARQUIVO_AGRICULTURA_2006)
+    return compartilhar_categorias(ag_2017, ag_2006)
 
-@st.cache_data
-def load_desmatamento_data():
+@versionado(ARQUIVO_PRODES)
+@INSTRUMENTACAO.medir_cache(st.cache_resource(max_entries=2))
+def load_desmatamento_data(versao):
     """Carrega dados de desmatamento"""
-    prodes = pd.read_csv('tratado/desmatamento/taxa_prodes_1988_2024-tratado.csv')
+    prodes = carregar_tabela(ARQUIVO_PRODES)
     return prodes
 
-@st.cache_data
-def load_emissoes_data():
-    """Carrega dados de emissões"""
-    emissoes_brutas = pd.read_csv('tratado/desmatamento/seeg/emissões_brutas.csv')
-    emissoes_liquidas = pd.read_csv('tratado/desmatamento/seeg/emissões_liquidas.csv')
-    return emissoes_brutas, emissoes_liquidas
+@versionado(*TABELAS_SEEG.values())
+@INSTRUMENTACAO.medir_cache(st.cache_resource(max_entries=2))
+def load_emissoes_data(versao):
+    """Carrega dados de emissões (todas as tabelas do SEEG)"""
+    tabelas = {nome: carregar_tabela(relativo) for nome, relativo in TABELAS_SEEG.items()}
+    compartilhar_categorias(*tabelas.values())
+    return tabelas
 
-@st.cache_data
-def load_industria_data():
+@versionado(ARQUIVO_INDUSTRIA)
+@INSTRUMENTACAO.medir_cache(st.cache_resource(max_entries=2))
+def load_industria_data(versao):
     """Carrega dados industriais"""
-    industria = pd.read_csv('tratado/dados industria/dados-industriais.csv')
+    industria = carregar_tabela(ARQUIVO_INDUSTRIA)
     return industria
 
+# Intervalo de defasagens (anos) calculado ao carregar as correlações PRODES × SEEG
+DEFASAGENS_PADRAO = (0, 5)
+DEFASAGEM_MAXIMA = 10
+
+# Faixas de área dos estabelecimentos (nomes do Censo 2017)
+FAIXAS_AREA = ['Menos de 2ha', 'De 2ha a 5ha', 'De 5ha a 10ha', 'De 10 a 20 ha',
+               'De 20 a 50 ha', 'De 50 a 100 ha', 'Mais que 100ha']
+
+# Nomes usados no Censo 2006 para as mesmas faixas
+FAIXAS_AREA_2006 = {
+    'De 10ha a 20ha': 'De 10 a 20 ha',
+    'De 20ha a 50ha': 'De 20 a 50 ha',
+    'De 50ha a 100ha': 'De 50 a 100 ha'
+}
+
+@INSTRUMENTACAO.medir_cache(st.cache_resource(max_entries=2))
+def load_deter_agregados(versao):
+    """Carrega os agregados do DETER (a versão dos arquivos entra na chave do cache)"""
+    return carregar_agregados(DIRETORIO_DETER)
+
+@INSTRUMENTACAO.medir_cache(st.cache_resource(max_entries=1))
+def load_indice_deter(versao):
+    """Índice espacial dos avisos do DETER, montado uma vez por ingestão (a versão entra na chave)"""
+    return IndiceAlertas.de_dataset(DIRETORIO_DETER)
+
+@INSTRUMENTACAO.medir
 def process_agricultura_data(ag_2017, ag_2006):
     """Processa dados de agricultura para análises"""
-    # Preparar dados para análise temporal
-    ag_2017_processed = ag_2017.copy()
-    ag_2017_processed['Ano'] = 2017
-    ag_2006_processed = ag_2006.copy()
-    ag_2006_processed['Ano'] = 2006
-    
-    combined_ag = pd.concat([ag_2006_processed, ag_2017_processed])
-    
-    # Calcular proporções agricultura familiar vs não familiar
-    familiar_data = []
-    for index, row in combined_ag.iterrows():
-        if row['Tipo'] == 'Agricultura familiar':
-            familiar_data.append({
-                'Região': row['Região'],
-                'Ano': row['Ano'],
-                'Total_Familiar': row['Total'],
-                'Tipo': 'Familiar'
-            })
-        elif row['Tipo'] == 'Agricultura não familiar':
-            familiar_data.append({
-                'Região': row['Região'],
-                'Ano': row['Ano'], 
-                'Total_Nao_Familiar': row['Total'],
-                'Tipo': 'Não Familiar'
-            })
-    
-    return combined_ag, pd.DataFrame(familiar_data)
+    # Preparar dados para análise temporal, com as faixas de área harmonizadas
+    combined_ag = pd.concat([
+        ag_2006.rename(columns=FAIXAS_AREA_2006).assign(Ano=2006),
+        ag_2017.rename(columns=FAIXAS_AREA_2006).assign(Ano=2017)
+    ], ignore_index=True)
+    
+    # Totais agricultura familiar vs não familiar por região e ano (formato wide)
+    colunas_tipo = combined_ag['Tipo'].astype(object).map({
+        'Agricultura familiar': 'Total_Familiar',
+        'Agricultura não familiar': 'Total_Nao_Familiar'
+    })
+    familiar_df = (
+        combined_ag.assign(Coluna=colunas_tipo)
+        .dropna(subset=['Coluna'])
+        .groupby(['Região', 'Ano', 'Coluna'], observed=True, sort=False)['Total']
+        .sum()
+        .unstack('Coluna', fill_value=0)
+        .reindex(columns=['Total_Familiar', 'Total_Nao_Familiar'], fill_value=0)
+        .reset_index()
+        .rename_axis(columns=None)
+    )
+    familiar_df['Proporcao_Familiar'] = (
+        familiar_df['Total_Familiar'] /
+        (familiar_df['Total_Familiar'] + familiar_df['Total_Nao_Familiar'])
+    )
+    
+    return combined_ag, familiar_df
+
+@versionado(ARQUIVO_AGRICULTURA_2017, ARQUIVO_AGRICULTURA_2006)
+@INSTRUMENTACAO.medir_cache(st.cache_resource(max_entries=2))
+def load_agricultura_processada(versao):
+    """Tabelas da seção 5, montadas uma única vez por versão dos dados (e não a cada execução)"""
+    return process_agricultura_data(*load_agricultura_data())
 
+@INSTRUMENTACAO.medir
 def process_emissoes_data(emissoes_brutas):
     """Processa dados de emissões por setor"""
     # Transformar dados de formato wide para long
@@ -83,14 +166,76 @@ def process_emissoes_data(emissoes_brutas):
         var_name='Ano', 
         value_name='Emissoes'
     )
+    # As emissões já chegam como float32 validado (ver ESQUEMAS em armazenamento.py)
     emissoes_long['Ano'] = emissoes_long['Ano'].astype(int)
-    emissoes_long['Emissoes'] = pd.to_numeric(emissoes_long['Emissoes'], errors='coerce')
     
     return emissoes_long
 
-def create_treemap_setores_degradacao(emissoes_long, selected_year):
+@versionado(*TABELAS_SEEG.values())
+@INSTRUMENTACAO.medir_cache(st.cache_resource(max_entries=2))
+def load_cubo_emissoes(versao):
+    """Monta o cubo de emissões uma única vez por processo"""
+    return CuboEmissoes({
+        nome: CACHE_COMPARTILHADO.obter(process_emissoes_data, (tabela,), [TABELAS_SEEG[nome]])
+        for nome, tabela in load_emissoes_data().items()
+    })
+
+def niveis_prodes():
+    """Níveis disponíveis para o heatmap do PRODES"""
+    if (DIRETORIO_TRATADO / ARQUIVO_PRODES_MUNICIPIOS).exists():
+        return ['Estado', 'Município']
+    return ['Estado']
+
+@versionado(ARQUIVO_PRODES, ARQUIVO_PRODES_MUNICIPIOS)
+@INSTRUMENTACAO.medir_cache(st.cache_resource(max_entries=4))
+def load_matriz_prodes(versao, nivel):
+    """Monta a matriz esparsa ano × estado ou ano × município uma única vez entre os processos"""
+    if nivel == 'Município':
+        return CACHE_COMPARTILHADO.obter(MatrizProdes.de_tabela_municipios,
+                                         (carregar_tabela(ARQUIVO_PRODES_MUNICIPIOS),),
+                                         [ARQUIVO_PRODES_MUNICIPIOS])
+    return CACHE_COMPARTILHADO.obter(MatrizProdes.de_tabela_estados, (load_desmatamento_data(),),
+                                     [ARQUIVO_PRODES])
+
+@versionado(ARQUIVO_PRODES, ARQUIVO_PRODES_MUNICIPIOS)
+@INSTRUMENTACAO.medir_cache(st.cache_resource(max_entries=4))
+def load_motor_tendencias(versao, nivel):
+    """Motor de tendências ano × estado (com a AMZ LEGAL) ou ano × município
+
+    O motor guarda os resultados por (método, janela) e é compartilhado
+    entre as sessões, como a matriz do PRODES.
+    """
+    if nivel == 'Município':
+        return MotorTendencias.de_matriz_prodes(load_matriz_prodes(nivel))
+    return MotorTendencias.de_tabela_estados(load_desmatamento_data())
+
+@versionado(ARQUIVO_PRODES, *TABELAS_SEEG.values())
+@INSTRUMENTACAO.medir_cache(st.cache_resource(max_entries=2))
+def load_motor_correlacoes(versao):
+    """Correlações PRODES × SEEG, com o intervalo de defasagens padrão já calculado"""
+    motor = MotorCorrelacoes.de_fontes(load_motor_tendencias('Estado'), load_cubo_emissoes())
+    motor.calcular(*DEFASAGENS_PADRAO)
+    return motor
+
+def versao_prodes(nivel):
+    """Versão do arquivo de origem da matriz do PRODES no nível dado"""
+    return versao_dados(ARQUIVO_PRODES_MUNICIPIOS if nivel == 'Município' else ARQUIVO_PRODES)
+
+def indicadores_emissoes(cubo_emissoes, ano, tabela='brutas'):
+    """KPIs da seção 1 no ano: total e maior emissor (com sua participação)"""
+    maior_emissor, emissao, participacao = cubo_emissoes.maior_emissor(ano, tabela)
+    return {
+        'ano': int(ano),
+        'total': cubo_emissoes.total(ano, tabela),
+        'maior_emissor': maior_emissor,
+        'emissao_maior_emissor': emissao,
+        'participacao_maior_emissor': participacao,
+    }
+
+@INSTRUMENTACAO.medir
+def create_treemap_setores_degradacao(cubo_emissoes, selected_year):
     """Cria treemap dos setores que mais degradam o ambiente"""
-    year_data = emissoes_long[emissoes_long['Ano'] == selected_year]
+    year_data = cubo_emissoes.fatia_ano(selected_year)
     
     fig = go.Figure(go.Treemap(
         labels=year_data['Categoria'],
@@ -109,60 +254,37 @@ def create_treemap_setores_degradacao(emissoes_long, selected_year):
     
     return fig
 
-def create_barras_agrupadas_eficiencia_ambiental(industria_data, emissoes_long, selected_years):
-    """Cria gráfico de barras agrupadas da eficiência ambiental por setor"""
-    # Filtrar dados industriais para os anos selecionados
-    industry_filtered = industria_data[industria_data['Ano'].isin(selected_years)]
-    emissions_filtered = emissoes_long[emissoes_long['Ano'].isin(selected_years)]
-    
-    # Excluir linha "Total" dos dados industriais
-    industry_filtered = industry_filtered[industry_filtered['Classificação Nacional de Atividades Econômicas (CNAE 2.0)'] != 'Total']
-    
-    # Mapear setores industriais para setores de emissões
-    setor_mapping = {
-        'Extração de carvão mineral': 'Energia',
-        'Extração de petróleo e gás natural': 'Energia', 
-        'Extração de minerais metálicos': 'Processos Industriais',
-        'Metalurgia': 'Processos Industriais'
-    }
+@INSTRUMENTACAO.medir_cache(st.cache_data)
+@CACHE_COMPARTILHADO.memorizar(ARQUIVO_INDUSTRIA, *TABELAS_SEEG.values(), dados=('industria_data', 'emissoes_long'))
+def compute_metricas_industriais(industria_data, emissoes_long, selected_years):
+    """Calcula as métricas por setor industrial e as médias de emissões dos anos"""
+    selected_years = tuple(sorted(selected_years))
+    metricas = calcular_metricas_setores(industria_data, emissoes_long, selected_years)
+    medias_emissoes = calcular_medias_emissoes(emissoes_long, selected_years)
+    return metricas, medias_emissoes
+
+def versao_metricas_industriais(selected_years):
+    """Versão do resultado de `compute_metricas_industriais` (arquivos de origem e anos)"""
+    anos = ','.join(str(ano) for ano in sorted(selected_years))
+    return f"{versao_dados(ARQUIVO_INDUSTRIA, *TABELAS_SEEG.values())}:{anos}"
+
+@versionado(ARQUIVO_INDUSTRIA)
+@INSTRUMENTACAO.medir_cache(st.cache_resource(max_entries=2))
+def load_atividades_sem_setor(versao):
+    """Atividades da CNAE sem setor de emissão no mapeamento (ficam fora das métricas)"""
+    return atividades_sem_setor(load_industria_data())
+
+@INSTRUMENTACAO.medir
+def create_barras_agrupadas_eficiencia_ambiental(metricas):
+    """Cria gráfico de barras agrupadas da eficiência ambiental por setor
+
+    `metricas` vem de `compute_metricas_industriais`; no cache de figuras a
+    figura é identificada por `versao_metricas_industriais`.
+    """
+    cores = [CORES_SETORES[i % len(CORES_SETORES)] for i in range(len(metricas))]
     
-    # Coletar dados para cada setor
-    setores_nomes = []
-    receitas = []
-    empresas = []
-    eficiencias = []
-    sustentabilidades = []
-    cores = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
-    
-    for idx, (setor_industrial, setor_emissao) in enumerate(setor_mapping.items()):
-        # Dados industriais do setor
-        setor_data = industry_filtered[
-            industry_filtered['Classificação Nacional de Atividades Econômicas (CNAE 2.0)'] == setor_industrial
-        ]
-        
-        # Dados de emissões correspondentes
-        emissao_data = emissions_filtered[emissions_filtered['Categoria'] == setor_emissao]
-        
-        if not setor_data.empty and not emissao_data.empty:
-            # Calcular métricas
-            receita_media = setor_data['Receita - total (Mil Reais)'].mean()
-            empresas_media = setor_data['Número de empresas (Unidades)'].mean()
-            emissoes_media = emissao_data['Emissoes'].mean()
-            
-            # Calcular eficiência (receita por unidade de emissão)
-            eficiencia = (receita_media / (emissoes_media / 1e6)) if emissoes_media > 0 else 0
-            
-            # Calcular sustentabilidade (inverso das emissões - normalizado)
-            sustentabilidade = 1000 / (emissoes_media / 1e6) if emissoes_media > 0 else 0
-            
-            # Nome simplificado
-            nome_simples = setor_industrial.replace('Extração de ', '').replace(' mineral', '').replace(' metálicos', '')
-            
-            setores_nomes.append(nome_simples)
-            receitas.append(receita_media / 1e6)  # Em bilhões
-            empresas.append(empresas_media)
-            eficiencias.append(eficiencia)
-            sustentabilidades.append(sustentabilidade)
+    # Importado sob demanda: plotly.subplots é caro e só este gráfico o usa
+    from plotly.subplots import make_subplots
     
     # Criar subplot com múltiplos eixos Y
     fig = make_subplots(
@@ -177,53 +299,24 @@ def create_barras_agrupadas_eficiencia_ambiental(industria_data, emissoes_long,
                [{"secondary_y": False}, {"secondary_y": False}]]
     )
     
-    # Gráfico 1: Receita Total
-    fig.add_trace(
-        go.Bar(
-            x=setores_nomes,
-            y=receitas,
-            name='Receita (R$ Bi)',
-            marker_color=cores,
-            showlegend=False
-        ),
-        row=1, col=1
-    )
-    
-    # Gráfico 2: Número de Empresas
-    fig.add_trace(
-        go.Bar(
-            x=setores_nomes,
-            y=empresas,
-            name='Empresas',
-            marker_color=cores,
-            showlegend=False
-        ),
-        row=1, col=2
-    )
-    
-    # Gráfico 3: Eficiência Ambiental
-    fig.add_trace(
-        go.Bar(
-            x=setores_nomes,
-            y=eficiencias,
-            name='Eficiência',
-            marker_color=cores,
-            showlegend=False
-        ),
-        row=2, col=1
-    )
-    
-    # Gráfico 4: Sustentabilidade
-    fig.add_trace(
-        go.Bar(
-            x=setores_nomes,
-            y=sustentabilidades,
-            name='Sustentabilidade',
-            marker_color=cores,
-            showlegend=False
-        ),
-        row=2, col=2
-    )
+    # Um gráfico por métrica: (coluna, nome, linha, coluna do subplot)
+    paineis = [
+        ('Receita', 'Receita (R$ Bi)', 1, 1),
+        ('Empresas', 'Empresas', 1, 2),
+        ('Eficiencia', 'Eficiência', 2, 1),
+        ('Sustentabilidade', 'Sustentabilidade', 2, 2)
+    ]
+    for coluna, nome, linha, coluna_subplot in paineis:
+        fig.add_trace(
+            go.Bar(
+                x=metricas['Setor'],
+                y=metricas[coluna],
+                name=nome,
+                marker_color=cores,
+                showlegend=False
+            ),
+            row=linha, col=coluna_subplot
+        )
     
     # Atualizar layout
     fig.update_layout(
@@ -232,15 +325,19 @@ def create_barras_agrupadas_eficiencia_ambiental(industria_data, emissoes_long,
         showlegend=False
     )
     
+    return fig
+
+def render_analise_setores(metricas, medias_emissoes):
+    """Exibe métricas, tabela e comparações calculadas por setor industrial"""
     # Adicionar análise agregada dos setores de emissões
     st.subheader("📊 Análise Complementar por Setor de Emissões")
     
     col1, col2, col3 = st.columns(3)
     
     # Métricas dos setores de emissões
-    energia_emissions = emissions_filtered[emissions_filtered['Categoria'] == 'Energia']['Emissoes'].mean()
-    processos_emissions = emissions_filtered[emissions_filtered['Categoria'] == 'Processos Industriais']['Emissoes'].mean()
-    agropecuaria_emissions = emissions_filtered[emissions_filtered['Categoria'] == 'Agropecuária']['Emissoes'].mean()
+    energia_emissions = medias_emissoes.get('Energia', np.nan)
+    processos_emissions = medias_emissoes.get('Processos Industriais', np.nan)
+    agropecuaria_emissions = medias_emissoes.get('Agropecuária', np.nan)
     
     with col1:
         st.metric(
@@ -266,18 +363,14 @@ def create_barras_agrupadas_eficiencia_ambiental(industria_data, emissoes_long,
     # Tabela de dados detalhados
     st.subheader("📋 Dados Detalhados por Setor")
     
-    if setores_nomes:
-        tabela_dados = []
-        for i, nome in enumerate(setores_nomes):
-            tabela_dados.append({
-                'Setor': nome,
-                'Receita (R$ Bi)': f"{receitas[i]:.1f}",
-                'Empresas': f"{empresas[i]:.0f}",
-                'Eficiência Ambiental': f"{eficiencias[i]:.0f}",
-                'Índice Sustentabilidade': f"{sustentabilidades[i]:.1f}"
-            })
-        
-        df_tabela = pd.DataFrame(tabela_dados)
+    if not metricas.empty:
+        df_tabela = pd.DataFrame({
+            'Setor': metricas['Setor'],
+            'Receita (R$ Bi)': metricas['Receita'].map('{:.1f}'.format),
+            'Empresas': metricas['Empresas'].map('{:.0f}'.format),
+            'Eficiência Ambiental': metricas['Eficiencia'].map('{:.0f}'.format),
+            'Índice Sustentabilidade': metricas['Sustentabilidade'].map('{:.1f}'.format)
+        })
         st.dataframe(df_tabela, use_container_width=True)
     
     # Insights sobre as diferenças
@@ -288,62 +381,488 @@ def create_barras_agrupadas_eficiencia_ambiental(industria_data, emissoes_long,
     with col1_comp:
         st.markdown("**💰 Desempenho Econômico:**")
         # Encontrar setor com maior receita
-        if receitas:
-            max_receita_idx = receitas.index(max(receitas))
-            max_empresas_idx = empresas.index(max(empresas))
+        if not metricas.empty:
+            max_receita = metricas.loc[metricas['Receita'].idxmax()]
+            max_empresas = metricas.loc[metricas['Empresas'].idxmax()]
             
             st.markdown(f"""
-            - **Maior Receita**: {setores_nomes[max_receita_idx]} (R$ {receitas[max_receita_idx]:.1f} bi)
-            - **Mais Empresas**: {setores_nomes[max_empresas_idx]} ({empresas[max_empresas_idx]:.0f} empresas)
+            - **Maior Receita**: {max_receita['Setor']} (R$ {max_receita['Receita']:.1f} bi)
+            - **Mais Empresas**: {max_empresas['Setor']} ({max_empresas['Empresas']:.0f} empresas)
             - **Concentração**: Setores com diferentes escalas de operação
             """)
     
     with col2_comp:
         st.markdown("**🌱 Desempenho Ambiental:**")
-        if eficiencias:
-            max_efic_idx = eficiencias.index(max(eficiencias))
-            max_sust_idx = sustentabilidades.index(max(sustentabilidades))
+        if not metricas.empty:
+            max_efic = metricas.loc[metricas['Eficiencia'].idxmax()]
+            max_sust = metricas.loc[metricas['Sustentabilidade'].idxmax()]
             
             st.markdown(f"""
-            - **Mais Eficiente**: {setores_nomes[max_efic_idx]} (índice {eficiencias[max_efic_idx]:.0f})
-            - **Mais Sustentável**: {setores_nomes[max_sust_idx]} (índice {sustentabilidades[max_sust_idx]:.1f})
+            - **Mais Eficiente**: {max_efic['Setor']} (índice {max_efic['Eficiencia']:.0f})
+            - **Mais Sustentável**: {max_sust['Setor']} (índice {max_sust['Sustentabilidade']:.1f})
             - **Trade-off**: Nem sempre alta receita = alta eficiência
             """)
+
+@st.cache_resource
+def load_estado_eficiencia():
+    """Última tabela de eficiência por ano calculada no processo, com a trava que a protege
+
+    Sobrevive às versões dos dados: uma versão nova parte da tabela anterior
+    e só agrega as linhas da indústria de anos que ainda não estão nela (a
+    série da PIA só ganha anos novos; os já publicados não são revistos).
+    """
+    return {'tabela': None, 'trava': threading.Lock()}
+
+@versionado(ARQUIVO_INDUSTRIA, *TABELAS_SEEG.values())
+@INSTRUMENTACAO.medir_cache(st.cache_resource(max_entries=2))
+def compute_eficiencia_anual(versao):
+    """Tabela de eficiência por ano, calculada uma única vez por versão dos dados"""
+    cubo_emissoes = load_cubo_emissoes()
+    totais_emissoes = cubo_emissoes.totais_por_ano(cubo_emissoes.anos)
+    industria_data = load_industria_data()
+    estado = load_estado_eficiencia()
+    with estado['trava']:
+        estado['tabela'] = calcular_eficiencia_anual(industria_data, totais_emissoes, estado['tabela'])
+        return estado['tabela']
+
+@INSTRUMENTACAO.medir
+def create_linha_eficiencia_ambiental(tabela_eficiencia, selected_years):
+    """Cria gráfico de linha do KPI de eficiência ambiental por ano"""
+    eficiencia = consultar_eficiencia(tabela_eficiencia, selected_years)
+    if eficiencia.empty:
+        return None
+    
+    # Nível de detalhe: mínimo e máximo por faixa de anos; WebGL acima do limite
+    anos, valores = reduzir_serie(eficiencia.index, eficiencia.to_numpy())
+    kpi_df = pd.DataFrame({'Ano': anos, 'Eficiência': valores})
+    
+    import plotly.express as px
+    fig_kpi = px.line(
+        kpi_df, 
+        x='Ano', 
+        y='Eficiência',
+        title="Evolução da Eficiência Ambiental (Receita/Emissões)",
+        markers=len(kpi_df) < MAX_PONTOS_SERIE,
+        render_mode='webgl' if len(eficiencia) > MAX_PONTOS_SERIE else 'svg'
+    )
+    fig_kpi.update_layout(height=400)
+    
+    return fig_kpi
+
+def indicadores_desmatamento(motor):
+    """KPIs da seção 4 no ano mais recente do PRODES, a partir do motor de tendências por estado
+
+    Estado com maior área desmatada, total da Amazônia Legal e variação (%)
+    em relação ao ano anterior (None se houver um só ano).
+    """
+    amz = int(np.flatnonzero(motor.locais == 'AMZ LEGAL')[0])
+    estados = np.flatnonzero(motor.locais != 'AMZ LEGAL')
+    recente = motor.valores[-1]
+    estado = estados[np.argmax(recente[estados])]
+    variacao = motor.calcular('variacao_percentual')[-1, amz]
+    return {
+        'ano': int(motor.periodos[-1]),
+        'estado_maior_desmatamento': motor.locais[estado],
+        'area_estado': recente[estado],
+        'total_amazonia_legal': recente[amz],
+        'variacao_anual': None if np.isnan(variacao) else variacao,
+    }
+
+def resumo_tendencias(motor, matriz_prodes, start_year, end_year, janela, ufs=None):
+    """Tabela de tendências e anomalias no ano final, restrita aos estados em `ufs`
+
+    As anomalias aparecem primeiro, e depois os locais com maior |z|.
+    """
+    resumo = motor.resumo(start_year, end_year, janela)
+    if ufs:
+        if matriz_prodes.nivel == 'Município':
+            resumo = resumo.iloc[matriz_prodes.locais(ufs)]
+        else:
+            resumo = resumo[resumo['Local'].isin([*ufs, 'AMZ LEGAL'])]
+    ordem = np.lexsort((-resumo['z-score'].abs().fillna(-1).to_numpy(), ~resumo['Anomalia'].to_numpy()))
+    return resumo.iloc[ordem[:MAX_COLUNAS_MATRIZ]]
+
+@INSTRUMENTACAO.medir
+def create_serie_tendencias(motor, metodo, janela, locais, start_year, end_year):
+    """Série de um método de tendência (média móvel, variação, z-score...) para os locais dados"""
+    serie = motor.serie(metodo, janela, locais).loc[start_year:end_year]
+    if serie.empty:
+        return None
+    fig = go.Figure([
+        go.Scatter(x=serie.index, y=serie[local], mode='lines+markers', name=local)
+        for local in serie.columns
+    ])
+    if metodo == 'zscore':
+        for limite in (-LIMIAR_ANOMALIA, LIMIAR_ANOMALIA):
+            fig.add_hline(y=limite, line_dash='dash', line_color='red', opacity=0.5)
+    titulo = METODOS[metodo] + (f' (janela de {janela} anos)' if metodo in ('media_movel', 'zscore', 'tendencia') else '')
+    fig.update_layout(title=titulo, height=400, xaxis_title='Ano', hovermode='x unified')
+    return fig
+
+@INSTRUMENTACAO.medir
+def create_heatmap_correlacoes(motor, tabela, local, defasagem_min, defasagem_max, medida='correlacao'):
+    """Heatmap categorias do SEEG × defasagem da correlação (ou elasticidade) com o PRODES de um local"""
+    matriz = motor.matriz(tabela, local, defasagem_min, defasagem_max, medida)
+    if matriz.empty:
+        return None
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=matriz.to_numpy(dtype='float32'),
+        x=[str(defasagem) for defasagem in matriz.columns],
+        y=matriz.index,
+        colorscale='RdBu',
+        reversescale=True,
+        zmid=0,
+        zmin=-1 if medida == 'correlacao' else None,
+        zmax=1 if medida == 'correlacao' else None,
+        showscale=True,
+        hoverongaps=False
+    ))
+    
+    fig.update_layout(
+        title=f"{MEDIDAS[medida]}: desmatamento em {local} (ano t - defasagem) × emissões {tabela} (ano t)",
+        xaxis_title="Defasagem (anos)",
+        yaxis_title="Categoria",
+        height=450
+    )
     
     return fig
 
-def create_heatmap_desmatamento_regional(prodes_data, start_year, end_year):
-    """Cria heatmap do desmatamento por região ao longo do tempo"""
-    # Filtrar dados por período
-    prodes_filtered = prodes_data[
-        (prodes_data['Ano/Estados'] >= start_year) & 
-        (prodes_data['Ano/Estados'] <= end_year)
-    ].copy()
+@INSTRUMENTACAO.medir
+def create_heatmap_desmatamento_regional(matriz_prodes, start_year, end_year, ufs=None):
+    """Cria heatmap do desmatamento por estado ou município ao longo do tempo
+    
+    Com mais locais do que colunas, exibe os de maior área no período.
+    """
+    locais = matriz_prodes.locais(ufs)
+    ranqueado = len(locais) > MAX_COLUNAS_MATRIZ
+    if ranqueado:
+        locais = matriz_prodes.indices_ranking(start_year, end_year, ufs, MAX_COLUNAS_MATRIZ)
     
-    # Selecionar apenas estados (excluir AMZ LEGAL)
-    estados = ['AC', 'AM', 'AP', 'MA', 'MT', 'PA', 'RO', 'RR', 'TO']
+    # Preparar matriz para heatmap (densa só nas colunas exibidas)
+    heatmap_data = matriz_prodes.matriz(start_year, end_year, locais)
     
-    # Preparar matriz para heatmap
-    heatmap_data = prodes_filtered[['Ano/Estados'] + estados].set_index('Ano/Estados')
+    # Nível de detalhe: períodos longos viram médias de intervalos de anos
+    n_anos = len(heatmap_data)
+    heatmap_data = reduzir_matriz(heatmap_data)
     
     fig = go.Figure(data=go.Heatmap(
-        z=heatmap_data.values,
-        x=estados,
+        z=heatmap_data.to_numpy(dtype='float32'),
+        x=list(heatmap_data.columns),
         y=heatmap_data.index,
         colorscale='Reds',
         showscale=True,
         hoverongaps=False
     ))
     
+    nivel = matriz_prodes.nivel
+    titulo = f"Heatmap de Desmatamento por {nivel} ({start_year}-{end_year})"
+    if ranqueado:
+        titulo += f" - {len(locais)} maiores"
+    if len(heatmap_data) != n_anos:
+        titulo += " - média por intervalo de anos"
     fig.update_layout(
-        title=f"Heatmap de Desmatamento por Estado ({start_year}-{end_year})",
-        xaxis_title="Estados",
+        title=titulo,
+        xaxis_title="Estados" if nivel == 'Estado' else "Municípios",
         yaxis_title="Ano",
         height=600
     )
     
     return fig
 
+@INSTRUMENTACAO.medir
+def create_serie_alertas_deter(agregados_dia, granularidade, dimensao, ufs, start_year, end_year,
+                               intervalo=None):
+    """Cria série de área de avisos do DETER por classe ou UF
+    
+    `granularidade` é a mais fina desejada: se o período tiver barras demais,
+    a série é agregada por semana, mês, trimestre ou ano. `intervalo`
+    (datas inicial e final) restringe a série ao trecho ampliado pelo
+    usuário, com a frequência mais fina que couber.
+    """
+    alertas = filtrar_periodo(agregados_dia, 'view_date', start_year, end_year, ufs)
+    if intervalo:
+        inicio, fim = pd.Timestamp(intervalo[0]), pd.Timestamp(intervalo[1])
+        alertas = alertas[(alertas['view_date'] >= inicio.normalize()) & (alertas['view_date'] <= fim)]
+    else:
+        inicio, fim = pd.Timestamp(year=start_year, month=1, day=1), pd.Timestamp(year=end_year, month=12, day=31)
+    coluna_cor = 'classname' if dimensao == 'Classe' else 'uf'
+    
+    # Nível de detalhe: frequência com no máximo MAX_BARRAS barras no período;
+    # num trecho ampliado, desce até a diária
+    frequencia = escolher_frequencia(inicio, fim, 'D' if granularidade == 'Diária' or intervalo else 'M')
+    if frequencia == 'D':
+        periodo = alertas['view_date']
+    elif frequencia == 'M':
+        periodo = alertas['mes']
+    else:
+        periodo = alertas['view_date'].dt.to_period(frequencia).dt.start_time
+    
+    serie = (
+        alertas.groupby([periodo.rename('periodo'), coluna_cor], observed=True)['area_km2']
+        .sum()
+        .reset_index()
+    )
+    
+    titulo_periodo = (f"{inicio:%d/%m/%Y} a {fim:%d/%m/%Y}" if intervalo else f"{start_year}-{end_year}")
+    import plotly.express as px
+    fig = px.bar(
+        serie,
+        x='periodo',
+        y='area_km2',
+        color=coluna_cor,
+        title=f"Área de Avisos DETER por {dimensao} - {nome_frequencia(frequencia)} ({titulo_periodo})",
+        labels={'periodo': 'Data', 'area_km2': 'Área (km²)', 'classname': 'Classe', 'uf': 'UF'}
+    )
+    fig.update_layout(height=450, bargap=0, dragmode='select')
+    
+    return fig
+
+@INSTRUMENTACAO.medir
+def create_ranking_municipios_deter(agregados_mes, ufs, start_year, end_year, top_n=15):
+    """Cria ranking dos municípios com maior área de avisos do DETER"""
+    alertas = filtrar_periodo(agregados_mes, 'mes', start_year, end_year, ufs)
+    por_classe = (
+        alertas.groupby(['municipality', 'uf', 'classname'], observed=True)['area_km2']
+        .sum()
+        .reset_index()
+    )
+    por_classe['Município'] = por_classe['municipality'].astype(str) + ' (' + por_classe['uf'].astype(str) + ')'
+    
+    totais = por_classe.groupby('Município')['area_km2'].sum().nlargest(top_n)
+    ranking = por_classe[por_classe['Município'].isin(totais.index)]
+    
+    import plotly.express as px
+    fig = px.bar(
+        ranking,
+        x='area_km2',
+        y='Município',
+        color='classname',
+        orientation='h',
+        title=f"Top {top_n} Municípios por Área de Avisos DETER ({start_year}-{end_year})",
+        labels={'area_km2': 'Área (km²)', 'classname': 'Classe'},
+        category_orders={'Município': list(totais.index)}
+    )
+    fig.update_layout(height=500)
+    
+    return fig
+
+@INSTRUMENTACAO.medir
+def create_mapa_deter(indice, regiao, ufs, classes, start_year, end_year):
+    """Mapa dos avisos do DETER que intersectam a região (caixa, WKT ou GeoJSON) no período
+    
+    Com mais avisos que MAX_PONTOS_MAPA, exibe os de maior área.
+    """
+    geometria = ler_regiao(regiao or None)
+    indices = indice.consultar(geometria, inicio=f'{start_year}-01-01', fim=f'{end_year}-12-31',
+                               ufs=ufs, classes=classes)
+    if not len(indices):
+        return None
+    
+    reduzido = len(indices) > MAX_PONTOS_MAPA
+    if reduzido:
+        areas = indice.atributos['areamunkm'].to_numpy()[indices]
+        indices = np.sort(indices[np.argpartition(-areas, MAX_PONTOS_MAPA)[:MAX_PONTOS_MAPA]])
+    alertas = indice.alertas(indices)
+    
+    fig = go.Figure()
+    for classe, grupo in alertas.groupby('classname', observed=True, sort=True):
+        fig.add_trace(go.Scattermap(
+            lon=grupo['lon'], lat=grupo['lat'], mode='markers', name=str(classe),
+            marker=dict(size=np.clip(np.sqrt(grupo['areamunkm'].to_numpy(dtype='float64')) * 6, 4, 20), opacity=0.7),
+            text=grupo['municipality'].astype(str) + ' (' + grupo['uf'].astype(str) + ') - ' +
+                 grupo['view_date'].dt.strftime('%d/%m/%Y') + ' - ' +
+                 grupo['areamunkm'].map('{:.2f} km²'.format),
+            hoverinfo='text'
+        ))
+    
+    # Contorno da região consultada
+    if geometria is not None:
+        for parte in getattr(geometria, 'geoms', [geometria]):
+            contorno = np.asarray(parte.exterior.coords if hasattr(parte, 'exterior') else parte.coords)
+            fig.add_trace(go.Scattermap(lon=contorno[:, 0], lat=contorno[:, 1], mode='lines', name='Região',
+                                        line=dict(color='black', width=2), hoverinfo='skip', showlegend=False))
+    
+    xmin, ymin, xmax, ymax = geometria.bounds if geometria is not None else (
+        alertas['lon'].min(), alertas['lat'].min(), alertas['lon'].max(), alertas['lat'].max())
+    largura = max(xmax - xmin, ymax - ymin, 0.01)
+    titulo = f"Avisos DETER na região ({start_year}-{end_year})"
+    if reduzido:
+        titulo += f" - {MAX_PONTOS_MAPA:,} de maior área"
+    fig.update_layout(
+        title=titulo,
+        map=dict(style='open-street-map', center=dict(lon=(xmin + xmax) / 2, lat=(ymin + ymax) / 2),
+                 zoom=float(np.clip(np.log2(360 / largura) - 0.5, 2, 14))),
+        height=600,
+        margin=dict(l=0, r=0, t=40, b=0)
+    )
+    
+    return fig
+
+def ampliar_serie_deter(chave_grafico, filtros):
+    """Callback da seleção na série do DETER: amplia o trecho selecionado"""
+    caixas = st.session_state[chave_grafico].selection.box
+    if caixas:
+        inicio, fim = sorted(pd.Timestamp(x) for x in caixas[0]['x'])
+        st.session_state['zoom_deter'] = {'filtros': filtros, 'intervalo': (str(inicio), str(fim))}
+        st.session_state['ampliacoes_deter'] = st.session_state.get('ampliacoes_deter', 0) + 1
+
+@st.fragment
+@INSTRUMENTACAO.medir_execucao
+def render_alertas_deter():
+    """Exibe a análise dos avisos do DETER a partir dos agregados"""
+    st.subheader("🛰️ Avisos DETER: Alertas de Desmatamento e Degradação")
+    
+    versao_deter = versao_arquivos(*ARQUIVOS_AGREGADOS_DETER)
+    agregados = load_deter_agregados(versao_deter)
+    if len(agregados) < len(CHAVES_AGREGADOS):
+        st.info("💡 Agregados do DETER não encontrados. Execute `python get_data_amz.py` para ingerir os avisos.")
+        return
+    
+    agregados_dia = agregados['dia_uf_classe']
+    agregados_mes = agregados['mes_municipio_classe']
+    anos_deter = sorted(agregados_dia['view_date'].dt.year.unique())
+    
+    col1_deter, col2_deter, col3_deter = st.columns(3)
+    
+    with col1_deter:
+        dimensao = st.selectbox(
+            "📊 Detalhar por:",
+            ["Classe", "UF", "Município"],
+            key="dimensao_deter"
+        )
+    
+    with col2_deter:
+        granularidade = st.selectbox(
+            "📅 Granularidade:",
+            ["Mensal", "Diária"],
+            key="granularidade_deter",
+            disabled=dimensao == "Município"
+        )
+    
+    with col3_deter:
+        ufs_deter = st.multiselect(
+            "🗺️ Estados:",
+            sorted(agregados_dia['uf'].cat.categories),
+            key="ufs_deter"
+        )
+    
+    start_year_deter, end_year_deter = st.select_slider(
+        "Período dos avisos:",
+        options=anos_deter,
+        value=(anos_deter[max(len(anos_deter) - 2, 0)], anos_deter[-1]),
+        key="periodo_deter"
+    )
+    
+    if dimensao == "Município":
+        deter_fig = CACHE_FIGURAS.obter(
+            create_ranking_municipios_deter, (agregados_mes,), versao_deter,
+            ufs=ufs_deter, start_year=start_year_deter, end_year=end_year_deter
+        )
+        render_figura(deter_fig)
+        return
+    
+    # Trecho ampliado por seleção no gráfico; vale enquanto os filtros não mudarem
+    filtros = (granularidade, dimensao, tuple(sorted(ufs_deter)), start_year_deter, end_year_deter)
+    zoom = st.session_state.get('zoom_deter')
+    intervalo = zoom['intervalo'] if zoom and zoom['filtros'] == filtros else None
+    
+    deter_fig = CACHE_FIGURAS.obter(
+        create_serie_alertas_deter, (agregados_dia,), versao_deter,
+        granularidade=granularidade, dimensao=dimensao, ufs=ufs_deter,
+        start_year=start_year_deter, end_year=end_year_deter, intervalo=intervalo
+    )
+    # A chave muda a cada ampliação para que o novo gráfico comece sem seleção
+    chave_grafico = f"grafico_deter_{st.session_state.get('ampliacoes_deter', 0)}"
+    render_figura(deter_fig, key=chave_grafico, selection_mode="box",
+                  on_select=partial(ampliar_serie_deter, chave_grafico, filtros))
+    
+    if intervalo:
+        st.button("🔍 Voltar ao período completo", key="limpar_zoom_deter",
+                  on_click=st.session_state.pop, args=('zoom_deter', None))
+    else:
+        st.caption("Selecione um trecho do gráfico para ampliá-lo com mais detalhe.")
+
+@st.fragment
+@INSTRUMENTACAO.medir_execucao
+def render_mapa_deter():
+    """Mapa dos avisos do DETER numa região, consultado pelo índice espacial"""
+    st.markdown("**🗺️ Avisos por Região**")
+    indice = load_indice_deter(versao_arquivos(ARQUIVO_CHECKPOINT_DETER))
+    if not len(indice):
+        st.info("💡 Geometrias do DETER não encontradas. Execute `python get_data_amz.py` "
+                "(avisos ingeridos sem geometria exigem `--reiniciar`).")
+        return
+    
+    anos_mapa = sorted(indice.atributos['view_date'].dt.year.unique())
+    col1_mapa, col2_mapa, col3_mapa = st.columns(3)
+    
+    with col1_mapa:
+        ufs_mapa = st.multiselect(
+            "🗺️ Estados:",
+            sorted(indice.atributos['uf'].dropna().unique()),
+            key="ufs_mapa_deter"
+        )
+    
+    with col2_mapa:
+        classes_mapa = st.multiselect(
+            "🏷️ Classes:",
+            sorted(indice.atributos['classname'].dropna().unique()),
+            key="classes_mapa_deter"
+        )
+    
+    with col3_mapa:
+        start_year_mapa, end_year_mapa = st.select_slider(
+            "📅 Período:",
+            options=anos_mapa,
+            value=(anos_mapa[max(len(anos_mapa) - 2, 0)], anos_mapa[-1]),
+            key="periodo_mapa_deter"
+        )
+    
+    xmin, ymin, xmax, ymax = indice.extensao
+    regiao = st.text_input(
+        "📐 Região (xmin, ymin, xmax, ymax em graus, ou polígono em WKT/GeoJSON):",
+        value=f"{xmin:.2f}, {ymin:.2f}, {xmax:.2f}, {ymax:.2f}",
+        key="regiao_mapa_deter",
+        help="Ex.: município ou unidade de conservação em WKT. Vazio: todos os avisos."
+    )
+    
+    try:
+        indices = indice.consultar(regiao or None, inicio=f'{start_year_mapa}-01-01', fim=f'{end_year_mapa}-12-31',
+                                   ufs=ufs_mapa, classes=classes_mapa)
+        mapa_fig = CACHE_FIGURAS.obter(
+            create_mapa_deter, (indice,), versao_arquivos(ARQUIVO_CHECKPOINT_DETER),
+            regiao=regiao, ufs=ufs_mapa, classes=classes_mapa,
+            start_year=start_year_mapa, end_year=end_year_mapa
+        )
+    except ErroRegiao as erro:
+        st.error(f"❌ {erro}")
+        return
+    
+    col4_mapa, col5_mapa = st.columns(2)
+    with col4_mapa:
+        st.metric("Avisos na Região", f"{len(indices):,}")
+    with col5_mapa:
+        st.metric("Área na Região", f"{indice.atributos['areamunkm'].to_numpy()[indices].sum():,.1f} km²")
+    
+    if mapa_fig is None:
+        st.info("💡 Nenhum aviso na região e no período selecionados.")
+    else:
+        render_figura(mapa_fig)
+
+def indicadores_agricultura(combined_ag, ano):
+    """KPIs da seção 5 no ano do censo: estabelecimentos familiares, não familiares e % familiar"""
+    ag_selected = combined_ag[combined_ag['Ano'] == ano]
+    total_familiar = ag_selected[ag_selected['Tipo'] == 'Agricultura familiar']['Total'].sum()
+    total_nao_familiar = ag_selected[ag_selected['Tipo'] == 'Agricultura não familiar']['Total'].sum()
+    return {
+        'ano': int(ano),
+        'total_familiar': total_familiar,
+        'total_nao_familiar': total_nao_familiar,
+        'percentual_familiar': total_familiar / (total_familiar + total_nao_familiar) * 100,
+    }
+
+@INSTRUMENTACAO.medir
 def create_violin_agricultura_familiar(ag_data):
     """Cria violin plot da distribuição da agricultura familiar"""
     # Preparar dados para violin plot
@@ -358,11 +877,8 @@ def create_violin_agricultura_familiar(ag_data):
             
             if not familiar.empty:
                 # Dados das diferentes faixas de área
-                areas = ['Menos de 2ha', 'De 2ha a 5ha', 'De 5ha a 10ha', 
-                        'De 10 a 20 ha', 'De 20 a 50 ha', 'De 50 a 100 ha', 'Mais que 100ha']
-                
                 values = []
-                for area in areas:
+                for area in FAIXAS_AREA:
                     if area in familiar.columns:
                         values.extend([familiar[area].iloc[0]] * 3)  # Repetir para distribuição
                 
@@ -381,32 +897,69 @@ def create_violin_agricultura_familiar(ag_data):
     
     return fig
 
-def main():
-    # Título principal
-    st.title("🌍 Dashboard Ambiental: Setores Econômicos e Degradação")
-    st.markdown("**Análise interativa dos impactos ambientais por setor econômico no Brasil**")
-    st.markdown("---")
+@INSTRUMENTACAO.medir
+def create_sunburst_agricultura_familiar(ag_data, ano):
+    """Cria sunburst da agricultura familiar no Brasil por faixa de área"""
+    familiar_brasil = ag_data[
+        (ag_data['Ano'] == ano) &
+        (ag_data['Tipo'] == 'Agricultura familiar') &
+        (ag_data['Região'] == 'Brasil')
+    ]
+    if familiar_brasil.empty:
+        return None
+    
+    valores_familiar = [familiar_brasil[area].iloc[0] for area in FAIXAS_AREA]
+    
+    fig_sunburst = go.Figure(go.Sunburst(
+        labels=FAIXAS_AREA,
+        values=valores_familiar
+    ))
+    fig_sunburst.update_layout(
+        title=f"Distribuição Agricultura Familiar por Tamanho ({ano})",
+        height=400
+    )
+    
+    return fig_sunburst
+
+@INSTRUMENTACAO.medir
+def render_figura(fig, **opcoes):
+    """Exibe uma figura do cache de figuras
     
-    # Carregar dados
+    `opcoes` são repassadas ao `st.plotly_chart` (por exemplo `on_select`);
+    retorna o estado da seleção quando houver.
+    """
+    return st.plotly_chart(fig, use_container_width=True, **opcoes)
+
+@contextmanager
+def exibir_erros_carregamento():
+    """Mostra erros de carregamento de dados na seção em que ocorrerem"""
     try:
-        ag_2017, ag_2006 = load_agricultura_data()
-        prodes_data = load_desmatamento_data()
-        emissoes_brutas, emissoes_liquidas = load_emissoes_data()
-        industria_data = load_industria_data()
-        
-        # Processar dados
-        combined_ag, familiar_df = process_agricultura_data(ag_2017, ag_2006)
-        emissoes_long = process_emissoes_data(emissoes_brutas)
-        
-        # Seção 1: Pergunta 1 - Setores que mais degradam
-        st.header("1. 🏭 Setores Econômicos que Mais Degradam o Meio Ambiente")
-        st.markdown("""
-        **Análise:** Com base nos dados de emissões do SEEG, identificamos os setores com maior impacto ambiental.
-        O gráfico treemap mostra a proporção de emissões por setor econômico.
-        """)
+        yield
+    except FileNotFoundError as e:
+        st.error(f"Erro ao carregar dados: {e}")
+        st.info("Verifique se todos os arquivos estão na pasta 'tratado' conforme esperado.")
+    except ErroEsquema as e:
+        st.error(f"Dados fora do esquema: {e}")
+        if e.celulas:
+            st.dataframe(pd.DataFrame(e.celulas, columns=['Linha', 'Coluna', 'Valor']), hide_index=True)
+    except Exception as e:
+        st.error(f"Erro inesperado: {e}")
+        st.info("Por favor, verifique a integridade dos dados e tente novamente.")
+
+def secao_sob_demanda(key):
+    """Expander cujo conteúdo só é executado quando aberto"""
+    return st.expander("Exibir análise", expanded=False, key=key, on_change="rerun")
+
+@st.fragment
+@INSTRUMENTACAO.medir_execucao
+def render_secao_emissoes():
+    """Seção 1: widgets desta seção só reexecutam esta seção"""
+    with exibir_erros_carregamento():
+        cubo_emissoes = load_cubo_emissoes()
+        versao_emissoes = versao_dados(*TABELAS_SEEG.values())
         
         # Controle específico para emissões
-        anos_emissoes = sorted(emissoes_long['Ano'].unique())
+        anos_emissoes = cubo_emissoes.anos_disponiveis('brutas')
         col1_control, col2_control, col3_control = st.columns([1, 1, 2])
         with col1_control:
             selected_year_emissoes = st.selectbox(
@@ -419,27 +972,34 @@ def main():
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            treemap_fig = create_treemap_setores_degradacao(emissoes_long, selected_year_emissoes)
-            st.plotly_chart(treemap_fig, use_container_width=True)
+            treemap_fig = CACHE_FIGURAS.obter(
+                create_treemap_setores_degradacao, (cubo_emissoes,), versao_emissoes,
+                selected_year=selected_year_emissoes
+            )
+            render_figura(treemap_fig)
         
         with col2:
             # KPIs de emissões
-            year_emissions = emissoes_long[emissoes_long['Ano'] == selected_year_emissoes]
-            total_emissions = year_emissions['Emissoes'].sum()
+            indicadores = indicadores_emissoes(cubo_emissoes, selected_year_emissoes)
             
-            st.metric("Total de Emissões", f"{total_emissions/1e9:.1f}B ton CO²eq")
+            st.metric("Total de Emissões", f"{indicadores['total']/1e9:.1f}B ton CO²eq")
             
             # Setor com maior emissão
-            top_setor = year_emissions.loc[year_emissions['Emissoes'].idxmax(), 'Categoria']
-            top_emission = year_emissions['Emissoes'].max()
-            
             st.metric(
                 "Maior Emissor", 
-                top_setor.split()[0] + "...",
-                f"{(top_emission/total_emissions)*100:.1f}% do total"
+                indicadores['maior_emissor'].split()[0] + "...",
+                f"{indicadores['participacao_maior_emissor']*100:.1f}% do total"
             )
-        
-        st.markdown("---")
+
+@st.fragment
+@INSTRUMENTACAO.medir_execucao
+def render_secoes_industria():
+    """Seções 2 e 3, num só fragmento: a seção 3 usa os anos escolhidos na seção 2"""
+    with exibir_erros_carregamento():
+        industria_data = load_industria_data()
+        cubo_emissoes = load_cubo_emissoes()
+        emissoes_long = cubo_emissoes.long('brutas')
+        versao_industria = versao_dados(ARQUIVO_INDUSTRIA, *TABELAS_SEEG.values())
         
         # Seção 2: Pergunta 2 - Relação entre setores e intensidade
         st.header("2. 📊 Relação entre Tipos de Setores e Intensidade de Degradação")
@@ -463,15 +1023,32 @@ def main():
         
         with col2_ind:
             st.markdown("**Setores Analisados:**")
-            st.info("4 setores industriais principais")
+            n_setores = industria_data.loc[industria_data[COLUNA_CNAE] != 'Total', COLUNA_CNAE].nunique()
+            st.info(f"{n_setores} setores industriais principais")
         
         with col3_ind:
             st.markdown("**Correlação:**")
             st.info("Dados industriais + emissões")
         
         if selected_years_industria:
-            barras_fig = create_barras_agrupadas_eficiencia_ambiental(industria_data, emissoes_long, selected_years_industria)
-            st.plotly_chart(barras_fig, use_container_width=True)
+            metricas_setores, medias_emissoes = compute_metricas_industriais(
+                industria_data, emissoes_long, selected_years_industria
+            )
+            render_analise_setores(metricas_setores, medias_emissoes)
+            
+            sem_setor = load_atividades_sem_setor()
+            if sem_setor:
+                st.warning(
+                    f"{len(sem_setor)} atividade(s) da CNAE sem setor de emissão no mapeamento "
+                    f"ficaram fora da análise: {', '.join(sem_setor[:10])}"
+                    + (" …" if len(sem_setor) > 10 else "")
+                )
+            
+            barras_fig = CACHE_FIGURAS.obter(
+                create_barras_agrupadas_eficiencia_ambiental, (metricas_setores,),
+                versao_metricas_industriais(selected_years_industria)
+            )
+            render_figura(barras_fig)
             
             # Insights adicionais sobre correlações
             st.markdown("### 🔍 Insights da Análise Multidimensional")
@@ -510,45 +1087,22 @@ def main():
         
         # Calcular KPI de eficiência (usando os anos já selecionados na seção anterior)
         if selected_years_industria:
-            industry_subset = industria_data[industria_data['Ano'].isin(selected_years_industria)]
-            emissions_subset = emissoes_long[emissoes_long['Ano'].isin(selected_years_industria)]
-            
-            # Criar KPI por ano
-            kpi_data = []
-            for year in selected_years_industria:
-                year_industry = industry_subset[industry_subset['Ano'] == year]
-                year_emissions = emissions_subset[emissions_subset['Ano'] == year]
-                
-                total_receita = year_industry['Receita - total (Mil Reais)'].sum()
-                total_emissoes = year_emissions['Emissoes'].sum()
-                
-                if total_emissoes > 0:
-                    eficiencia = total_receita / (total_emissoes / 1e6)  # Ajustar escala
-                    kpi_data.append({'Ano': year, 'Eficiência': eficiencia})
-            
-            if kpi_data:
-                kpi_df = pd.DataFrame(kpi_data)
-                
-                fig_kpi = px.line(
-                    kpi_df, 
-                    x='Ano', 
-                    y='Eficiência',
-                    title="Evolução da Eficiência Ambiental (Receita/Emissões)",
-                    markers=True
-                )
-                fig_kpi.update_layout(height=400)
-                st.plotly_chart(fig_kpi, use_container_width=True)
+            tabela_eficiencia = compute_eficiencia_anual()
+            fig_kpi = CACHE_FIGURAS.obter(
+                create_linha_eficiencia_ambiental, (tabela_eficiencia,), versao_industria,
+                selected_years=selected_years_industria
+            )
+            if fig_kpi is not None:
+                render_figura(fig_kpi)
         else:
             st.info("💡 Selecione anos na seção anterior para visualizar a eficiência ambiental.")
-        
-        st.markdown("---")
-        
-        # Seção 4: Pergunta 4 - Fatores de irresponsabilidade ambiental
-        st.header("4. ⚠️ Fatores Relacionados à Falta de Responsabilidade Ambiental")
-        st.markdown("""
-        **Análise:** O heatmap mostra a intensidade do desmatamento por estado ao longo do tempo.
-        Estados com colorações mais intensas apresentam maior risco ambiental.
-        """)
+
+@st.fragment
+@INSTRUMENTACAO.medir_execucao
+def render_secao_desmatamento():
+    """Seção 4 (heatmap PRODES e indicadores); os avisos do DETER são outro fragmento"""
+    with exibir_erros_carregamento():
+        prodes_data = load_desmatamento_data()
         
         # Controles específicos para desmatamento
         anos_desmat = sorted(prodes_data['Ano/Estados'].unique())
@@ -574,38 +1128,101 @@ def main():
             st.markdown("**Período selecionado:**")
             st.info(f"{end_year_desmat - start_year_desmat + 1} anos de análise")
         
-        heatmap_fig = create_heatmap_desmatamento_regional(prodes_data, start_year_desmat, end_year_desmat)
-        st.plotly_chart(heatmap_fig, use_container_width=True)
+        col4_desmat, col5_desmat = st.columns([1, 2])
+        
+        with col4_desmat:
+            nivel_desmat = st.selectbox(
+                "🗺️ Nível:",
+                niveis_prodes(),
+                key="nivel_desmat",
+                help=f"O nível municipal requer `tratado/{ARQUIVO_PRODES_MUNICIPIOS}` (ver atualizar_fontes.py)"
+            )
+        
+        matriz_prodes = load_matriz_prodes(nivel_desmat)
+        with col5_desmat:
+            ufs_desmat = st.multiselect(
+                "🗺️ Estados:",
+                matriz_prodes.lista_ufs,
+                key="ufs_desmat"
+            )
+        
+        heatmap_fig = CACHE_FIGURAS.obter(
+            create_heatmap_desmatamento_regional, (matriz_prodes,), versao_prodes(nivel_desmat),
+            start_year=start_year_desmat, end_year=end_year_desmat, ufs=ufs_desmat
+        )
+        render_figura(heatmap_fig)
+        
+        if nivel_desmat == 'Município':
+            st.markdown(f"**🏴 Municípios com maior desmatamento ({start_year_desmat}-{end_year_desmat})**")
+            st.dataframe(
+                matriz_prodes.ranking(start_year_desmat, end_year_desmat, ufs_desmat),
+                hide_index=True, use_container_width=True
+            )
         
         # Insights sobre fatores de risco
         col1, col2, col3 = st.columns(3)
         
-        recent_data = prodes_data[prodes_data['Ano/Estados'] == prodes_data['Ano/Estados'].max()]
+        indicadores = indicadores_desmatamento(load_motor_tendencias('Estado'))
         
         with col1:
-            max_desmat_estado = recent_data.drop('AMZ LEGAL', axis=1).iloc[0, 1:].idxmax()
-            max_desmat_valor = recent_data[max_desmat_estado].iloc[0]
-            st.metric("Estado com Maior Desmatamento", max_desmat_estado, f"{max_desmat_valor:,.0f} km²")
+            st.metric("Estado com Maior Desmatamento", indicadores['estado_maior_desmatamento'],
+                      f"{indicadores['area_estado']:,.0f} km²")
         
         with col2:
-            total_amz = recent_data['AMZ LEGAL'].iloc[0]
-            st.metric("Total Amazônia Legal", f"{total_amz:,.0f} km²", "Ano mais recente")
+            st.metric("Total Amazônia Legal", f"{indicadores['total_amazonia_legal']:,.0f} km²", "Ano mais recente")
         
         with col3:
             # Variação recente
-            if len(prodes_data) >= 2:
-                var_recente = ((recent_data['AMZ LEGAL'].iloc[0] / 
-                              prodes_data[prodes_data['Ano/Estados'] == prodes_data['Ano/Estados'].max()-1]['AMZ LEGAL'].iloc[0]) - 1) * 100
-                st.metric("Variação Anual", f"{var_recente:+.1f}%", "vs ano anterior")
+            if indicadores['variacao_anual'] is not None:
+                st.metric("Variação Anual", f"{indicadores['variacao_anual']:+.1f}%", "vs ano anterior")
         
-        st.markdown("---")
+        # Tendências e anomalias de todos os locais, calculadas de uma vez pelo motor
+        st.markdown(f"**📈 Tendências e Anomalias ({start_year_desmat}-{end_year_desmat})**")
+        motor = load_motor_tendencias(nivel_desmat)
+        col6_desmat, col7_desmat = st.columns(2)
         
-        # Seção 5: Pergunta 5 - Agricultura familiar e sustentabilidade
-        st.header("5. 🌱 Agricultura Familiar e Sustentabilidade")
-        st.markdown("""
-        **Análise:** A distribuição da agricultura familiar por região mostra que estabelecimentos menores
-        tendem a ter menor impacto ambiental per capita.
-        """)
+        with col6_desmat:
+            metodo_tendencia = st.selectbox(
+                "📐 Método:",
+                list(METODOS),
+                format_func=METODOS.get,
+                key="metodo_tendencia"
+            )
+        
+        with col7_desmat:
+            janela_tendencia = st.slider(
+                "🪟 Janela (anos):",
+                min_value=2,
+                max_value=max(min(15, len(anos_desmat) - 1), 2),
+                value=5,
+                key="janela_tendencia",
+                help=f"Anos usados na média móvel, na tendência e como base do z-score (anomalia: |z| ≥ {LIMIAR_ANOMALIA:g})"
+            )
+        
+        resumo = resumo_tendencias(motor, matriz_prodes, start_year_desmat, end_year_desmat,
+                                   janela_tendencia, ufs_desmat)
+        locais_serie = (ufs_desmat or ['AMZ LEGAL']) if nivel_desmat == 'Estado' else list(resumo['Local'][:5])
+        tendencia_fig = CACHE_FIGURAS.obter(
+            create_serie_tendencias, (motor,), versao_prodes(nivel_desmat),
+            metodo=metodo_tendencia, janela=janela_tendencia, locais=locais_serie,
+            start_year=start_year_desmat, end_year=end_year_desmat
+        )
+        if tendencia_fig is not None:
+            render_figura(tendencia_fig)
+        st.dataframe(
+            resumo.style.format({'Valor': '{:,.0f}', 'Média móvel': '{:,.1f}', 'Variação anual (%)': '{:+.1f}',
+                                 'z-score': '{:+.2f}', 'Tendência (por ano)': '{:+,.1f}', 'R²': '{:.2f}'},
+                                na_rep='—'),
+            hide_index=True, use_container_width=True
+        )
+
+@st.fragment
+@INSTRUMENTACAO.medir_execucao
+def render_secao_agricultura():
+    """Seção 5: agricultura familiar"""
+    with exibir_erros_carregamento():
+        combined_ag, familiar_df = load_agricultura_processada()
+        versao_agricultura = versao_dados(ARQUIVO_AGRICULTURA_2017, ARQUIVO_AGRICULTURA_2006)
         
         # Controles específicos para agricultura
         col1_ag, col2_ag, col3_ag = st.columns(3)
@@ -626,80 +1243,351 @@ def main():
             )
         
         if tipo_visualizacao == "Distribuição por Região":
-            violin_fig = create_violin_agricultura_familiar(combined_ag)
-            st.plotly_chart(violin_fig, use_container_width=True)
+            violin_fig = CACHE_FIGURAS.obter(
+                create_violin_agricultura_familiar, (combined_ag,), versao_agricultura
+            )
+            render_figura(violin_fig)
         
         # Comparação agricultura familiar vs não familiar
         st.subheader(f"Comparação: Agricultura Familiar vs Não Familiar ({ano_agricultura})")
         
-        # Selecionar dados do ano escolhido
-        ag_selected = ag_2017 if ano_agricultura == 2017 else ag_2006
-        
         col1, col2 = st.columns(2)
         
         with col1:
-            familiar_selected = ag_selected[ag_selected['Tipo'] == 'Agricultura familiar']
-            
             # Sunburst da agricultura familiar
-            familiar_brasil = familiar_selected[familiar_selected['Região'] == 'Brasil']
-            if not familiar_brasil.empty:
-                areas = ['Menos de 2ha', 'De 2ha a 5ha', 'De 5ha a 10ha', 'De 10 a 20 ha', 
-                        'De 20 a 50 ha', 'De 50 a 100 ha', 'Mais que 100ha']
-                valores_familiar = [familiar_brasil[area].iloc[0] for area in areas if area in familiar_brasil.columns]
-                
-                fig_sunburst = go.Figure(go.Sunburst(
-                    labels=areas[:len(valores_familiar)],
-                    values=valores_familiar
-                ))
-                fig_sunburst.update_layout(
-                    title=f"Distribuição Agricultura Familiar por Tamanho ({ano_agricultura})",
-                    height=400
-                )
-                st.plotly_chart(fig_sunburst, use_container_width=True)
+            fig_sunburst = CACHE_FIGURAS.obter(
+                create_sunburst_agricultura_familiar, (combined_ag,), versao_agricultura,
+                ano=ano_agricultura
+            )
+            if fig_sunburst is not None:
+                render_figura(fig_sunburst)
         
         with col2:
             # Métricas comparativas
-            total_familiar = ag_selected[ag_selected['Tipo'] == 'Agricultura familiar']['Total'].sum()
-            total_nao_familiar = ag_selected[ag_selected['Tipo'] == 'Agricultura não familiar']['Total'].sum()
-            
-            st.metric("Total Agricultura Familiar", f"{total_familiar:,.0f}", "estabelecimentos")
-            st.metric("Total Agricultura Não Familiar", f"{total_nao_familiar:,.0f}", "estabelecimentos")
+            indicadores = indicadores_agricultura(combined_ag, ano_agricultura)
             
-            prop_familiar = (total_familiar / (total_familiar + total_nao_familiar)) * 100
-            st.metric("% Agricultura Familiar", f"{prop_familiar:.1f}%", "do total")
+            st.metric("Total Agricultura Familiar", f"{indicadores['total_familiar']:,.0f}", "estabelecimentos")
+            st.metric("Total Agricultura Não Familiar", f"{indicadores['total_nao_familiar']:,.0f}", "estabelecimentos")
+            st.metric("% Agricultura Familiar", f"{indicadores['percentual_familiar']:.1f}%", "do total")
+
+@st.fragment
+@INSTRUMENTACAO.medir_execucao
+def render_secao_correlacoes():
+    """Seção 6: correlações defasadas entre desmatamento (PRODES) e emissões (SEEG)"""
+    with exibir_erros_carregamento():
+        motor = load_motor_correlacoes()
+        versao_correlacoes = versao_dados(ARQUIVO_PRODES, *TABELAS_SEEG.values())
         
-        st.markdown("---")
+        col1_corr, col2_corr, col3_corr = st.columns(3)
         
-        # Conclusões e insights
-        st.header("📈 Indicadores e Conclusões")
+        with col1_corr:
+            tabela_corr = st.selectbox(
+                "🏭 Tabela do SEEG:",
+                list(TABELAS_SEEG),
+                key="tabela_correlacoes"
+            )
         
-        col1, col2 = st.columns(2)
+        with col2_corr:
+            locais_corr = list(motor.locais)
+            local_corr = st.selectbox(
+                "🗺️ Desmatamento em:",
+                locais_corr,
+                index=locais_corr.index('AMZ LEGAL') if 'AMZ LEGAL' in locais_corr else 0,
+                key="local_correlacoes"
+            )
         
-        with col1:
-            st.subheader("🎯 Principais Insights")
-            st.markdown("""
-            - **Mudança de Uso da Terra** é o maior emissor de GEE
-            - **Agricultura familiar** representa a maioria dos estabelecimentos
-            - **Estados da Amazônia** concentram maior desmatamento
-            - **Eficiência ambiental** varia significativamente entre setores
-            """)
+        with col3_corr:
+            medida_corr = st.selectbox(
+                "📐 Medida:",
+                list(MEDIDAS),
+                format_func=MEDIDAS.get,
+                key="medida_correlacoes"
+            )
         
-        with col2:
-            st.subheader("📊 Recomendações")
-            st.markdown("""
-            - Foco em **tecnologias sustentáveis** para grandes propriedades
-            - **Incentivos** para agricultura familiar
-            - **Monitoramento intensivo** em estados críticos
-            - **Políticas setoriais** diferenciadas por impacto
-            """)
+        defasagem_min, defasagem_max = st.select_slider(
+            "⏳ Defasagens (anos entre o desmatamento e as emissões):",
+            options=list(range(DEFASAGEM_MAXIMA + 1)),
+            value=DEFASAGENS_PADRAO,
+            key="defasagens_correlacoes"
+        )
         
-    except FileNotFoundError as e:
-        st.error(f"Erro ao carregar dados: {e}")
-        st.info("Verifique se todos os arquivos estão na pasta 'tratado' conforme esperado.")
+        correlacoes_fig = CACHE_FIGURAS.obter(
+            create_heatmap_correlacoes, (motor,), versao_correlacoes,
+            tabela=tabela_corr, local=local_corr, defasagem_min=defasagem_min,
+            defasagem_max=defasagem_max, medida=medida_corr
+        )
+        if correlacoes_fig is not None:
+            render_figura(correlacoes_fig)
+        
+        ranking = motor.ranking(defasagem_min, defasagem_max, [local_corr], [tabela_corr])
+        if ranking.empty:
+            st.info("💡 Sem anos suficientes em comum para as defasagens selecionadas.")
+            return
+        
+        mais_forte = ranking.iloc[0]
+        col4_corr, col5_corr, col6_corr = st.columns(3)
+        
+        with col4_corr:
+            st.metric("Categoria Mais Correlacionada", mais_forte['Categoria'],
+                      f"defasagem de {mais_forte['Defasagem']} ano(s)")
+        
+        with col5_corr:
+            st.metric("Correlação", f"{mais_forte['Correlação']:+.2f}", f"{mais_forte['Anos']} anos")
+        
+        with col6_corr:
+            if not np.isnan(mais_forte['Elasticidade']):
+                st.metric("Elasticidade", f"{mais_forte['Elasticidade']:+.2f}", "% emissões por 1% de desmatamento")
+        
+        st.markdown(f"**🔗 Pares mais correlacionados ({defasagem_min}-{defasagem_max} anos de defasagem)**")
+        st.dataframe(
+            ranking.style.format({'Correlação': '{:+.2f}', 'Elasticidade': '{:+.2f}'}, na_rep='—'),
+            hide_index=True, use_container_width=True
+        )
+
+def preaquecer(alterados=None):
+    """Carrega todos os dados e gera as figuras do estado inicial de cada seção
     
-    except Exception as e:
-        st.error(f"Erro inesperado: {e}")
-        st.info("Por favor, verifique a integridade dos dados e tente novamente.")
+    Usa os mesmos valores padrão dos controles, de modo que a primeira sessão
+    já encontre os caches preenchidos. Com `alterados` (arquivos de `tratado/`
+    trocados), só as figuras que dependem deles são geradas de novo, e só os
+    dados delas são recarregados. Chamada por `servidor.py` ao iniciar o
+    servidor e a cada recarga; retorna o número de figuras geradas.
+    """
+    seeg = list(TABELAS_SEEG.values())
+    industria = [ARQUIVO_INDUSTRIA, *seeg]
+    agricultura = [ARQUIVO_AGRICULTURA_2017, ARQUIVO_AGRICULTURA_2006]
+    
+    def anos_industria():
+        return sorted(load_industria_data()['Ano'].unique())[-3:]
+    
+    def anos_desmat():
+        return sorted(load_desmatamento_data()['Ano/Estados'].unique())
+    
+    def treemap():
+        cubo_emissoes = load_cubo_emissoes()
+        return ((cubo_emissoes,), versao_dados(*seeg),
+                {'selected_year': cubo_emissoes.anos_disponiveis('brutas')[-1]})
+    
+    def barras():
+        anos = anos_industria()
+        metricas_setores, _ = compute_metricas_industriais(
+            load_industria_data(), load_cubo_emissoes().long('brutas'), anos
+        )
+        return (metricas_setores,), versao_metricas_industriais(anos), {}
+    
+    def linha():
+        return (compute_eficiencia_anual(),), versao_dados(*industria), {'selected_years': anos_industria()}
+    
+    def heatmap():
+        anos = anos_desmat()
+        return ((load_matriz_prodes('Estado'),), versao_prodes('Estado'),
+                {'start_year': anos[-10], 'end_year': anos[-1], 'ufs': []})
+    
+    def tendencias():
+        anos = anos_desmat()
+        return ((load_motor_tendencias('Estado'),), versao_prodes('Estado'),
+                {'metodo': 'media_movel', 'janela': 5, 'locais': ['AMZ LEGAL'],
+                 'start_year': anos[-10], 'end_year': anos[-1]})
+    
+    def correlacoes():
+        return ((load_motor_correlacoes(),), versao_dados(ARQUIVO_PRODES, *seeg),
+                {'tabela': 'brutas', 'local': 'AMZ LEGAL', 'defasagem_min': DEFASAGENS_PADRAO[0],
+                 'defasagem_max': DEFASAGENS_PADRAO[1], 'medida': 'correlacao'})
+    
+    def violin():
+        return (load_agricultura_processada()[0],), versao_dados(*agricultura), {}
+    
+    def sunburst():
+        return (load_agricultura_processada()[0],), versao_dados(*agricultura), {'ano': 2017}
+    
+    def alertas_deter():
+        versao_deter = versao_arquivos(*ARQUIVOS_AGREGADOS_DETER)
+        agregados = load_deter_agregados(versao_deter)
+        if len(agregados) < len(CHAVES_AGREGADOS):
+            return None
+        anos_deter = sorted(agregados['dia_uf_classe']['view_date'].dt.year.unique())
+        return ((agregados['dia_uf_classe'],), versao_deter,
+                {'granularidade': 'Mensal', 'dimensao': 'Classe', 'ufs': [],
+                 'start_year': anos_deter[max(len(anos_deter) - 2, 0)], 'end_year': anos_deter[-1],
+                 'intervalo': None})
+    
+    # (arquivos de origem, função de gráfico, argumentos: (dados, versão, parâmetros) ou None)
+    figuras = [
+        (seeg, create_treemap_setores_degradacao, treemap),
+        (industria, create_barras_agrupadas_eficiencia_ambiental, barras),
+        (industria, create_linha_eficiencia_ambiental, linha),
+        ([ARQUIVO_PRODES], create_heatmap_desmatamento_regional, heatmap),
+        ([ARQUIVO_PRODES], create_serie_tendencias, tendencias),
+        ([ARQUIVO_PRODES, *seeg], create_heatmap_correlacoes, correlacoes),
+        (agricultura, create_violin_agricultura_familiar, violin),
+        (agricultura, create_sunburst_agricultura_familiar, sunburst),
+        (ARQUIVOS_AGREGADOS_DETER, create_serie_alertas_deter, alertas_deter),
+    ]
+    
+    geradas = 0
+    for fontes, funcao, argumentos in figuras:
+        if alterados is not None and not set(fontes) & set(alterados):
+            continue
+        argumentos = argumentos()
+        if argumentos is not None:
+            dados, versao, parametros = argumentos
+            CACHE_FIGURAS.obter(funcao, dados, versao, **parametros)
+            geradas += 1
+    return geradas
+
+@INSTRUMENTACAO.medir_execucao
+def render_pagina():
+    """Todas as seções do dashboard"""
+    # Título principal
+    st.title("🌍 Dashboard Ambiental: Setores Econômicos e Degradação")
+    st.markdown("**Análise interativa dos impactos ambientais por setor econômico no Brasil**")
+    st.markdown("---")
+    
+    # Cada seção é um fragmento: mudar um controle reexecuta só a própria seção.
+    # Seção 1: Pergunta 1 - Setores que mais degradam
+    st.header("1. 🏭 Setores Econômicos que Mais Degradam o Meio Ambiente")
+    st.markdown("""
+    **Análise:** Com base nos dados de emissões do SEEG, identificamos os setores com maior impacto ambiental.
+    O gráfico treemap mostra a proporção de emissões por setor econômico.
+    """)
+    render_secao_emissoes()
+    
+    st.markdown("---")
+    
+    # Seções 2 e 3: Perguntas 2 e 3 - Setores industriais e eficiência ambiental
+    render_secoes_industria()
+    
+    st.markdown("---")
+    
+    # Seções abaixo da dobra: só são calculadas quando o usuário as abre
+    # Seção 4: Pergunta 4 - Fatores de irresponsabilidade ambiental
+    st.header("4. ⚠️ Fatores Relacionados à Falta de Responsabilidade Ambiental")
+    st.markdown("""
+    **Análise:** O heatmap mostra a intensidade do desmatamento por estado ao longo do tempo.
+    Estados com colorações mais intensas apresentam maior risco ambiental.
+    """)
+    with secao_sob_demanda("secao_desmatamento") as secao_desmatamento:
+        if secao_desmatamento.open:
+            render_secao_desmatamento()
+            # Avisos do DETER, complementando a taxa anual do PRODES
+            render_alertas_deter()
+            render_mapa_deter()
+    
+    st.markdown("---")
+    
+    # Seção 5: Pergunta 5 - Agricultura familiar e sustentabilidade
+    st.header("5. 🌱 Agricultura Familiar e Sustentabilidade")
+    st.markdown("""
+    **Análise:** A distribuição da agricultura familiar por região mostra que estabelecimentos menores
+    tendem a ter menor impacto ambiental per capita.
+    """)
+    with secao_sob_demanda("secao_agricultura") as secao_agricultura:
+        if secao_agricultura.open:
+            render_secao_agricultura()
+    
+    st.markdown("---")
+    
+    # Seção 6: desmatamento × emissões
+    st.header("6. 🔗 Desmatamento e Emissões")
+    st.markdown("""
+    **Análise:** Correlação entre a área desmatada (PRODES) em um ano e as emissões do SEEG
+    no mesmo ano ou nos anos seguintes, e a elasticidade (% de variação das emissões por 1% de
+    variação do desmatamento).
+    """)
+    with secao_sob_demanda("secao_correlacoes") as secao_correlacoes:
+        if secao_correlacoes.open:
+            render_secao_correlacoes()
+    
+    st.markdown("---")
+    
+    # Conclusões e insights
+    st.header("📈 Indicadores e Conclusões")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("🎯 Principais Insights")
+        st.markdown("""
+        - **Mudança de Uso da Terra** é o maior emissor de GEE
+        - **Agricultura familiar** representa a maioria dos estabelecimentos
+        - **Estados da Amazônia** concentram maior desmatamento
+        - **Eficiência ambiental** varia significativamente entre setores
+        """)
+    
+    with col2:
+        st.subheader("📊 Recomendações")
+        st.markdown("""
+        - Foco em **tecnologias sustentáveis** para grandes propriedades
+        - **Incentivos** para agricultura familiar
+        - **Monitoramento intensivo** em estados críticos
+        - **Políticas setoriais** diferenciadas por impacto
+        """)
+
+def tabelas_carregadas():
+    """Tabelas mantidas em memória pelos loaders, para o relatório de memória"""
+    ag_2017, ag_2006 = load_agricultura_data()
+    tabelas = {ARQUIVO_AGRICULTURA_2017: ag_2017, ARQUIVO_AGRICULTURA_2006: ag_2006,
+               ARQUIVO_PRODES: load_desmatamento_data(), ARQUIVO_INDUSTRIA: load_industria_data()}
+    tabelas.update({TABELAS_SEEG[nome]: tabela for nome, tabela in load_emissoes_data().items()})
+    tabelas.update({f'{DIRETORIO_DETER}/{nome}': tabela for nome, tabela in
+                    load_deter_agregados(versao_arquivos(*ARQUIVOS_AGREGADOS_DETER)).items()})
+    return tabelas
+
+@st.fragment
+def render_painel_desempenho():
+    """Spans das últimas execuções desta sessão e contadores dos caches (instrumentacao.py)"""
+    st.header("⏱️ Painel de Desempenho")
+    st.button("🔄 Atualizar", key="atualizar_desempenho")
+    
+    execucoes = INSTRUMENTACAO.execucoes_da_sessao(sessao_atual())[::-1]
+    if not execucoes:
+        st.info("💡 Nenhuma execução registrada ainda.")
+        return
+    
+    col1_perf, col2_perf = st.columns([2, 1])
+    
+    with col1_perf:
+        st.subheader("Últimas execuções")
+        resumo = pd.DataFrame([
+            {'id': execucao['id'], 'Execução': execucao['nome'],
+             'Horário': pd.Timestamp(execucao['horario'], unit='s'), 'Segundos': execucao['segundos']}
+            for execucao in execucoes
+        ])
+        st.dataframe(resumo, hide_index=True, use_container_width=True)
+        
+        selecionada = st.selectbox(
+            "Spans da execução:", [execucao['id'] for execucao in execucoes], key="execucao_desempenho"
+        )
+        spans = next(execucao['spans'] for execucao in execucoes if execucao['id'] == selecionada)
+        spans = pd.DataFrame(spans).sort_values('inicio_s')
+        spans['etapa'] = ['  ' * (nivel - 1) + etapa for nivel, etapa in zip(spans['nivel'], spans['etapa'])]
+        st.dataframe(spans.drop(columns='nivel'), hide_index=True, use_container_width=True)
+    
+    totais_etapas, totais_caches = INSTRUMENTACAO.totais(execucoes)
+    with col2_perf:
+        st.subheader("Caches")
+        caches = pd.DataFrame.from_dict(totais_caches, orient='index')
+        if not caches.empty:
+            caches['Taxa de acerto'] = caches['acertos'] / (caches['acertos'] + caches['falhas'])
+        st.dataframe(caches, use_container_width=True)
+        
+        st.subheader("Totais por etapa")
+        etapas = pd.DataFrame.from_dict(totais_etapas, orient='index')
+        st.dataframe(etapas.sort_values('segundos', ascending=False), use_container_width=True)
+        
+        st.subheader("Memória")
+        st.metric("Memória residente do worker", f"{rss_atual_mb():,.0f} MB")
+        st.dataframe(memoria_tabelas(tabelas_carregadas()), hide_index=True, use_container_width=True)
+
+def main():
+    render_pagina()
+    
+    # Painel opcional: `?depuracao=1` o exibe só se a instrumentação foi ligada no servidor
+    # (DASHBOARD_INSTRUMENTACAO=1); a URL não a liga para o processo
+    if INSTRUMENTACAO.ativo and st.query_params.get('depuracao') == '1':
+        st.markdown("---")
+        render_painel_desempenho()
 
-if __name__ == "__main__":
+# `servidor.py` executa este arquivo sem a interface, só para pré-aquecer os caches
+if __name__ == "__main__" and not globals().get('SOMENTE_CARREGAR'):
     main() 
\ No newline at end of file
@@ -0,0 +1,311 @@
+"""Conversão das planilhas do IBGE (`dados_brutos/`) nos CSVs de `tratado/`.
+
+Cada planilha de PLANILHAS é convertida num processo próprio
+(`ProcessPoolExecutor`), lida em streaming pelo openpyxl (modo read-only,
+linha a linha, sem carregar a pasta inteira na memória). A conversão limpa
+os cabeçalhos (quebras de linha e espaços), agrupa as faixas de área dos
+censos agropecuários nas faixas usadas pelo dashboard, renomeia as
+tipologias, retira o código da CNAE e converte os símbolos do IBGE ('-' é
+zero absoluto; 'X', '..' e '...' interrompem a conversão apontando a
+célula).
+
+O manifesto (`compilado/manifesto_planilhas.json`) guarda, para cada
+planilha, o hash da origem (e do complemento, quando houver) e do CSV
+produzido, o número de linhas e o tempo da última conversão. Planilhas cujo
+conteúdo não mudou desde então (e cujo CSV não foi alterado à mão) são
+puladas. Os CSVs regravados têm o Parquet recompilado (`armazenamento.py`).
+
+Uso:
+    python etl_planilhas.py [--forcar] [--processos N] [nomes ...]
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import openpyxl
+
+import armazenamento
+
+CAMINHO_MANIFESTO = armazenamento.DIRETORIO_COMPILADO / 'manifesto_planilhas.json'
+
+# Muda quando a conversão muda (todas as planilhas são convertidas de novo)
+VERSAO_ETL = 1
+
+# Símbolos do IBGE: '-' é zero absoluto; os demais não têm valor numérico
+SIMBOLO_ZERO = '-'
+SIMBOLOS_SEM_VALOR = {'X': 'valor inibido', '..': 'não se aplica', '...': 'valor não disponível'}
+
+# Limite inferior (ha) de cada faixa de área do dashboard, com o nome usado em cada censo
+LIMITES_FAIXAS = [0, 2, 5, 10, 20, 50, 100]
+FAIXAS_2006 = ['Menos de 2ha', 'De 2ha a 5ha', 'De 5ha a 10ha', 'De 10ha a 20ha',
+               'De 20ha a 50ha', 'De 50ha a 100ha', 'Mais que 100ha']
+FAIXAS_2017 = ['Menos de 2ha', 'De 2ha a 5ha', 'De 5ha a 10ha', 'De 10 a 20 ha',
+               'De 20 a 50 ha', 'De 50 a 100 ha', 'Mais que 100ha']
+
+
+class ErroPlanilha(ValueError):
+    """Planilha do IBGE fora do formato esperado pela conversão"""
+
+
+def limpar_texto(valor):
+    """Texto de uma célula sem quebras de linha nem espaços repetidos"""
+    return re.sub(r'\s+', ' ', str(valor)).strip()
+
+
+def valor_numerico(valor, linha, coluna):
+    """Número de uma célula, com os símbolos do IBGE tratados"""
+    if isinstance(valor, (int, float)):
+        return valor
+    texto = limpar_texto(valor) if valor is not None else ''
+    if texto == SIMBOLO_ZERO:
+        return 0
+    if texto in SIMBOLOS_SEM_VALOR:
+        raise ErroPlanilha(f"Linha {linha}, coluna '{coluna}': {SIMBOLOS_SEM_VALOR[texto]} ('{texto}')")
+    try:
+        return int(texto.replace('.', ''))
+    except ValueError:
+        raise ErroPlanilha(f"Linha {linha}, coluna '{coluna}': valor não numérico '{texto}'") from None
+
+
+def limite_inferior(faixa):
+    """Limite inferior, em hectares, de uma faixa de área do IBGE ('De 0,1 a menos de 0,2 ha')"""
+    texto = faixa.lower()
+    if 'sem área' in texto or texto.startswith('menos de'):
+        return 0
+    numero = re.search(r'\d[\d.]*(?:,\d+)?', texto)
+    if numero is None:
+        raise ErroPlanilha(f"Faixa de área sem limite reconhecível: '{faixa}'")
+    return float(numero.group().replace('.', '').replace(',', '.'))
+
+
+def indice_faixa(faixa):
+    """Posição em LIMITES_FAIXAS da faixa do dashboard que contém uma faixa do IBGE"""
+    limite = limite_inferior(faixa)
+    return max(i for i, inicio in enumerate(LIMITES_FAIXAS) if inicio <= limite)
+
+
+def ler_linhas(caminho):
+    """Linhas (valores) da primeira aba de uma planilha, lidas em streaming; pula as vazias"""
+    pasta = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        for numero, valores in enumerate(pasta.worksheets[0].iter_rows(values_only=True), start=1):
+            if any(valor is not None for valor in valores):
+                yield numero, valores
+    finally:
+        pasta.close()
+
+
+def ler_complemento(caminho, tipos):
+    """Linhas dos `tipos` num CSV de complemento de `dados_brutos/`: {tipo: {região: {coluna: valor}}}"""
+    complemento = {tipo: {} for tipo in tipos}
+    with open(caminho, newline='', encoding='utf-8-sig') as f:
+        for linha in csv.DictReader(f):
+            if linha['Tipo'] in complemento:
+                complemento[linha['Tipo']][linha['Região']] = linha
+    return complemento
+
+
+def converter_agricultura(linhas, faixas, tipos, complemento=None):
+    """Converte uma tabela do censo agropecuário (região × tipologia × faixas de área)
+
+    As faixas do IBGE são somadas na faixa do dashboard que contém seu limite
+    inferior ('Produtor sem área' entra na primeira). Só as tipologias de
+    `tipos` ({nome no IBGE: nome no CSV}) são mantidas. Tipologias ausentes da
+    tabela vêm de `complemento` (ver `ler_complemento`);
+    se a tabela não tiver a linha 'Total', ela é a soma das linhas da região.
+    """
+    complemento = complemento or {}
+    _, cabecalho = next(linhas)
+    cabecalho = [limpar_texto(coluna) for coluna in cabecalho]
+    faixas_colunas = [indice_faixa(coluna) for coluna in cabecalho[3:]]
+    yield ['Região', 'Tipo', *faixas, 'Total']
+
+    def fechar_regiao(regiao, saidas):
+        for tipo, linhas_tipo in complemento.items():
+            linha = linhas_tipo.get(regiao)
+            if linha is None:
+                raise ErroPlanilha(f"Sem dados de '{tipo}' para a região '{regiao}' no complemento")
+            saidas.append([regiao, tipo, *(int(linha[coluna]) for coluna in [*faixas, 'Total'])])
+        if 'Total' not in tipos.values():
+            saidas.append([regiao, 'Total', *(sum(valores) for valores in zip(*(saida[2:] for saida in saidas)))])
+        return saidas
+
+    regiao, saidas = None, []
+    for numero, valores in linhas:
+        if valores[0] is not None and limpar_texto(valores[0]) != regiao:
+            if regiao is not None:
+                yield from fechar_regiao(regiao, saidas)
+            regiao, saidas = limpar_texto(valores[0]), []
+        tipo = tipos.get(limpar_texto(valores[1]))
+        if tipo is None:
+            continue
+        somas = [0] * len(faixas)
+        for indice, coluna, valor in zip(faixas_colunas, cabecalho[3:], valores[3:]):
+            somas[indice] += valor_numerico(valor, numero, coluna)
+        saidas.append([regiao, tipo, *somas, valor_numerico(valores[2], numero, cabecalho[2])])
+    if regiao is not None:
+        yield from fechar_regiao(regiao, saidas)
+
+
+def converter_industria(linhas):
+    """Converte a tabela da PIA-Empresa (ano × atividade da CNAE), sem o código da CNAE"""
+    _, cabecalho = next(linhas)
+    cabecalho = [limpar_texto(coluna) for coluna in cabecalho]
+    yield cabecalho
+    for numero, valores in linhas:
+        atividade = re.sub(r'^\d+(\.\d+)?\s+', '', limpar_texto(valores[1]))
+        yield [int(valor_numerico(valores[0], numero, cabecalho[0])), atividade,
+               *(valor_numerico(valor, numero, coluna) for coluna, valor in zip(cabecalho[2:], valores[2:]))]
+
+
+# Planilhas conhecidas: origem (relativa à raiz do projeto), destino em `tratado/` e conversão
+PLANILHAS = {
+    'agricultura_2006': {
+        'origem': 'dados_brutos/dados_agricultura_2006.xlsx',
+        'destino': 'dados agricultura/dados-agricultura-2006.csv',
+        'converter': converter_agricultura,
+        # A tabela do Censo 2006 (classificação FAO/INCRA) só traz a agricultura
+        # familiar: a não familiar vem de outra tabela, já agrupada nas faixas do
+        # dashboard, num CSV versionado em `dados_brutos/`
+        'parametros': {'faixas': FAIXAS_2006, 'tipos': {'Total': 'Agricultura familiar'}},
+        'complemento': 'dados_brutos/agricultura_nao_familiar_2006.csv',
+        'complementar': ['Agricultura não familiar'],
+    },
+    'agricultura_2017': {
+        'origem': 'dados_brutos/dados_agricultura_2017.xlsx',
+        'destino': 'dados agricultura/dados-agricultura-2017.csv',
+        'converter': converter_agricultura,
+        'parametros': {'faixas': FAIXAS_2017, 'tipos': {
+            'Total': 'Total',
+            'Agricultura familiar - não': 'Agricultura não familiar',
+            'Agricultura familiar - sim': 'Agricultura familiar',
+        }},
+    },
+    'industria': {
+        'origem': 'dados_brutos/dados_industriais.xlsx',
+        'destino': 'dados industria/dados-industriais.csv',
+        'converter': converter_industria,
+    },
+}
+
+
+def converter_planilha(nome):
+    """Converte uma planilha e grava o CSV (executada num processo do pool); retorna a entrada do manifesto"""
+    planilha = PLANILHAS[nome]
+    inicio = time.perf_counter()
+    destino = armazenamento.DIRETORIO_TRATADO / planilha['destino']
+    parametros = dict(planilha.get('parametros', {}))
+    if planilha.get('complemento'):
+        parametros['complemento'] = ler_complemento(planilha['complemento'], planilha['complementar'])
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_name(destino.name + '.tmp')
+    try:
+        with open(temporario, 'w', newline='', encoding='utf-8') as f:
+            escritor = csv.writer(f, lineterminator='\n')
+            linhas = -1  # sem o cabeçalho
+            for linha in planilha['converter'](ler_linhas(planilha['origem']), **parametros):
+                escritor.writerow(linha)
+                linhas += 1
+        os.replace(temporario, destino)
+    finally:
+        temporario.unlink(missing_ok=True)
+
+    return {
+        'origem': planilha['origem'],
+        'sha256_origem': armazenamento.hash_arquivo(planilha['origem']),
+        'sha256_complemento': hash_complemento(planilha),
+        'destino': planilha['destino'],
+        'sha256_destino': armazenamento.hash_arquivo(destino),
+        'linhas': linhas,
+        'segundos': round(time.perf_counter() - inicio, 3),
+        'versao_etl': VERSAO_ETL,
+    }
+
+
+def hash_complemento(planilha):
+    """Hash do CSV de complemento de uma planilha (None se ela não tiver complemento)"""
+    return armazenamento.hash_arquivo(planilha['complemento']) if planilha.get('complemento') else None
+
+
+def carregar_manifesto(caminho=CAMINHO_MANIFESTO):
+    """Entradas do manifesto da última conversão de cada planilha"""
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return {}
+    return json.loads(caminho.read_text(encoding='utf-8'))
+
+
+def atualizada(nome, entrada):
+    """Se o CSV da planilha ainda corresponde à conversão registrada no manifesto"""
+    planilha = PLANILHAS[nome]
+    destino = armazenamento.DIRETORIO_TRATADO / planilha['destino']
+    return (entrada is not None and entrada.get('versao_etl') == VERSAO_ETL and destino.exists() and
+            entrada.get('sha256_origem') == armazenamento.hash_arquivo(planilha['origem']) and
+            entrada.get('sha256_complemento') == hash_complemento(planilha) and
+            entrada.get('sha256_destino') == armazenamento.hash_arquivo(destino))
+
+
+def executar_etl(nomes=None, forcar=False, processos=None, caminho_manifesto=CAMINHO_MANIFESTO):
+    """Converte as planilhas alteradas em paralelo e recompila seus Parquets; retorna {nome: situação}"""
+    manifesto = carregar_manifesto(caminho_manifesto)
+    nomes = list(PLANILHAS if nomes is None else nomes)
+    situacoes = {nome: 'sem alterações' for nome in nomes
+                 if not forcar and atualizada(nome, manifesto.get(nome))}
+    pendentes = [nome for nome in nomes if nome not in situacoes]
+
+    if pendentes:
+        with ProcessPoolExecutor(max_workers=min(len(pendentes), processos or os.cpu_count())) as pool:
+            futuros = {nome: pool.submit(converter_planilha, nome) for nome in pendentes}
+            for nome, futuro in futuros.items():
+                try:
+                    manifesto[nome] = futuro.result()
+                except Exception as e:
+                    situacoes[nome] = f'erro: {e}'
+                    continue
+                armazenamento.compilar_tabela(PLANILHAS[nome]['destino'])
+                situacoes[nome] = 'convertida'
+
+    for nome, situacao in situacoes.items():
+        if nome in manifesto:
+            manifesto[nome]['situacao'] = situacao
+    caminho_manifesto = Path(caminho_manifesto)
+    caminho_manifesto.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho_manifesto.with_name(caminho_manifesto.name + '.tmp')
+    temporario.write_text(json.dumps(manifesto, indent=2, ensure_ascii=False), encoding='utf-8')
+    os.replace(temporario, caminho_manifesto)
+    return {nome: situacoes[nome] for nome in nomes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('nomes', nargs='*', help=f"planilhas a converter (padrão: todas): {', '.join(PLANILHAS)}")
+    parser.add_argument('--forcar', action='store_true', help='converte mesmo as planilhas sem alterações')
+    parser.add_argument('--processos', type=int, help='processos em paralelo (padrão: um por CPU)')
+    args = parser.parse_args()
+
+    desconhecidas = set(args.nomes) - set(PLANILHAS)
+    if desconhecidas:
+        parser.error(f"Planilhas desconhecidas: {', '.join(sorted(desconhecidas))}")
+    # Caminhos de `dados_brutos/`, `tratado/` e `compilado/` são relativos à raiz do projeto
+    os.chdir(Path(__file__).resolve().parent)
+
+    situacoes = executar_etl(args.nomes or None, args.forcar, args.processos)
+    manifesto = carregar_manifesto()
+    for nome, situacao in situacoes.items():
+        entrada = manifesto.get(nome, {})
+        detalhes = f" ({entrada['linhas']} linhas em {entrada['segundos']:.2f}s)" if situacao == 'convertida' else ''
+        print(f"{nome}: {situacao}{detalhes}")
+
+    if any(situacao.startswith('erro') for situacao in situacoes.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
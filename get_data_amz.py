@@ -1,9 +1,381 @@
-import geopandas as gpd
+"""Ingestão dos avisos do DETER Amazônia em Parquet particionado.
 
-gdf = gpd.read_file('deter-amz-public-2025mai23/deter-amz-deter-public.shp')
+Lê o shapefile do DETER (ou um CSV exportado dele) em lotes de tamanho fixo,
+normaliza os tipos (datas, classes, UF) conforme
+`dados_brutos/deter_amz_dados.txt` e grava os avisos em
+`deter/alertas/ano=AAAA/uf=XX/*.parquet`. A memória usada depende do tamanho
+do lote, não do tamanho do arquivo.
 
-gdf_sem_geom = gdf.drop(columns='geometry')
+As geometrias dos avisos são gravadas em WKB na coluna `geometry`, com a
+caixa envolvente em `bbox` e os metadados GeoParquet (1.1) no schema, e
+alimentam o índice espacial de `indice_espacial.py`.
 
-gdf_sem_geom.to_csv('deter_amz_dados.csv', index=False)
+Um checkpoint (`deter/checkpoint.json`) guarda a data do aviso mais recente
+já processado. As execuções seguintes releem a fonte a partir de
+JANELA_ATRASO_DIAS dias antes dessa data, porque o DETER publica avisos com
+`view_date` antiga, e gravam só os avisos cujo `fid` ainda não está no
+dataset (consultados só nos anos de cada lote, sem carregar todos os `fid`
+gravados). Os agregados usados pelo dashboard (`agregados_deter.py`) são
+atualizados na mesma execução, somando apenas os avisos novos.
 
-print("Arquivo CSV criado: deter_amz_dados.csv")
\ No newline at end of file
+Cada execução grava seus lotes em `deter/execucoes/<id>/`, fora do dataset
+lido pelo dashboard, e só os publica (move os arquivos para `alertas/`,
+atualiza os agregados e o checkpoint) depois do último lote, quando grava
+`concluida.json`. Se o processo morrer no meio (ex.: falta de memória), a
+execução seguinte descarta as execuções sem esse marcador e termina a
+publicação das que o têm, recalculando os agregados a partir dos avisos.
+
+Uso:
+    python get_data_amz.py [fonte] [--destino deter] [--lote 50000] [--janela-dias 90] [--reiniciar]
+    python get_data_amz.py --reconstruir-agregados [--destino deter]
+"""
+import argparse
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import shapely
+
+from agregados_deter import (agregar_alertas, carregar_agregados, gravar_agregados,
+                             mesclar_agregados, reconstruir_agregados)
+
+FONTE_PADRAO = 'deter-amz-public-2025mai23/deter-amz-deter-public.shp'
+DESTINO_PADRAO = 'deter'
+
+# O shapefile limita os nomes de coluna a 10 caracteres; a geometria vem do
+# pyogrio como `wkb_geometry` (WKB) e dos CSVs exportados pelo QGIS como `WKT`
+COLUNAS_SHAPEFILE = {
+    'municipali': 'municipality',
+    'publish_mo': 'publish_month',
+    'wkb_geometry': 'geometry',
+    'WKT': 'geometry',
+}
+
+# Dias relidos antes da data mais recente já gravada (avisos publicados com atraso);
+# 0 relê a fonte inteira
+JANELA_ATRASO_DIAS = 90
+
+# Caixa envolvente de cada aviso (colunas planas no DataFrame, struct `bbox` no Parquet)
+COLUNAS_BBOX = ['xmin', 'ymin', 'xmax', 'ymax']
+
+# Esquema dos avisos gravados (colunas ausentes na fonte ficam nulas)
+ESQUEMA_ALERTAS = pa.schema([
+    ('fid', pa.string()),
+    ('classname', pa.dictionary(pa.int8(), pa.string())),
+    ('quadrant', pa.string()),
+    ('path_row', pa.string()),
+    ('view_date', pa.date32()),
+    ('sensor', pa.dictionary(pa.int8(), pa.string())),
+    ('satellite', pa.dictionary(pa.int8(), pa.string())),
+    ('areauckm', pa.float32()),
+    ('uc', pa.string()),
+    ('areamunkm', pa.float32()),
+    ('municipality', pa.string()),
+    ('geocodibge', pa.int32()),
+    ('uf', pa.string()),
+    ('geometry', pa.binary()),
+    ('ano', pa.int16()),
+    ('mes', pa.int8()),
+    ('bbox', pa.struct([(coluna, pa.float64()) for coluna in COLUNAS_BBOX])),
+])
+
+PARTICIONAMENTO = ds.partitioning(
+    pa.schema([('ano', pa.int16()), ('uf', pa.string())]), flavor='hive'
+)
+
+
+def metadados_geo(crs=None):
+    """Metadados GeoParquet 1.1 da coluna `geometry` (WKB), com `bbox` como covering
+
+    `crs` é o PROJJSON do sistema de coordenadas da fonte (None se desconhecido).
+    """
+    return json.dumps({
+        'version': '1.1.0',
+        'primary_column': 'geometry',
+        'columns': {'geometry': {
+            'encoding': 'WKB',
+            'geometry_types': [],
+            'crs': crs,
+            'covering': {'bbox': {coluna: ['bbox', coluna] for coluna in COLUNAS_BBOX}},
+        }},
+    })
+
+
+def crs_fonte(fonte):
+    """PROJJSON do sistema de coordenadas do shapefile (None para CSV ou sem CRS)"""
+    if str(fonte).lower().endswith('.csv'):
+        return None
+
+    import pyogrio
+
+    with pyogrio.open_arrow(fonte, batch_size=1, use_pyarrow=True) as (_, leitor):
+        for campo in leitor.schema:
+            extensao = (campo.metadata or {}).get(b'ARROW:extension:metadata')
+            if extensao:
+                return json.loads(extensao).get('crs')
+    return None
+
+
+def ler_lotes(fonte, tamanho_lote, desde=None):
+    """Gera DataFrames de até `tamanho_lote` avisos lidos da fonte
+
+    Para shapefiles, `desde` (data) é aplicado como filtro na leitura.
+    """
+    if str(fonte).lower().endswith('.csv'):
+        yield from pd.read_csv(fonte, chunksize=tamanho_lote, dtype=str)
+        return
+
+    import pyogrio
+
+    filtro = f"view_date >= '{desde:%Y-%m-%d}'" if desde is not None else None
+    with pyogrio.open_arrow(fonte, batch_size=tamanho_lote, where=filtro,
+                            use_pyarrow=True) as (_, leitor):
+        for lote in leitor:
+            yield pa.Table.from_batches([lote]).to_pandas()
+
+
+def normalizar_geometrias(valores):
+    """Geometrias em WKB e a caixa envolvente de cada uma (NaN sem geometria)
+
+    Aceita WKB (shapefile) ou WKT (CSV); valores ausentes ou inválidos ficam
+    sem geometria.
+    """
+    valores = np.asarray(valores, dtype=object)
+    binarios = np.array([isinstance(valor, bytes) for valor in valores], dtype=bool)
+    textos = np.array([isinstance(valor, str) for valor in valores], dtype=bool)
+    geometrias = np.full(len(valores), None, dtype=object)
+    geometrias[binarios] = shapely.from_wkb(valores[binarios], on_invalid='ignore')
+    geometrias[textos] = shapely.from_wkt(valores[textos], on_invalid='ignore')
+    wkb = np.where(binarios, valores, None)
+    wkb[textos] = shapely.to_wkb(geometrias[textos])
+    wkb[shapely.is_missing(geometrias)] = None
+    return wkb, shapely.bounds(geometrias)
+
+
+def normalizar_lote(df):
+    """Aplica nomes e tipos canônicos a um lote de avisos"""
+    df = df.rename(columns=COLUNAS_SHAPEFILE)
+    df = df.reindex(columns=[campo.name for campo in ESQUEMA_ALERTAS if campo.name not in ('ano', 'mes', 'bbox')])
+
+    df['view_date'] = pd.to_datetime(df['view_date'], errors='coerce')
+    df = df[df['view_date'].notna()]
+
+    for coluna in ('classname', 'uf', 'sensor', 'satellite'):
+        df[coluna] = df[coluna].astype('string').str.strip().str.upper()
+    for coluna in ('areauckm', 'areamunkm'):
+        df[coluna] = pd.to_numeric(df[coluna], errors='coerce').astype('float32')
+    df['geocodibge'] = pd.to_numeric(df['geocodibge'], errors='coerce').astype('Int32')
+    for coluna in ('fid', 'quadrant', 'path_row', 'uc', 'municipality'):
+        df[coluna] = df[coluna].astype('string')
+
+    df['geometry'], caixas = normalizar_geometrias(df['geometry'])
+    df[COLUNAS_BBOX] = caixas
+
+    df['ano'] = df['view_date'].dt.year.astype('int16')
+    df['mes'] = df['view_date'].dt.month.astype('int8')
+    df['view_date'] = df['view_date'].dt.date
+    return df.reset_index(drop=True)
+
+
+def carregar_checkpoint(destino):
+    """Checkpoint da última execução, ou None"""
+    caminho = Path(destino) / 'checkpoint.json'
+    if not caminho.exists():
+        return None
+    return json.loads(caminho.read_text(encoding='utf-8'))
+
+
+def gravar_checkpoint(destino, checkpoint):
+    """Grava o checkpoint de forma atômica"""
+    caminho = Path(destino) / 'checkpoint.json'
+    temporario = caminho.with_suffix('.json.tmp')
+    temporario.write_text(json.dumps(checkpoint, ensure_ascii=False), encoding='utf-8')
+    os.replace(temporario, caminho)
+
+
+def abrir_alertas(diretorio_alertas):
+    """Dataset (pyarrow) dos avisos gravados, ou None se ainda não há nenhum"""
+    if not any(Path(diretorio_alertas).rglob('*.parquet')):
+        return None
+    return ds.dataset(diretorio_alertas, format='parquet', partitioning=PARTICIONAMENTO, schema=ESQUEMA_ALERTAS)
+
+
+def fids_gravados(alertas, df):
+    """Índice dos `fid` do lote `df` que já estão no dataset `alertas`
+
+    O próprio dataset é o registro do que foi ingerido. A leitura fica nas
+    partições dos anos do lote e o filtro por `fid` é aplicado ao ler: a
+    memória depende do lote, não do número de avisos gravados.
+    """
+    fids = df['fid'].dropna().unique()
+    if alertas is None or not len(fids):
+        return pd.Index([], dtype=object)
+    filtro = (pc.field('ano').isin(pa.array(df['ano'].unique(), pa.int16())) &
+              pc.field('fid').isin(pa.array(np.asarray(fids, dtype=object), pa.string())))
+    encontrados = alertas.to_table(columns=['fid'], filter=filtro)['fid']
+    return pd.Index(encontrados.to_numpy(zero_copy_only=False)).unique()
+
+
+def filtrar_novos(df, gravados):
+    """Descarta avisos cujo `fid` já foi gravado (em `gravados`) ou se repete no lote
+
+    Avisos sem `fid` não podem ser conferidos e são mantidos.
+    """
+    fids = df['fid']
+    repetidos = fids.duplicated() & fids.notna()
+    if len(gravados):
+        repetidos |= gravados.get_indexer(fids) >= 0
+    return df[~repetidos.to_numpy()]
+
+
+def atualizar_checkpoint(checkpoint, df):
+    """Checkpoint com a data do aviso mais recente já gravado"""
+    if df.empty:
+        return checkpoint
+    ultima_data = df['view_date'].max()
+    if checkpoint is not None:
+        ultima_data = max(ultima_data, pd.Timestamp(checkpoint['ultima_data']).date())
+    return {'ultima_data': ultima_data.isoformat()}
+
+
+def inicio_releitura(checkpoint, janela_dias):
+    """Data a partir da qual a fonte é relida (None: a fonte inteira)"""
+    if checkpoint is None or not janela_dias:
+        return None
+    return pd.Timestamp(checkpoint['ultima_data']) - pd.Timedelta(days=janela_dias)
+
+
+def gravar_lote(df, diretorio_alertas, execucao, numero, crs=None):
+    """Grava um lote normalizado (GeoParquet) na partição ano/UF correspondente"""
+    campo_bbox = ESQUEMA_ALERTAS.field('bbox')
+    tabela = pa.Table.from_pandas(df.drop(columns=COLUNAS_BBOX),
+                                  schema=pa.schema(list(ESQUEMA_ALERTAS)[:-1]), preserve_index=False)
+    caixas = df[COLUNAS_BBOX].to_numpy()
+    tabela = tabela.append_column(campo_bbox, pa.StructArray.from_arrays(
+        [pa.array(caixas[:, i]) for i in range(len(COLUNAS_BBOX))],
+        fields=list(campo_bbox.type), mask=pa.array(np.isnan(caixas[:, 0]))
+    ))
+    tabela = tabela.replace_schema_metadata({'geo': metadados_geo(crs)})
+    ds.write_dataset(
+        tabela, diretorio_alertas, format='parquet', partitioning=PARTICIONAMENTO,
+        basename_template=f'lote-{execucao}-{numero:06d}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore'
+    )
+
+
+def mover_lotes(diretorio_execucao, diretorio_alertas):
+    """Move os arquivos de uma execução para as mesmas partições de `alertas/`"""
+    origem = Path(diretorio_execucao) / 'alertas'
+    for arquivo in sorted(origem.rglob('*.parquet')):
+        alvo = Path(diretorio_alertas) / arquivo.relative_to(origem)
+        alvo.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(arquivo, alvo)
+
+
+def recuperar_execucoes(destino):
+    """Trata as execuções interrompidas; retorna os ids das que foram publicadas
+
+    Sem `concluida.json`, a execução não chegou ao fim: os lotes são
+    descartados e, como o checkpoint não avançou, a próxima leitura os
+    encontra de novo. Com o marcador, termina a publicação; os agregados são
+    recalculados de todos os avisos, porque não se sabe se a soma da
+    execução chegou a ser gravada.
+    """
+    destino = Path(destino)
+    diretorio = destino / 'execucoes'
+    if not diretorio.exists():
+        return []
+    publicadas = []
+    for execucao in sorted(diretorio.iterdir()):
+        marcador = execucao / 'concluida.json'
+        if marcador.exists():
+            concluida = json.loads(marcador.read_text(encoding='utf-8'))
+            mover_lotes(execucao, destino / 'alertas')
+            reconstruir_agregados(destino)
+            checkpoint = carregar_checkpoint(destino)
+            if checkpoint is None or concluida['checkpoint']['ultima_data'] > checkpoint['ultima_data']:
+                gravar_checkpoint(destino, concluida['checkpoint'])
+            publicadas.append(execucao.name)
+        shutil.rmtree(execucao)
+    return publicadas
+
+
+def ingerir(fonte=FONTE_PADRAO, destino=DESTINO_PADRAO, tamanho_lote=50_000, reiniciar=False,
+            janela_dias=JANELA_ATRASO_DIAS):
+    """Ingere os avisos novos da fonte; retorna o número de avisos gravados"""
+    destino = Path(destino)
+    diretorio_alertas = destino / 'alertas'
+    if reiniciar and destino.exists():
+        shutil.rmtree(destino)
+    diretorio_alertas.mkdir(parents=True, exist_ok=True)
+    recuperar_execucoes(destino)
+
+    checkpoint = carregar_checkpoint(destino)
+    desde = inicio_releitura(checkpoint, janela_dias)
+    # `alertas/` não muda durante a execução: os lotes vão para o diretório dela
+    alertas = abrir_alertas(diretorio_alertas)
+    execucao = uuid.uuid4().hex[:8]
+    diretorio_execucao = destino / 'execucoes' / execucao
+    crs = crs_fonte(fonte)
+
+    gravados = 0
+    agregados = {}
+    try:
+        for numero, lote in enumerate(ler_lotes(fonte, tamanho_lote, desde)):
+            lote = normalizar_lote(lote)
+            novos = filtrar_novos(lote, fids_gravados(alertas, lote))
+            if novos.empty:
+                continue
+            gravar_lote(novos, diretorio_execucao / 'alertas', execucao, numero, crs)
+            checkpoint = atualizar_checkpoint(checkpoint, novos)
+            agregados = mesclar_agregados(agregados, agregar_alertas(novos))
+            gravados += len(novos)
+    except BaseException:
+        shutil.rmtree(diretorio_execucao, ignore_errors=True)
+        raise
+    if not gravados:
+        return 0
+
+    # A partir do marcador, a execução é publicada mesmo que este processo morra
+    marcador = diretorio_execucao / 'concluida.json'
+    temporario = marcador.with_suffix('.json.tmp')
+    temporario.write_text(json.dumps({'checkpoint': checkpoint}, ensure_ascii=False), encoding='utf-8')
+    os.replace(temporario, marcador)
+
+    mover_lotes(diretorio_execucao, diretorio_alertas)
+    gravar_agregados(destino, mesclar_agregados(carregar_agregados(destino), agregados))
+    gravar_checkpoint(destino, checkpoint)
+    shutil.rmtree(diretorio_execucao)
+    return gravados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('fonte', nargs='?', default=FONTE_PADRAO, help='shapefile ou CSV do DETER')
+    parser.add_argument('--destino', default=DESTINO_PADRAO)
+    parser.add_argument('--lote', type=int, default=50_000, help='avisos por lote')
+    parser.add_argument('--janela-dias', type=int, default=JANELA_ATRASO_DIAS,
+                        help='dias relidos antes do aviso mais recente já gravado (0: a fonte inteira)')
+    parser.add_argument('--reiniciar', action='store_true', help='descarta o checkpoint e os dados gravados')
+    parser.add_argument('--reconstruir-agregados', action='store_true',
+                        help='recalcula os agregados a partir dos avisos já gravados')
+    args = parser.parse_args()
+
+    if args.reconstruir_agregados:
+        agregados = reconstruir_agregados(args.destino)
+        print(f"Agregados reconstruídos: {', '.join(agregados) or 'nenhum aviso gravado'}")
+        return
+
+    gravados = ingerir(args.fonte, args.destino, args.lote, args.reiniciar, args.janela_dias)
+    print(f"{gravados} aviso(s) novo(s) gravado(s) em '{Path(args.destino) / 'alertas'}/'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Índice espacial dos avisos do DETER para consultas por região.
+
+Os avisos gravados por `get_data_amz.py` trazem a geometria em WKB e a
+caixa envolvente (`bbox`) de cada polígono. O índice é montado uma única vez
+por versão dos dados:
+
+- uma STRtree (shapely) sobre as caixas envolventes, lidas das colunas
+  `bbox` sem decodificar nenhum polígono;
+- os polígonos ficam em WKB (compactos) e só são decodificados para os
+  candidatos cuja caixa cruza a borda da região consultada: uma caixa
+  inteiramente dentro da região já garante a interseção;
+- os atributos (data, classe, UF, município, unidade de conservação, área)
+  ficam numa tabela com colunas categóricas, para os filtros.
+
+Uma consulta por caixa (`xmin, ymin, xmax, ymax`) ou por polígono (WKT ou
+GeoJSON) visita só os nós da árvore que cruzam a região, em vez de testar
+todos os polígonos.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from armazenamento import reduzir_inteiros
+
+COLUNAS_ATRIBUTOS = ['fid', 'view_date', 'classname', 'uf', 'municipality', 'geocodibge', 'uc', 'areamunkm']
+
+
+class ErroRegiao(ValueError):
+    """Região de consulta inválida (caixa, WKT ou GeoJSON)"""
+
+
+def ler_regiao(regiao):
+    """Geometria da região: caixa (xmin, ymin, xmax, ymax), texto WKT/GeoJSON ou geometria shapely"""
+    if regiao is None or isinstance(regiao, shapely.Geometry):
+        return regiao
+    if isinstance(regiao, str):
+        texto = regiao.strip()
+        try:
+            if texto.startswith('{'):
+                return shapely.from_geojson(texto)
+            if texto[:1].isalpha():
+                return shapely.from_wkt(texto)
+            regiao = [float(valor) for valor in texto.split(',')]
+        except (shapely.errors.GEOSException, ValueError) as erro:
+            raise ErroRegiao(f"Região inválida: {erro}") from None
+    if len(regiao) != 4:
+        raise ErroRegiao("A caixa deve ter 4 valores: xmin, ymin, xmax, ymax")
+    xmin, ymin, xmax, ymax = regiao
+    if xmin > xmax or ymin > ymax:
+        raise ErroRegiao(f"Caixa invertida: {tuple(regiao)}")
+    return shapely.box(xmin, ymin, xmax, ymax)
+
+
+class IndiceAlertas:
+    """Avisos do DETER com STRtree sobre as caixas envolventes e polígonos em WKB"""
+
+    def __init__(self, atributos, caixas, wkb):
+        """`atributos` (um aviso por linha), `caixas` (n × 4: xmin, ymin, xmax, ymax) e `wkb` (array de bytes)"""
+        self.atributos = atributos.reset_index(drop=True)
+        self.caixas = np.asarray(caixas, dtype='float64').reshape(-1, 4)
+        self.wkb = np.asarray(wkb, dtype=object)
+        self.arvore = shapely.STRtree(shapely.box(*self.caixas.T))
+        # Centro da caixa: posição do aviso no mapa (os polígonos têm poucos km)
+        self.lon = ((self.caixas[:, 0] + self.caixas[:, 2]) / 2).astype('float32')
+        self.lat = ((self.caixas[:, 1] + self.caixas[:, 3]) / 2).astype('float32')
+        self._datas = self.atributos['view_date'].to_numpy(dtype='datetime64[D]')
+
+    @classmethod
+    def de_dataset(cls, destino):
+        """Índice dos avisos gravados em `destino/alertas` (os avisos sem geometria ficam de fora)"""
+        # Só o índice lê o dataset; o dashboard não paga esta importação sem o mapa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        from get_data_amz import ESQUEMA_ALERTAS, PARTICIONAMENTO
+
+        diretorio = Path(destino) / 'alertas'
+        if not diretorio.exists():
+            return cls.vazio()
+        alertas = ds.dataset(diretorio, format='parquet', partitioning=PARTICIONAMENTO, schema=ESQUEMA_ALERTAS)
+        tabela = alertas.to_table(columns=[*COLUNAS_ATRIBUTOS, 'geometry', 'bbox'],
+                                  filter=pc.is_valid(pc.field('bbox')))
+        caixas = np.column_stack([tabela['bbox'].combine_chunks().field(coluna).to_numpy(zero_copy_only=False)
+                                  for coluna in ('xmin', 'ymin', 'xmax', 'ymax')]) if len(tabela) else np.empty((0, 4))
+        atributos = tabela.select(COLUNAS_ATRIBUTOS).to_pandas()
+        for coluna in ('classname', 'uf', 'municipality', 'uc'):
+            atributos[coluna] = atributos[coluna].astype('category')
+        atributos['view_date'] = pd.to_datetime(atributos['view_date'])
+        return cls(reduzir_inteiros(atributos), caixas, tabela['geometry'].to_numpy(zero_copy_only=False))
+
+    @classmethod
+    def vazio(cls):
+        """Índice sem avisos"""
+        return cls(pd.DataFrame({coluna: pd.Series(dtype='datetime64[ns]' if coluna == 'view_date' else object)
+                                 for coluna in COLUNAS_ATRIBUTOS}), np.empty((0, 4)), [])
+
+    def __len__(self):
+        return len(self.atributos)
+
+    @property
+    def extensao(self):
+        """Caixa que contém todos os avisos (xmin, ymin, xmax, ymax), ou None sem avisos"""
+        if not len(self):
+            return None
+        return (self.caixas[:, 0].min(), self.caixas[:, 1].min(), self.caixas[:, 2].max(), self.caixas[:, 3].max())
+
+    @property
+    def nbytes(self):
+        """Memória aproximada: atributos, caixas, centros e WKB (sem a árvore)"""
+        return (int(self.atributos.memory_usage(deep=True).sum()) + self.caixas.nbytes + self.lon.nbytes +
+                self.lat.nbytes + sum(len(valor) for valor in self.wkb if valor is not None))
+
+    def geometrias(self, indices):
+        """Polígonos (shapely) dos avisos nos índices dados"""
+        return shapely.from_wkb(self.wkb[indices])
+
+    def _codigos(self, coluna, valores, indices):
+        """Máscara dos `indices` cuja coluna categórica está em `valores` (comparando os códigos)"""
+        serie = self.atributos[coluna]
+        if not isinstance(serie.dtype, pd.CategoricalDtype):
+            return np.isin(serie.to_numpy(dtype=object)[indices], list(valores))
+        codigos = serie.cat.categories.get_indexer(list(valores))
+        return np.isin(serie.cat.codes.to_numpy()[indices], codigos[codigos >= 0])
+
+    def _filtrar(self, indices, inicio, fim, ufs, classes, municipios):
+        """Índices que passam nos filtros de atributos"""
+        mascara = np.ones(len(indices), dtype=bool)
+        if inicio is not None:
+            mascara &= self._datas[indices] >= np.datetime64(pd.Timestamp(inicio).date())
+        if fim is not None:
+            mascara &= self._datas[indices] <= np.datetime64(pd.Timestamp(fim).date())
+        if ufs:
+            mascara &= self._codigos('uf', ufs, indices)
+        if classes:
+            mascara &= self._codigos('classname', classes, indices)
+        if municipios:
+            geocodigos = [int(municipio) for municipio in municipios if str(municipio).isdigit()]
+            nomes = [municipio for municipio in municipios if not str(municipio).isdigit()]
+            mascara &= (np.isin(self.atributos['geocodibge'].to_numpy(dtype='float64', na_value=np.nan)[indices], geocodigos) |
+                        self._codigos('municipality', nomes, indices))
+        return indices[mascara]
+
+    def consultar(self, regiao=None, inicio=None, fim=None, ufs=None, classes=None, municipios=None):
+        """Índices (ordenados) dos avisos que intersectam `regiao` e passam nos filtros
+
+        `regiao` é uma caixa (xmin, ymin, xmax, ymax), um texto WKT/GeoJSON ou
+        uma geometria shapely; None consulta todos os avisos. `municipios`
+        aceita geocódigos do IBGE ou nomes.
+        """
+        regiao = ler_regiao(regiao)
+        if regiao is None:
+            return self._filtrar(np.arange(len(self)), inicio, fim, ufs, classes, municipios)
+
+        candidatos = np.sort(self.arvore.query(regiao))
+        candidatos = self._filtrar(candidatos, inicio, fim, ufs, classes, municipios)
+        if not len(candidatos):
+            return candidatos
+        # Caixa inteira dentro da região: interseção garantida, sem decodificar o polígono
+        shapely.prepare(regiao)
+        if shapely.equals(regiao, shapely.envelope(regiao)):
+            # Região retangular: basta comparar as coordenadas das caixas
+            xmin, ymin, xmax, ymax = regiao.bounds
+            caixas = self.caixas[candidatos]
+            dentro = ((caixas[:, 0] >= xmin) & (caixas[:, 1] >= ymin) &
+                      (caixas[:, 2] <= xmax) & (caixas[:, 3] <= ymax))
+        else:
+            dentro = shapely.covers(regiao, self.arvore.geometries[candidatos])
+        borda = candidatos[~dentro]
+        exatos = borda[shapely.intersects(regiao, self.geometrias(borda))]
+        return np.sort(np.concatenate([candidatos[dentro], exatos]))
+
+    def alertas(self, indices):
+        """Atributos e posição (centro da caixa) dos avisos nos índices dados"""
+        return self.atributos.iloc[indices].assign(lon=self.lon[indices], lat=self.lat[indices])
@@ -0,0 +1,253 @@
+"""Instrumentação de desempenho do dashboard.
+
+Registra quanto tempo (e quanta memória residente) cada etapa de um rerun
+consome: loaders, `process_*`, construção e serialização das figuras e envio
+ao navegador. Os spans são agrupados por execução (a página inteira ou um
+fragmento reexecutado) e os caches contam acertos e falhas.
+
+Desativada por padrão: os decoradores apenas verificam uma flag e chamam a
+função original. Ative no servidor com `DASHBOARD_INSTRUMENTACAO=1` (a URL
+não a liga); cada execução registra a sessão que a disparou
+(`identificar_sessao`), e o painel do dashboard (`?depuracao=1`) só mostra
+as execuções da própria sessão. As execuções podem ser gravadas em JSON lines
+(`DASHBOARD_INSTRUMENTACAO_JSONL=caminho`) e os totais são expostos no
+formato texto do Prometheus (`formatar_prometheus`, servido por
+`servidor.py` em `/metricas`).
+"""
+import functools
+import itertools
+import json
+import os
+import resource
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+VARIAVEL_ATIVACAO = 'DASHBOARD_INSTRUMENTACAO'
+VARIAVEL_JSONL = 'DASHBOARD_INSTRUMENTACAO_JSONL'
+
+_PAGINA_BYTES = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss_atual_mb():
+    """Memória residente do processo (MB); pico, onde a atual não está disponível"""
+    try:
+        with open('/proc/self/statm', 'rb') as statm:
+            return int(statm.read().split()[1]) * _PAGINA_BYTES / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _escapar_rotulo(valor):
+    """Valor de rótulo no formato texto do Prometheus"""
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Instrumentacao:
+    """Spans por execução, totais por etapa e contadores de cache"""
+
+    def __init__(self, ativo=False, caminho_jsonl=None, max_execucoes=200, identificar_sessao=None):
+        """`identificar_sessao()` devolve o identificador da sessão em execução (ou None)"""
+        self.ativo = ativo
+        self.caminho_jsonl = caminho_jsonl
+        self.identificar_sessao = identificar_sessao
+        self.execucoes = deque(maxlen=max_execucoes)
+        self.etapas = defaultdict(lambda: {'chamadas': 0, 'segundos': 0.0})
+        self.caches = defaultdict(lambda: {'acertos': 0, 'falhas': 0})
+        self._local = threading.local()
+        self._trava = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def _registrar(self, nome, inicio, segundos, rss_delta):
+        """Acumula um span nos totais e na execução em andamento da thread"""
+        with self._trava:
+            etapa = self.etapas[nome]
+            etapa['chamadas'] += 1
+            etapa['segundos'] += segundos
+        execucao = getattr(self._local, 'execucao', None)
+        if execucao is not None:
+            execucao['spans'].append({
+                'etapa': nome,
+                'nivel': self._local.nivel,
+                'inicio_s': round(inicio - execucao['_inicio'], 6),
+                'segundos': round(segundos, 6),
+                'rss_delta_mb': round(rss_delta, 3),
+            })
+
+    @contextmanager
+    def _span(self, nome):
+        self._local.nivel = getattr(self._local, 'nivel', 0) + 1
+        rss_inicio = rss_atual_mb()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            self._local.nivel -= 1
+            self._registrar(nome, inicio, segundos, rss_atual_mb() - rss_inicio)
+
+    def span(self, nome):
+        """Context manager que mede um trecho (sem custo se desativada)"""
+        return self._span(nome) if self.ativo else nullcontext()
+
+    @contextmanager
+    def _execucao(self, nome):
+        if getattr(self._local, 'execucao', None) is not None:
+            # Fragmento executado dentro da página: vira um span da execução atual
+            with self._span(nome):
+                yield
+            return
+
+        inicio = time.perf_counter()
+        self._local.execucao = execucao = {
+            'id': next(self._ids), 'nome': nome, 'horario': time.time(),
+            'sessao': self.identificar_sessao() if self.identificar_sessao else None,
+            'spans': [], 'caches': {}, '_inicio': inicio,
+        }
+        self._local.nivel = 0
+        try:
+            with self._span(nome):
+                yield
+        finally:
+            self._local.execucao = None
+            del execucao['_inicio']
+            execucao['segundos'] = round(time.perf_counter() - inicio, 6)
+            with self._trava:
+                self.execucoes.append(execucao)
+            if self.caminho_jsonl:
+                self._gravar_jsonl(execucao)
+
+    def medir(self, funcao):
+        """Decorador: cada chamada vira um span com o nome da função"""
+        nome = funcao.__name__
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            if not self.ativo:
+                return funcao(*args, **kwargs)
+            with self._span(nome):
+                return funcao(*args, **kwargs)
+        return medida
+
+    def medir_execucao(self, funcao):
+        """Decorador: cada chamada é uma execução (rerun) com o nome da função"""
+        nome = funcao.__name__
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            if not self.ativo:
+                return funcao(*args, **kwargs)
+            with self._execucao(nome):
+                return funcao(*args, **kwargs)
+        return medida
+
+    def medir_cache(self, cache):
+        """Decorador para funções com cache do Streamlit (`st.cache_data`, `st.cache_resource`)
+
+        Aplica `cache` à função e mede as duas camadas: a chamada (span com
+        o nome da função) e, quando o cache falha, o cálculo (span
+        `nome:calculo`), o que permite contar acertos e falhas.
+        """
+        def decorar(funcao):
+            nome = funcao.__name__
+
+            @functools.wraps(funcao)
+            def calculo(*args, **kwargs):
+                if not self.ativo:
+                    return funcao(*args, **kwargs)
+                self._local.calculos = getattr(self._local, 'calculos', 0) + 1
+                with self._span(f'{nome}:calculo'):
+                    return funcao(*args, **kwargs)
+
+            cacheada = cache(calculo)
+
+            @functools.wraps(funcao)
+            def medida(*args, **kwargs):
+                if not self.ativo:
+                    return cacheada(*args, **kwargs)
+                calculos = getattr(self._local, 'calculos', 0)
+                with self._span(nome):
+                    resultado = cacheada(*args, **kwargs)
+                self.contar_cache(nome, getattr(self._local, 'calculos', 0) == calculos)
+                return resultado
+
+            medida.clear = cacheada.clear
+            return medida
+        return decorar
+
+    def contar_cache(self, nome, acerto):
+        """Registra um acerto ou uma falha no cache `nome`"""
+        if not self.ativo:
+            return
+        campo = 'acertos' if acerto else 'falhas'
+        with self._trava:
+            self.caches[nome][campo] += 1
+        execucao = getattr(self._local, 'execucao', None)
+        if execucao is not None:
+            contadores = execucao['caches'].setdefault(nome, {'acertos': 0, 'falhas': 0})
+            contadores[campo] += 1
+
+    def execucoes_da_sessao(self, sessao):
+        """Execuções registradas de uma sessão, da mais antiga à mais recente"""
+        with self._trava:
+            return [execucao for execucao in self.execucoes if execucao['sessao'] == sessao]
+
+    @staticmethod
+    def totais(execucoes):
+        """Totais por etapa ({'chamadas', 'segundos'}) e contadores de cache de um conjunto de execuções"""
+        etapas = defaultdict(lambda: {'chamadas': 0, 'segundos': 0.0})
+        caches = defaultdict(lambda: {'acertos': 0, 'falhas': 0})
+        for execucao in execucoes:
+            for span in execucao['spans']:
+                etapas[span['etapa']]['chamadas'] += 1
+                etapas[span['etapa']]['segundos'] += span['segundos']
+            for nome, contadores in execucao['caches'].items():
+                caches[nome]['acertos'] += contadores['acertos']
+                caches[nome]['falhas'] += contadores['falhas']
+        return dict(etapas), dict(caches)
+
+    def _gravar_jsonl(self, execucao):
+        """Acrescenta uma execução ao arquivo JSON lines"""
+        linha = json.dumps(execucao, ensure_ascii=False)
+        with self._trava, open(self.caminho_jsonl, 'a', encoding='utf-8') as arquivo:
+            arquivo.write(linha + '\n')
+
+    def formatar_prometheus(self):
+        """Totais por etapa e contadores de cache no formato texto do Prometheus"""
+        with self._trava:
+            etapas = {nome: dict(valores) for nome, valores in self.etapas.items()}
+            caches = {nome: dict(valores) for nome, valores in self.caches.items()}
+
+        linhas = []
+        metricas = [
+            ('dashboard_etapa_segundos_total', 'Tempo acumulado em cada etapa instrumentada',
+             'etapa', etapas, 'segundos'),
+            ('dashboard_etapa_chamadas_total', 'Chamadas de cada etapa instrumentada',
+             'etapa', etapas, 'chamadas'),
+            ('dashboard_cache_acertos_total', 'Acertos de cada cache', 'cache', caches, 'acertos'),
+            ('dashboard_cache_falhas_total', 'Falhas de cada cache', 'cache', caches, 'falhas'),
+        ]
+        for metrica, descricao, rotulo, valores, campo in metricas:
+            linhas.append(f'# HELP {metrica} {descricao}')
+            linhas.append(f'# TYPE {metrica} counter')
+            for nome in sorted(valores):
+                linhas.append(f'{metrica}{{{rotulo}="{_escapar_rotulo(nome)}"}} {valores[nome][campo]}')
+        linhas.append('# HELP dashboard_rss_bytes Memória residente do processo')
+        linhas.append('# TYPE dashboard_rss_bytes gauge')
+        linhas.append(f'dashboard_rss_bytes {int(rss_atual_mb() * 2**20)}')
+        return '\n'.join(linhas) + '\n'
+
+    def limpar(self):
+        """Descarta execuções e zera os totais"""
+        with self._trava:
+            self.execucoes.clear()
+            self.etapas.clear()
+            self.caches.clear()
+
+
+# Instância compartilhada pelas sessões do processo
+INSTRUMENTACAO = Instrumentacao(
+    ativo=os.environ.get(VARIAVEL_ATIVACAO) == '1',
+    caminho_jsonl=os.environ.get(VARIAVEL_JSONL)
+)
@@ -0,0 +1,154 @@
+"""Matriz esparsa ano × município (ou ano × estado) das áreas desmatadas do PRODES.
+
+Na escala municipal (~800 municípios × 37+ anos) a maior parte das células é
+zero. A matriz guarda só os valores não nulos, ordenados por ano, num layout
+CSR em que as linhas são os anos: as posições do ano `i` em `colunas`
+(índice do município) e `valores` (km², float32) vão de `inicio_ano[i]` a
+`inicio_ano[i + 1]`. Assim:
+
+- uma janela de anos é uma fatia contígua dos arrays, sem máscara;
+- o filtro por estado usa a UF de cada coluna;
+- o ranking dos piores municípios soma a janela por coluna (`np.bincount`)
+  e ordena apenas os N maiores (`np.argpartition`), não todos.
+
+Só as colunas exibidas (o ranking da janela) viram uma matriz densa para o
+heatmap.
+"""
+import numpy as np
+import pandas as pd
+
+# Colunas da tabela municipal em `tratado/` (formato longo, só células não nulas)
+COLUNA_ANO = 'Ano'
+COLUNA_UF = 'UF'
+COLUNA_MUNICIPIO = 'Município'
+COLUNA_AREA = 'Área (km²)'
+
+# Colunas da tabela estadual que não são estados
+COLUNA_ANO_ESTADOS = 'Ano/Estados'
+COLUNA_TOTAL_ESTADOS = 'AMZ LEGAL'
+
+
+class MatrizProdes:
+    """Área desmatada por ano e município (ou estado) em formato esparso"""
+
+    def __init__(self, anos, ufs, nomes, areas, nivel='Município'):
+        """Monta a matriz a partir de registros (ano, UF, nome, área)
+
+        Registros repetidos para o mesmo ano e local são somados; áreas nulas
+        são descartadas. `nivel` ('Estado' ou 'Município') é usado nos títulos.
+        """
+        self.nivel = nivel
+        anos = np.asarray(anos, dtype='int64')
+        areas = np.asarray(areas, dtype='float64')
+        ufs = pd.Categorical(ufs)
+        nomes = pd.Categorical(nomes)
+
+        # Local = par (UF, nome): nomes de municípios só são únicos dentro da UF
+        chave_local = ufs.codes.astype('int64') * len(nomes.categories) + nomes.codes
+        locais, indice_local = np.unique(chave_local, return_inverse=True)
+        self.ufs = np.asarray(ufs.categories, dtype=object)[locais // len(nomes.categories)]
+        self.nomes = np.asarray(nomes.categories, dtype=object)[locais % len(nomes.categories)]
+        self.rotulos = np.array([nome if nome == uf else f'{nome} ({uf})'
+                                 for nome, uf in zip(self.nomes, self.ufs)], dtype=object)
+        self.lista_ufs = sorted(set(self.ufs))
+        self._codigo_uf = np.searchsorted(self.lista_ufs, self.ufs.astype(str))
+
+        self.anos = np.arange(anos.min(), anos.max() + 1) if len(anos) else np.array([], dtype='int64')
+        n_locais = len(locais)
+        chave = (anos - (self.anos[0] if len(anos) else 0)) * n_locais + indice_local
+        celulas, indice_celula = np.unique(chave, return_inverse=True)
+        soma = np.bincount(indice_celula, weights=areas, minlength=len(celulas))
+        nao_nulas = soma != 0
+
+        celulas = celulas[nao_nulas]
+        linhas = celulas // max(n_locais, 1)
+        self.colunas = (celulas % max(n_locais, 1)).astype('int32')
+        self.valores = soma[nao_nulas].astype('float32')
+        self.inicio_ano = np.searchsorted(linhas, np.arange(len(self.anos) + 1))
+
+    @classmethod
+    def de_tabela_municipios(cls, df):
+        """Matriz a partir da tabela municipal em formato longo"""
+        return cls(df[COLUNA_ANO], df[COLUNA_UF], df[COLUNA_MUNICIPIO], df[COLUNA_AREA], 'Município')
+
+    @classmethod
+    def de_tabela_estados(cls, prodes_data):
+        """Matriz ano × estado a partir da tabela de taxas por estado (sem a AMZ LEGAL)"""
+        estados = [coluna for coluna in prodes_data.columns
+                   if coluna not in (COLUNA_ANO_ESTADOS, COLUNA_TOTAL_ESTADOS)]
+        longa = prodes_data.melt(id_vars=COLUNA_ANO_ESTADOS, value_vars=estados,
+                                 var_name=COLUNA_UF, value_name=COLUNA_AREA)
+        return cls(longa[COLUNA_ANO_ESTADOS], longa[COLUNA_UF], longa[COLUNA_UF], longa[COLUNA_AREA], 'Estado')
+
+    @property
+    def n_locais(self):
+        return len(self.nomes)
+
+    @property
+    def densidade(self):
+        """Fração das células ano × local com área não nula"""
+        celulas = len(self.anos) * self.n_locais
+        return len(self.valores) / celulas if celulas else 0.0
+
+    @property
+    def nbytes(self):
+        """Memória dos arrays da matriz (sem os nomes)"""
+        return self.colunas.nbytes + self.valores.nbytes + self.inicio_ano.nbytes + self._codigo_uf.nbytes
+
+    def _linhas_janela(self, ano_inicio, ano_fim):
+        """Índices (início, fim) das linhas de uma janela de anos"""
+        if not len(self.anos):
+            return 0, 0
+        inicio = int(np.clip(ano_inicio - self.anos[0], 0, len(self.anos)))
+        fim = int(np.clip(ano_fim - self.anos[0] + 1, inicio, len(self.anos)))
+        return inicio, fim
+
+    def locais(self, ufs=None):
+        """Índices dos locais, opcionalmente só dos estados em `ufs`"""
+        if not ufs:
+            return np.arange(self.n_locais)
+        codigos = np.searchsorted(self.lista_ufs, [uf for uf in ufs if uf in self.lista_ufs])
+        return np.flatnonzero(np.isin(self._codigo_uf, codigos))
+
+    def totais(self, ano_inicio, ano_fim):
+        """Área total de cada local na janela de anos"""
+        inicio, fim = self._linhas_janela(ano_inicio, ano_fim)
+        a, b = self.inicio_ano[inicio], self.inicio_ano[fim]
+        return np.bincount(self.colunas[a:b], weights=self.valores[a:b], minlength=self.n_locais)
+
+    def _maiores(self, totais, ufs, n):
+        """Índices dos n locais (com área) de maior total, do maior para o menor"""
+        candidatos = self.locais(ufs)
+        candidatos = candidatos[totais[candidatos] > 0]
+        if len(candidatos) > n:
+            candidatos = candidatos[np.argpartition(-totais[candidatos], n - 1)[:n]]
+        return candidatos[np.argsort(-totais[candidatos], kind='stable')]
+
+    def indices_ranking(self, ano_inicio, ano_fim, ufs=None, n=15):
+        """Índices dos n locais com maior área na janela, do maior para o menor"""
+        return self._maiores(self.totais(ano_inicio, ano_fim), ufs, n)
+
+    def ranking(self, ano_inicio, ano_fim, ufs=None, n=15):
+        """Tabela dos n locais com maior área desmatada na janela"""
+        totais = self.totais(ano_inicio, ano_fim)
+        indices = self._maiores(totais, ufs, n)
+        return pd.DataFrame({
+            self.nivel: self.nomes[indices],
+            COLUNA_UF: self.ufs[indices],
+            COLUNA_AREA: totais[indices].round(2),
+        })
+
+    def matriz(self, ano_inicio, ano_fim, indices):
+        """DataFrame denso anos × locais escolhidos; só esses locais são densificados"""
+        inicio, fim = self._linhas_janela(ano_inicio, ano_fim)
+        a, b = self.inicio_ano[inicio], self.inicio_ano[fim]
+        posicao = np.full(self.n_locais, -1)
+        posicao[indices] = np.arange(len(indices))
+
+        colunas = posicao[self.colunas[a:b]]
+        linhas = np.repeat(np.arange(fim - inicio), np.diff(self.inicio_ano[inicio:fim + 1]))
+        escolhidas = colunas >= 0
+        densa = np.zeros((fim - inicio, len(indices)), dtype='float32')
+        densa[linhas[escolhidas], colunas[escolhidas]] = self.valores[a:b][escolhidas]
+        return pd.DataFrame(densa, index=pd.Index(self.anos[inicio:fim], name='Ano'),
+                            columns=self.rotulos[indices])
@@ -0,0 +1,108 @@
+"""Métricas de desempenho econômico e ambiental dos setores industriais.
+
+Funções puras (sem Streamlit) que cruzam a PIA-Empresa (receita e número de
+empresas por CNAE) com as emissões do SEEG, via um mapeamento CNAE → setor
+de emissão. Podem ser chamadas pelo dashboard, por scripts ou por outros
+serviços.
+"""
+import pandas as pd
+
+from armazenamento import COLUNA_CNAE, COLUNA_EMPRESAS, COLUNA_RECEITA
+
+# Setor de emissão do SEEG correspondente a cada atividade da CNAE
+MAPEAMENTO_CNAE_SEEG = {
+    'Extração de carvão mineral': 'Energia',
+    'Extração de petróleo e gás natural': 'Energia',
+    'Extração de minerais metálicos': 'Processos Industriais',
+    'Metalurgia': 'Processos Industriais'
+}
+
+
+def simplificar_nome_setor(nome):
+    """Nome curto de uma atividade da CNAE para rótulos de gráficos"""
+    return nome.replace('Extração de ', '').replace(' mineral', '').replace(' metálicos', '')
+
+
+def calcular_medias_emissoes(emissoes_long, anos):
+    """Emissão média por categoria do SEEG nos anos informados"""
+    emissoes = emissoes_long[emissoes_long['Ano'].isin(list(anos))]
+    return emissoes.groupby('Categoria', observed=True)['Emissoes'].mean()
+
+
+def atividades_sem_setor(industria, mapeamento=MAPEAMENTO_CNAE_SEEG):
+    """Atividades da CNAE presentes nos dados e ausentes do mapeamento, em ordem alfabética"""
+    atividades = {str(atividade) for atividade in industria[COLUNA_CNAE].unique()}
+    return sorted(atividades - set(mapeamento) - {'Total'})
+
+
+def calcular_metricas_setores(industria, emissoes_long, anos, mapeamento=MAPEAMENTO_CNAE_SEEG):
+    """Receita, empresas, eficiência e sustentabilidade de cada atividade da CNAE
+
+    Usa a média de cada atividade e de seu setor de emissão nos anos
+    informados. Atividades fora do mapeamento (ver `atividades_sem_setor`)
+    ou sem emissões correspondentes ficam de fora: não há emissão que se
+    possa atribuir a elas. Retorna um DataFrame com uma linha por atividade,
+    na ordem em que aparecem nos dados.
+    """
+    anos = list(anos)
+    industria = industria[
+        industria['Ano'].isin(anos) & (industria[COLUNA_CNAE] != 'Total')
+    ]
+
+    metricas = (
+        industria.groupby(COLUNA_CNAE, observed=True, sort=False)
+        .agg(Receita=(COLUNA_RECEITA, 'mean'), Empresas=(COLUNA_EMPRESAS, 'mean'))
+        .reset_index()
+        .rename(columns={COLUNA_CNAE: 'Atividade'})
+    )
+    metricas['Atividade'] = metricas['Atividade'].astype(str)
+    metricas['Setor_Emissao'] = metricas['Atividade'].map(mapeamento)
+
+    medias_emissoes = calcular_medias_emissoes(emissoes_long, anos)
+    metricas['Emissoes'] = metricas['Setor_Emissao'].map(medias_emissoes)
+    metricas = metricas.dropna(subset=['Emissoes']).reset_index(drop=True)
+
+    # Eficiência: receita por unidade de emissão; sustentabilidade: inverso das emissões
+    emissoes_mi = metricas['Emissoes'] / 1e6
+    positivas = metricas['Emissoes'] > 0
+    metricas['Eficiencia'] = (metricas['Receita'] / emissoes_mi).where(positivas, 0)
+    metricas['Sustentabilidade'] = (1000 / emissoes_mi).where(positivas, 0)
+
+    metricas['Setor'] = metricas['Atividade'].map(simplificar_nome_setor)
+    metricas['Receita'] = metricas['Receita'] / 1e6  # Em bilhões
+
+    return metricas[['Setor', 'Atividade', 'Setor_Emissao', 'Receita', 'Empresas',
+                     'Emissoes', 'Eficiencia', 'Sustentabilidade']]
+
+
+def calcular_eficiencia_anual(industria, totais_emissoes, tabela=None):
+    """Receita total, emissões totais e eficiência de cada ano
+
+    Cobre os anos presentes tanto em `industria` quanto em `totais_emissoes`
+    (Series indexada por ano). Se `tabela` (resultado de uma chamada anterior)
+    for informada, só as linhas da indústria de anos ainda ausentes nela são
+    agregadas; as emissões e a eficiência de todos os anos são atualizadas,
+    pois dependem apenas da série de totais.
+    """
+    anos_calculados = [] if tabela is None else list(tabela.index)
+    novas_linhas = industria[
+        industria['Ano'].isin(totais_emissoes.index) &
+        ~industria['Ano'].isin(anos_calculados)
+    ]
+    receitas = novas_linhas.groupby('Ano')[COLUNA_RECEITA].sum().rename('Receita')
+
+    if tabela is not None:
+        receitas = pd.concat([tabela['Receita'], receitas]).sort_index()
+
+    resultado = receitas.to_frame()
+    resultado['Emissoes'] = totais_emissoes.reindex(resultado.index).to_numpy()
+    resultado['Eficiencia'] = (
+        resultado['Receita'] / (resultado['Emissoes'] / 1e6)  # Ajustar escala
+    ).where(resultado['Emissoes'] > 0)
+    return resultado
+
+
+def consultar_eficiencia(tabela, anos):
+    """Série de eficiência dos anos pedidos (anos sem emissões são omitidos)"""
+    anos = sorted(set(anos) & set(tabela.index))
+    return tabela.loc[anos, 'Eficiencia'].dropna()
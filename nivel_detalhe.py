@@ -0,0 +1,100 @@
+"""Redução de resolução (nível de detalhe) das figuras do dashboard.
+
+O navegador não mostra mais células, pontos ou barras do que cabem na tela;
+enviar mais só aumenta o JSON da figura e o tempo de renderização. Estas
+funções puras reduzem os dados no servidor a um limite fixo, de modo que o
+tamanho da figura não cresce com os dados:
+
+- matrizes (heatmaps): anos agrupados em intervalos contíguos (média) e
+  colunas limitadas às de maior total, com as demais agregadas em "Outros";
+- séries de linha: mínimo e máximo de cada faixa de x, preservando picos;
+- séries temporais de barras: frequência (dia, semana, mês, trimestre, ano)
+  escolhida para que o período caiba no número máximo de barras.
+- mapas: no máximo MAX_PONTOS_MAPA avisos, os de maior área.
+
+Ao restringir o período (controles ou seleção com zoom), a mesma função
+devolve mais detalhe, pois o limite passa a cobrir um intervalo menor.
+"""
+import numpy as np
+import pandas as pd
+
+MAX_LINHAS_MATRIZ = 120
+MAX_COLUNAS_MATRIZ = 60
+MAX_PONTOS_SERIE = 1000
+MAX_BARRAS = 400
+MAX_PONTOS_MAPA = 5000
+
+# Frequências das séries de barras, da mais fina para a mais grossa
+FREQUENCIAS = [('D', 'Diária'), ('W', 'Semanal'), ('M', 'Mensal'), ('Q', 'Trimestral'), ('Y', 'Anual')]
+
+
+def limites_grupos(n, max_grupos):
+    """Início de cada grupo ao dividir n itens contíguos em até max_grupos grupos"""
+    tamanho = -(-n // max_grupos) if n > max_grupos else 1
+    return np.arange(0, n, tamanho)
+
+
+def reduzir_matriz(matriz, max_linhas=MAX_LINHAS_MATRIZ, max_colunas=MAX_COLUNAS_MATRIZ,
+                   rotulo_outros='Outros'):
+    """Matriz (índice ordenado × colunas) reduzida para caber em max_linhas × max_colunas
+
+    Linhas contíguas viram a média do intervalo, rotulado "início–fim".
+    Se houver colunas demais, ficam as de maior total e a média das demais
+    numa última coluna `rotulo_outros`. Matrizes que já cabem voltam como
+    estão.
+    """
+    if matriz.shape[1] > max_colunas:
+        totais = matriz.sum(axis=0).to_numpy()
+        mantidas = np.sort(np.argpartition(-totais, max_colunas - 2)[:max_colunas - 1])
+        restantes = np.setdiff1d(np.arange(matriz.shape[1]), mantidas)
+        outros = matriz.iloc[:, restantes].mean(axis=1).rename(f'{rotulo_outros} ({len(restantes)})')
+        matriz = pd.concat([matriz.iloc[:, mantidas], outros], axis=1)
+
+    if len(matriz) > max_linhas:
+        inicios = limites_grupos(len(matriz), max_linhas)
+        fins = np.append(inicios[1:], len(matriz)) - 1
+        valores = np.add.reduceat(matriz.to_numpy(dtype='float64'), inicios, axis=0)
+        valores /= (fins - inicios + 1)[:, np.newaxis]
+        indice = matriz.index.to_numpy()
+        rotulos = [str(indice[i]) if i == f else f'{indice[i]}–{indice[f]}' for i, f in zip(inicios, fins)]
+        matriz = pd.DataFrame(valores, index=pd.Index(rotulos, name=matriz.index.name),
+                              columns=matriz.columns)
+    return matriz
+
+
+def reduzir_serie(x, y, max_pontos=MAX_PONTOS_SERIE):
+    """Pontos (x, y) reduzidos a até max_pontos, mantendo mínimo e máximo de cada faixa
+
+    `x` deve estar ordenado. Séries que já cabem voltam como estão.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype='float64')
+    if len(x) <= max_pontos:
+        return x, y
+
+    inicios = limites_grupos(len(x), max_pontos // 2)
+    fins = np.append(inicios[1:], len(x))
+    selecionados = []
+    for inicio, fim in zip(inicios, fins):
+        faixa = y[inicio:fim]
+        if np.isnan(faixa).all():
+            selecionados.append(inicio)
+            continue
+        selecionados.extend(sorted({inicio + np.nanargmin(faixa), inicio + np.nanargmax(faixa)}))
+    selecionados = np.array(selecionados)
+    return x[selecionados], y[selecionados]
+
+
+def escolher_frequencia(inicio, fim, frequencia_minima='D', max_barras=MAX_BARRAS):
+    """Frequência mais fina (a partir de frequencia_minima) com até max_barras no período"""
+    codigos = [codigo for codigo, _ in FREQUENCIAS]
+    for codigo in codigos[codigos.index(frequencia_minima):]:
+        periodos = pd.period_range(pd.Timestamp(inicio), pd.Timestamp(fim), freq=codigo)
+        if len(periodos) <= max_barras:
+            return codigo
+    return codigos[-1]
+
+
+def nome_frequencia(codigo):
+    """Nome de exibição de uma frequência de FREQUENCIAS"""
+    return dict(FREQUENCIAS)[codigo]
@@ -0,0 +1,159 @@
+"""Recarga a quente dos arquivos de `tratado/`, sem reiniciar os workers.
+
+Os loaders do dashboard recebem a versão (hash do conteúdo) dos arquivos de
+que dependem como argumento (decorador `versionado`), de modo que ela entra
+na chave do `st.cache_data`/`st.cache_resource`; as tabelas derivadas e as
+figuras já usam `versao_dados` nas chaves. Trocar um CSV gera chaves novas
+apenas para os caches que dependem dele. Durante a execução do loader, a
+versão de cada arquivo fica fixa (`fixar_versoes`): `carregar_tabela` lê o
+artefato compilado dessa versão, nunca o CSV do disco se ele já for outro.
+
+Sem o monitor, a versão é lida do disco a cada chamada (`stat` e, se o
+arquivo mudou, o hash): a sessão que executar primeiro depois da troca faz a
+reconstrução. Com o `MonitorTratado` (iniciado por `servidor.py`), as
+sessões usam as versões publicadas por ele; ao detectar uma mudança, o
+monitor compila o Parquet da versão nova, reconstrói os caches com ela em
+segundo plano e só então a publica. As sessões continuam servidas pela
+versão anterior (e pelo artefato dela) até lá e nunca esperam pela
+reconstrução. Se ela falhar (um CSV inválido, por exemplo), a versão
+anterior é mantida e o arquivo é verificado de novo na próxima vez.
+
+Configuração:
+    DASHBOARD_RECARGA_SEGUNDOS=5   (intervalo entre verificações; 0 desativa)
+"""
+import functools
+import logging
+import os
+import threading
+import time
+
+from armazenamento import (DIRETORIO_TRATADO, ESQUEMAS, VERSOES_PUBLICADAS, compilar_tabela, fixar_versoes,
+                           hash_tratado, versao_dados, versao_fonte)
+
+VARIAVEL_INTERVALO = 'DASHBOARD_RECARGA_SEGUNDOS'
+INTERVALO_PADRAO = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+def versionado(*fontes):
+    """Decorador: passa a versão dos arquivos `fontes` como primeiro argumento
+
+    Aplicado sobre uma função com cache do Streamlit, faz a versão entrar na
+    chave sem alterar quem chama: `load_x()` passa a executar `load_x(versao)`.
+    """
+    def decorar(funcao):
+        @functools.wraps(funcao)
+        def versionada(*args, **kwargs):
+            with fixar_versoes({fonte: versao_fonte(fonte) for fonte in fontes}):
+                return funcao(versao_dados(*fontes), *args, **kwargs)
+        return versionada
+    return decorar
+
+
+def estado_arquivo(relativo):
+    """(mtime, tamanho) de um arquivo de `tratado/`, ou None se não existir"""
+    try:
+        estado = (DIRETORIO_TRATADO / relativo).stat()
+    except FileNotFoundError:
+        return None
+    return estado.st_mtime_ns, estado.st_size
+
+
+class MonitorTratado:
+    """Verifica periodicamente `tratado/` e publica as versões novas já reconstruídas"""
+
+    def __init__(self, reconstruir, intervalo=INTERVALO_PADRAO, relativos=None):
+        """`reconstruir(alterados)` preenche os caches; é executada com as versões novas fixadas"""
+        self.reconstruir = reconstruir
+        self.intervalo = intervalo
+        self.relativos = list(ESQUEMAS if relativos is None else relativos)
+        self.recargas = 0
+        self.falhas = 0
+        self._estados = {}
+        # Versões da última recarga que falhou: o erro só vai completo para o log uma vez
+        self._versoes_falha = None
+        self._parar = threading.Event()
+        self._thread = None
+
+    def publicar_atuais(self):
+        """Compila e publica a versão atual de todos os arquivos (na inicialização)"""
+        for relativo in self.relativos:
+            estado = estado_arquivo(relativo)
+            versao = hash_tratado(relativo)
+            if versao != 'ausente':
+                try:
+                    compilar_tabela(relativo, versao)
+                except Exception:
+                    logger.exception("Falha ao compilar %s", relativo)
+            self._estados[relativo] = estado
+            VERSOES_PUBLICADAS[relativo] = versao
+
+    def alterados(self):
+        """Versões novas dos arquivos cujo conteúdo difere do publicado: {relativo: (versão, estado)}
+
+        O hash só é calculado para arquivos cujo mtime ou tamanho mudou. O
+        estado só é registrado quando a versão nova é publicada, de modo que
+        uma recarga que falhou é tentada de novo.
+        """
+        novas = {}
+        for relativo in self.relativos:
+            estado = estado_arquivo(relativo)
+            if estado == self._estados.get(relativo):
+                continue
+            versao = hash_tratado(relativo)
+            if versao != VERSOES_PUBLICADAS.get(relativo):
+                novas[relativo] = (versao, estado)
+            else:
+                self._estados[relativo] = estado
+        return novas
+
+    def verificar(self):
+        """Uma verificação: reconstrói e publica os arquivos alterados; retorna-os"""
+        novas = self.alterados()
+        if not novas:
+            return []
+
+        inicio = time.perf_counter()
+        versoes = {relativo: versao for relativo, (versao, _) in novas.items()}
+        try:
+            for relativo, versao in versoes.items():
+                if versao != 'ausente':
+                    # Falha se o arquivo mudou de novo desde o hash (fica para a próxima verificação)
+                    compilar_tabela(relativo, versao)
+            with fixar_versoes(versoes):
+                self.reconstruir(sorted(novas))
+        except Exception:
+            self.falhas += 1
+            if versoes != self._versoes_falha:
+                logger.exception("Falha ao recarregar %s; mantida a versão anterior", sorted(novas))
+            self._versoes_falha = versoes
+            return []
+
+        VERSOES_PUBLICADAS.update(versoes)
+        self._estados.update({relativo: estado for relativo, (_, estado) in novas.items()})
+        self.recargas += 1
+        logger.warning("Dados recarregados em %.1fs: %s", time.perf_counter() - inicio, ', '.join(sorted(novas)))
+        return sorted(novas)
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            self.verificar()
+
+    def iniciar(self):
+        """Inicia a verificação periódica numa thread em segundo plano"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name='recarga-tratado', daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        """Interrompe a verificação periódica"""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def intervalo_do_ambiente():
+    """Intervalo configurado em DASHBOARD_RECARGA_SEGUNDOS (0 desativa o monitor)"""
+    return float(os.environ.get(VARIAVEL_INTERVALO, INTERVALO_PADRAO))
@@ -0,0 +1,299 @@
+"""Geração em lote dos gráficos do dashboard, sem navegador.
+
+Reutiliza os loaders e as funções `create_*` de `dashboard_ambiental.py` para
+renderizar todas as seções numa grade de parâmetros: cada ano de emissões,
+cada janela (início, fim) do heatmap de desmatamento, cada método de
+tendência, os avisos do DETER por ano, as correlações de cada tabela do SEEG
+com cada local, os dois anos do Censo Agropecuário e os anos da PIA. O mapa
+do DETER, que depende da região desenhada pelo usuário, fica de fora. As
+figuras são geradas em paralelo num pool de processos e gravadas como HTML,
+JSON e/ou PNG (PNG requer o `kaleido`).
+
+Saídas cujas entradas (parâmetros, versão dos dados e dos módulos do projeto)
+não mudaram desde a última execução são puladas, com base no manifesto
+gravado no diretório de saída.
+
+Uso:
+    python relatorio.py [--saida relatorio] [--formatos html json png]
+                        [--processos N] [--forcar]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent
+
+# Arquivos de `tratado/` de que cada função de gráfico depende
+ARQUIVOS_POR_FUNCAO = {
+    'create_treemap_setores_degradacao': 'emissoes',
+    'create_barras_agrupadas_eficiencia_ambiental': 'industria_emissoes',
+    'create_linha_eficiencia_ambiental': 'industria_emissoes',
+    'create_heatmap_desmatamento_regional': 'prodes',
+    'create_serie_tendencias': 'prodes',
+    'create_serie_alertas_deter': 'deter',
+    'create_ranking_municipios_deter': 'deter',
+    'create_violin_agricultura_familiar': 'agricultura',
+    'create_sunburst_agricultura_familiar': 'agricultura',
+    'create_heatmap_correlacoes': 'prodes_emissoes',
+}
+
+# Janela (anos) das séries de tendência, como no controle do dashboard
+JANELA_TENDENCIAS = 5
+
+NOME_MANIFESTO = 'manifesto.json'
+
+# Estado de cada processo do pool: módulo do dashboard e dados já carregados
+_dashboard = None
+_dados = None
+
+
+def importar_dashboard():
+    """Importa o dashboard fora do `streamlit run`, sem avisos de bare mode"""
+    import streamlit.logger
+    streamlit.logger.set_log_level('error')
+
+    os.chdir(RAIZ)
+    sys.path.insert(0, str(RAIZ))
+    import dashboard_ambiental
+    return dashboard_ambiental
+
+
+def carregar_dados(d):
+    """Argumentos de dados de cada função `create_*`
+
+    Quando os dados dependem dos parâmetros da tarefa, o valor é uma função
+    que recebe os parâmetros e retorna todos os argumentos da figura.
+    """
+    ag_2017, ag_2006 = d.load_agricultura_data()
+    combined_ag, _ = d.process_agricultura_data(ag_2017, ag_2006)
+    cubo_emissoes = d.load_cubo_emissoes()
+    industria_data = d.load_industria_data()
+    agregados_deter = carregar_deter(d)
+    return {
+        'create_treemap_setores_degradacao': (cubo_emissoes,),
+        'create_barras_agrupadas_eficiencia_ambiental': lambda selected_years: (
+            d.compute_metricas_industriais(industria_data, cubo_emissoes.long('brutas'), selected_years)[0],),
+        'create_linha_eficiencia_ambiental': (d.compute_eficiencia_anual(),),
+        'create_heatmap_desmatamento_regional': (d.load_matriz_prodes('Estado'),),
+        'create_serie_tendencias': (d.load_motor_tendencias('Estado'),),
+        'create_serie_alertas_deter': (agregados_deter.get('dia_uf_classe'),),
+        'create_ranking_municipios_deter': (agregados_deter.get('mes_municipio_classe'),),
+        'create_violin_agricultura_familiar': (combined_ag,),
+        'create_sunburst_agricultura_familiar': (combined_ag,),
+        'create_heatmap_correlacoes': (d.load_motor_correlacoes(),),
+    }
+
+
+def carregar_deter(d):
+    """Agregados do DETER, ou {} se a ingestão não foi feita (ou está incompleta)"""
+    agregados = d.load_deter_agregados(d.versao_arquivos(*d.ARQUIVOS_AGREGADOS_DETER))
+    return agregados if len(agregados) == len(d.CHAVES_AGREGADOS) else {}
+
+
+def versoes_dados(d):
+    """Versão dos arquivos de origem de cada grupo usado pelos gráficos"""
+    return {
+        'emissoes': d.versao_dados(*d.TABELAS_SEEG.values()),
+        'industria_emissoes': d.versao_dados(d.ARQUIVO_INDUSTRIA, *d.TABELAS_SEEG.values()),
+        'prodes': d.versao_dados(d.ARQUIVO_PRODES),
+        'deter': d.versao_arquivos(*d.ARQUIVOS_AGREGADOS_DETER),
+        'agricultura': d.versao_dados(d.ARQUIVO_AGRICULTURA_2017, d.ARQUIVO_AGRICULTURA_2006),
+        'prodes_emissoes': d.versao_dados(d.ARQUIVO_PRODES, *d.TABELAS_SEEG.values()),
+    }
+
+
+def listar_tarefas(d):
+    """Grade de (seção, nome do arquivo, função, parâmetros) a renderizar"""
+    cubo_emissoes = d.load_cubo_emissoes()
+    anos_industria = sorted(int(ano) for ano in d.load_industria_data()['Ano'].unique())
+    anos_desmat = sorted(int(ano) for ano in d.load_desmatamento_data()['Ano/Estados'].unique())
+
+    tarefas = []
+    for ano in cubo_emissoes.anos_disponiveis('brutas'):
+        tarefas.append(('1_emissoes', f'treemap_{ano}',
+                        'create_treemap_setores_degradacao', {'selected_year': ano}))
+
+    # Seções 2 e 3: seleção padrão do dashboard (últimos 3 anos), todos os anos e cada ano isolado
+    selecoes = {'padrao': anos_industria[-3:], 'todos': anos_industria}
+    selecoes.update({str(ano): [ano] for ano in anos_industria})
+    for nome, anos in selecoes.items():
+        tarefas.append(('2_setores', f'barras_{nome}',
+                        'create_barras_agrupadas_eficiencia_ambiental', {'selected_years': anos}))
+        tarefas.append(('3_eficiencia', f'eficiencia_{nome}',
+                        'create_linha_eficiencia_ambiental', {'selected_years': anos}))
+
+    for i, inicio in enumerate(anos_desmat):
+        for fim in anos_desmat[i:]:
+            tarefas.append(('4_desmatamento', f'heatmap_{inicio}_{fim}',
+                            'create_heatmap_desmatamento_regional',
+                            {'start_year': inicio, 'end_year': fim}))
+
+    # Tendências de todo o período: AMZ LEGAL e os estados juntos, em cada método
+    estados = [str(local) for local in d.load_motor_tendencias('Estado').locais if local != 'AMZ LEGAL']
+    for metodo in d.METODOS:
+        for nome, locais in (('amz', ['AMZ LEGAL']), ('estados', estados)):
+            tarefas.append(('4_desmatamento', f'tendencias_{metodo}_{nome}', 'create_serie_tendencias',
+                            {'metodo': metodo, 'janela': JANELA_TENDENCIAS, 'locais': locais,
+                             'start_year': anos_desmat[0], 'end_year': anos_desmat[-1]}))
+
+    # Avisos do DETER: todo o período e cada ano isolado
+    agregados_deter = carregar_deter(d)
+    if agregados_deter:
+        anos_deter = sorted(int(ano) for ano in agregados_deter['dia_uf_classe']['view_date'].dt.year.unique())
+        periodos = {'todos': (anos_deter[0], anos_deter[-1])}
+        periodos.update({str(ano): (ano, ano) for ano in anos_deter})
+        for nome, (inicio, fim) in periodos.items():
+            for dimensao in ('Classe', 'UF'):
+                tarefas.append(('4_deter', f'serie_{dimensao.lower()}_{nome}', 'create_serie_alertas_deter',
+                                {'granularidade': 'Mensal', 'dimensao': dimensao, 'ufs': [],
+                                 'start_year': inicio, 'end_year': fim}))
+            tarefas.append(('4_deter', f'municipios_{nome}', 'create_ranking_municipios_deter',
+                            {'ufs': [], 'start_year': inicio, 'end_year': fim}))
+
+    tarefas.append(('5_agricultura', 'violin', 'create_violin_agricultura_familiar', {}))
+    for ano in (2017, 2006):
+        tarefas.append(('5_agricultura', f'sunburst_{ano}',
+                        'create_sunburst_agricultura_familiar', {'ano': ano}))
+
+    # Correlações com as defasagens padrão: cada tabela do SEEG, local e medida
+    motor_correlacoes = d.load_motor_correlacoes()
+    defasagem_min, defasagem_max = d.DEFASAGENS_PADRAO
+    for tabela in d.TABELAS_SEEG:
+        for local in motor_correlacoes.locais:
+            for medida in d.MEDIDAS:
+                tarefas.append(('6_correlacoes', f'{tabela}_{local}_{medida}'.replace(' ', '_'),
+                                'create_heatmap_correlacoes',
+                                {'tabela': tabela, 'local': str(local), 'defasagem_min': defasagem_min,
+                                 'defasagem_max': defasagem_max, 'medida': medida}))
+    return tarefas
+
+
+def assinatura_tarefa(tarefa, versoes, versao_codigo, formatos):
+    """Hash das entradas de uma tarefa; se não mudar, a saída é reaproveitada"""
+    _, _, funcao, parametros = tarefa
+    conteudo = json.dumps(
+        [funcao, parametros, versoes[ARQUIVOS_POR_FUNCAO[funcao]], versao_codigo, sorted(formatos)],
+        sort_keys=True
+    )
+    return hashlib.sha256(conteudo.encode()).hexdigest()
+
+
+def _iniciar_processo():
+    """Inicializa um processo do pool carregando os dados uma única vez"""
+    global _dashboard, _dados
+    _dashboard = importar_dashboard()
+    _dados = carregar_dados(_dashboard)
+
+
+def renderizar_tarefa(tarefa, diretorio_saida, formatos):
+    """Renderiza uma tarefa nos formatos pedidos; retorna (chave, arquivos, segundos)"""
+    secao, nome, funcao, parametros = tarefa
+    inicio = time.perf_counter()
+
+    dados = _dados[funcao]
+    if callable(dados):
+        fig = getattr(_dashboard, funcao)(*dados(**parametros))
+    else:
+        fig = getattr(_dashboard, funcao)(*dados, **parametros)
+    arquivos = []
+    if fig is not None:
+        destino = Path(diretorio_saida) / secao
+        destino.mkdir(parents=True, exist_ok=True)
+        for formato in formatos:
+            caminho = destino / f'{nome}.{formato}'
+            if formato == 'html':
+                fig.write_html(caminho, include_plotlyjs='cdn')
+            elif formato == 'json':
+                caminho.write_text(fig.to_json(), encoding='utf-8')
+            elif formato == 'png':
+                fig.write_image(caminho)
+            arquivos.append(str(caminho.relative_to(diretorio_saida)))
+
+    return f'{secao}/{nome}', arquivos, time.perf_counter() - inicio
+
+
+def escrever_indice(diretorio_saida, manifesto):
+    """Página HTML com links para todas as saídas, agrupadas por seção"""
+    linhas = ['<html><head><meta charset="utf-8"><title>Relatório - Dashboard Ambiental</title></head><body>',
+              '<h1>🌍 Relatório do Dashboard Ambiental</h1>']
+    secao_atual = None
+    for chave in sorted(manifesto):
+        secao = chave.split('/')[0]
+        if secao != secao_atual:
+            if secao_atual is not None:
+                linhas.append('</ul>')
+            linhas.append(f'<h2>Seção {secao}</h2><ul>')
+            secao_atual = secao
+        links = ' | '.join(f'<a href="{arquivo}">{Path(arquivo).suffix[1:]}</a>'
+                           for arquivo in manifesto[chave]['arquivos'])
+        linhas.append(f'<li>{chave.split("/", 1)[1]}: {links}</li>')
+    if secao_atual is not None:
+        linhas.append('</ul>')
+    linhas.append('</body></html>')
+    (Path(diretorio_saida) / 'index.html').write_text('\n'.join(linhas), encoding='utf-8')
+
+
+def gerar_relatorio(diretorio_saida='relatorio', formatos=('html', 'json'), processos=None, forcar=False):
+    """Renderiza a grade completa; retorna (renderizadas, puladas)"""
+    diretorio_saida = Path(diretorio_saida).resolve()
+    diretorio_saida.mkdir(parents=True, exist_ok=True)
+    d = importar_dashboard()
+    from cache_compartilhado import versao_codigo
+
+    caminho_manifesto = diretorio_saida / NOME_MANIFESTO
+    manifesto = {}
+    if caminho_manifesto.exists() and not forcar:
+        manifesto = json.loads(caminho_manifesto.read_text(encoding='utf-8'))
+
+    versoes = versoes_dados(d)
+    codigo = versao_codigo()
+
+    pendentes = []
+    assinaturas = {}
+    for tarefa in listar_tarefas(d):
+        chave = f'{tarefa[0]}/{tarefa[1]}'
+        assinaturas[chave] = assinatura_tarefa(tarefa, versoes, codigo, formatos)
+        entrada = manifesto.get(chave)
+        if (entrada and entrada['assinatura'] == assinaturas[chave] and
+                all((diretorio_saida / arquivo).exists() for arquivo in entrada['arquivos'])):
+            continue
+        pendentes.append(tarefa)
+
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo) as pool:
+        resultados = pool.map(
+            renderizar_tarefa, pendentes,
+            [diretorio_saida] * len(pendentes), [tuple(formatos)] * len(pendentes),
+            chunksize=8
+        )
+        for chave, arquivos, segundos in resultados:
+            manifesto[chave] = {'assinatura': assinaturas[chave], 'arquivos': arquivos,
+                                'segundos': round(segundos, 4)}
+
+    # Remove do manifesto saídas que deixaram de fazer parte da grade
+    manifesto = {chave: entrada for chave, entrada in manifesto.items() if chave in assinaturas}
+    caminho_manifesto.write_text(json.dumps(manifesto, indent=2, ensure_ascii=False), encoding='utf-8')
+    escrever_indice(diretorio_saida, manifesto)
+    return len(pendentes), len(assinaturas) - len(pendentes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--saida', default='relatorio', help='diretório de saída')
+    parser.add_argument('--formatos', nargs='+', default=['html', 'json'], choices=['html', 'json', 'png'])
+    parser.add_argument('--processos', type=int, default=None, help='processos do pool (padrão: nº de CPUs)')
+    parser.add_argument('--forcar', action='store_true', help='renderiza tudo, ignorando o manifesto')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    renderizadas, puladas = gerar_relatorio(args.saida, args.formatos, args.processos, args.forcar)
+    print(f"✅ {renderizadas} saída(s) renderizada(s), {puladas} sem alterações "
+          f"em {time.perf_counter() - inicio:.1f}s → {Path(args.saida) / 'index.html'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -26,10 +26,18 @@ if [ ! -d "tratado" ]; then
     exit 1
 fi
 
+# Converter as planilhas do IBGE de 'dados_brutos' em CSVs de 'tratado' (apenas as alteradas)
+echo "Convertendo planilhas do IBGE..."
+python etl_planilhas.py
+
+# Compilar os CSVs de 'tratado' em Parquet (apenas o que mudou)
+echo "Compilando dados tratados..."
+python armazenamento.py
+
 echo "✅ Ambiente configurado com sucesso!"
 echo "🚀 Iniciando dashboard em http://localhost:8501"
 echo "📝 Para parar o dashboard, pressione Ctrl+C"
 echo ""
 
-# Executar o dashboard
-streamlit run dashboard_ambiental.py 
\ No newline at end of file
+# Executar o dashboard (servidor.py pré-aquece os caches ao iniciar)
+streamlit run servidor.py 
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""Servidor do dashboard com pré-aquecimento dos caches na inicialização.
+
+Sobe `dashboard_ambiental.py` como um `st.App` cujo lifespan, ao iniciar o
+servidor, carrega todos os dados e gera as figuras do estado inicial de cada
+seção (`preaquecer()`), em segundo plano. Assim a primeira sessão não paga a
+leitura dos dados nem a montagem dos gráficos.
+
+Os caches do Streamlit e o cache de figuras usam o módulo da função na chave;
+por isso o dashboard é executado como `__main__`, do mesmo modo que o
+Streamlit executa a página em cada sessão.
+
+Depois do pré-aquecimento, o lifespan inicia o monitor de `tratado/`
+(`recarga.py`): um CSV corrigido é recompilado e os caches que dependem dele
+são reconstruídos em segundo plano, sem reiniciar o servidor nem derrubar as
+sessões abertas.
+
+Também expõe os totais da instrumentação (`instrumentacao.py`) para o
+Prometheus em `/metricas`.
+
+Uso:
+    streamlit run servidor.py
+"""
+import asyncio
+import logging
+import runpy
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import streamlit as st
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from instrumentacao import INSTRUMENTACAO
+from recarga import MonitorTratado, intervalo_do_ambiente
+
+PAGINA = Path(__file__).resolve().parent / 'dashboard_ambiental.py'
+
+_LOGGER = logging.getLogger(__name__)
+
+# Logger do aviso emitido por comandos do Streamlit chamados fora de uma sessão
+LOGGER_CONTEXTO = 'streamlit.runtime.scriptrunner_utils.script_run_context'
+
+
+class FiltroThread(logging.Filter):
+    """Descarta os registros emitidos por uma thread"""
+
+    def __init__(self, thread):
+        super().__init__()
+        self.thread = thread
+
+    def filter(self, registro):
+        return registro.thread != self.thread
+
+
+def preaquecer_pagina(alterados=None):
+    """Carrega a página sem a interface e preenche os caches; retorna as figuras geradas
+
+    Com `alterados`, só as figuras que dependem desses arquivos de `tratado/`
+    (ver `preaquecer` no dashboard).
+    """
+    logger_contexto = logging.getLogger(LOGGER_CONTEXTO)
+    filtro = FiltroThread(threading.get_ident())
+    logger_contexto.addFilter(filtro)
+    try:
+        globais = runpy.run_path(str(PAGINA), run_name='__main__',
+                                 init_globals={'SOMENTE_CARREGAR': True})
+        return globais['preaquecer'](alterados)
+    finally:
+        logger_contexto.removeFilter(filtro)
+
+
+def recarregar(alterados):
+    """Reconstrói os caches do estado inicial após a troca de arquivos de `tratado/`
+
+    Só os dados e as figuras que dependem dos arquivos alterados são gerados
+    de novo; as demais seções nem são visitadas.
+    """
+    preaquecer_pagina(alterados)
+
+
+@asynccontextmanager
+async def preaquecimento(app):
+    """Dispara o pré-aquecimento e o monitor de `tratado/` sem atrasar o início do servidor"""
+    intervalo = intervalo_do_ambiente()
+    monitor = MonitorTratado(recarregar, intervalo) if intervalo > 0 else None
+
+    async def executar():
+        inicio = time.perf_counter()
+        try:
+            if monitor is not None:
+                await asyncio.to_thread(monitor.publicar_atuais)
+            figuras = await asyncio.to_thread(preaquecer_pagina)
+        except Exception:
+            _LOGGER.exception("Falha no pré-aquecimento dos caches")
+        else:
+            _LOGGER.warning("Caches pré-aquecidos: %d figura(s) em %.1fs",
+                            figuras, time.perf_counter() - inicio)
+        if monitor is not None:
+            monitor.iniciar()
+
+    tarefa = asyncio.create_task(executar())
+    yield
+    tarefa.cancel()
+    if monitor is not None:
+        monitor.parar()
+
+
+async def metricas(requisicao):
+    """Totais da instrumentação no formato texto do Prometheus"""
+    return PlainTextResponse(INSTRUMENTACAO.formatar_prometheus(),
+                             media_type='text/plain; version=0.0.4')
+
+
+app = st.App(PAGINA, lifespan=preaquecimento, routes=[Route('/metricas', metricas)])
@@ -0,0 +1,252 @@
+"""Tendências e anomalias das séries de desmatamento por local.
+
+O motor guarda as séries como uma matriz densa períodos × locais (anos ×
+estados do PRODES, anos × municípios da matriz municipal ou meses ×
+municípios dos agregados do DETER) e calcula cada estatística para todos
+os locais de uma vez, com operações vetoriais sobre a matriz:
+
+- média móvel, desvio padrão e z-score em janelas móveis vêm de somas
+  acumuladas (de x e de x²) ao longo dos períodos: a soma de cada janela é
+  uma subtração entre duas linhas, qualquer que seja o tamanho da janela.
+  Para o desvio padrão, x é antes centrado na média de cada local, e
+  variâncias abaixo do erro de arredondamento das somas contam como zero;
+- a variação anual compara cada período com o mesmo período do ano
+  anterior (defasagem de `periodos_por_ano`);
+- a tendência linear (mínimos quadrados) numa janela móvel usa também a
+  soma acumulada de t·x; numa janela explícita (início, fim), a inclinação,
+  o intercepto e o R² de todos os locais saem de um único produto matricial.
+
+Os resultados ficam guardados no motor por (método, janela), de modo que
+trocar de janela ou de método e voltar não recalcula nada.
+"""
+import numpy as np
+import pandas as pd
+
+from matriz_prodes import COLUNA_ANO_ESTADOS
+
+METODOS = {
+    'media_movel': 'Média móvel',
+    'variacao': 'Variação anual',
+    'variacao_percentual': 'Variação anual (%)',
+    'zscore': 'Anomalia (z-score)',
+    'tendencia': 'Tendência linear',
+}
+
+# |z| a partir do qual um período é marcado como anomalia
+LIMIAR_ANOMALIA = 2.0
+
+
+class MotorTendencias:
+    """Séries períodos × locais com estatísticas em janelas, calculadas para todos os locais"""
+
+    def __init__(self, periodos, locais, valores, periodos_por_ano=1):
+        """`valores` tem uma linha por período (em ordem, sem lacunas) e uma coluna por local"""
+        self.periodos = np.asarray(periodos)
+        self.locais = np.asarray(locais, dtype=object)
+        self.valores = np.asarray(valores, dtype='float64')
+        self.periodos_por_ano = periodos_por_ano
+        self._resultados = {}
+
+    @classmethod
+    def de_tabela_estados(cls, prodes_data):
+        """Motor anos × estados (com a AMZ LEGAL) a partir da tabela de taxas do PRODES"""
+        prodes_data = prodes_data.sort_values(COLUNA_ANO_ESTADOS)
+        locais = [coluna for coluna in prodes_data.columns if coluna != COLUNA_ANO_ESTADOS]
+        return cls(prodes_data[COLUNA_ANO_ESTADOS].to_numpy(), locais, prodes_data[locais].to_numpy())
+
+    @classmethod
+    def de_matriz_prodes(cls, matriz):
+        """Motor anos × locais a partir da matriz esparsa do PRODES (`MatrizProdes`)"""
+        densa = np.zeros((len(matriz.anos), matriz.n_locais))
+        linhas = np.repeat(np.arange(len(matriz.anos)), np.diff(matriz.inicio_ano))
+        densa[linhas, matriz.colunas] = matriz.valores
+        return cls(matriz.anos, matriz.rotulos, densa)
+
+    @classmethod
+    def de_agregados_mes(cls, agregados_mes, coluna='area_km2'):
+        """Motor meses × municípios a partir do agregado mensal do DETER (somando as classes)"""
+        meses = agregados_mes['mes'].to_numpy().astype('datetime64[M]')
+        periodos = np.arange(meses.min(), meses.max() + 1) if len(meses) else meses
+        # Locais pelos códigos (município, UF); os rótulos só são montados para os locais distintos
+        codigo_municipio, municipios = pd.factorize(agregados_mes['municipality'])
+        codigo_uf, ufs = pd.factorize(agregados_mes['uf'])
+        chaves, coluna_local = np.unique(codigo_municipio.astype('int64') * len(ufs) + codigo_uf,
+                                         return_inverse=True)
+        locais = np.array([f'{municipio} ({uf})' for municipio, uf in
+                           zip(np.asarray(municipios)[chaves // len(ufs)], np.asarray(ufs)[chaves % len(ufs)])],
+                          dtype=object)
+        linha = (meses - periodos[0]).astype('int64') if len(meses) else np.array([], dtype='int64')
+        densa = np.bincount(linha * len(locais) + coluna_local, weights=agregados_mes[coluna].to_numpy(),
+                            minlength=len(periodos) * len(locais)).reshape(len(periodos), len(locais))
+        return cls(periodos, locais, densa, periodos_por_ano=12)
+
+    @property
+    def nbytes(self):
+        """Memória da matriz e dos resultados guardados"""
+        return self.valores.nbytes + sum(resultado.nbytes for resultado in self._resultados.values()
+                                         if isinstance(resultado, np.ndarray))
+
+    def linha(self, periodo):
+        """Índice da linha de um período (o último período até `periodo`)"""
+        periodo = np.asarray(periodo).astype(self.periodos.dtype)
+        return int(np.clip(np.searchsorted(self.periodos, periodo, side='right') - 1, 0, len(self.periodos) - 1))
+
+    def _acumulada(self, termo, valores=None):
+        """Soma acumulada de `termo` (x, x² ou t·x) ao longo dos períodos, com uma linha de zeros no início
+
+        x são os `valores` (por padrão, os do motor).
+
+        Não fica guardada: custa uma passada sobre a matriz e ocuparia a
+        memória de mais uma matriz por termo.
+        """
+        valores = self.valores if valores is None else valores
+        acumulada = np.zeros((len(self.periodos) + 1, self.valores.shape[1]))
+        if termo == 'x':
+            np.cumsum(valores, axis=0, out=acumulada[1:])
+        elif termo == 'x2':
+            # Quadrados calculados direto na saída: sem uma matriz temporária
+            np.square(valores, out=acumulada[1:])
+            np.cumsum(acumulada[1:], axis=0, out=acumulada[1:])
+        else:
+            t = np.arange(len(self.periodos), dtype='float64')[:, np.newaxis]
+            np.cumsum(t * valores, axis=0, out=acumulada[1:])
+        return acumulada
+
+    def _soma_janela(self, termo, janela, incluir_atual=True, valores=None):
+        """Soma de `termo` na janela de `janela` períodos que termina em cada linha
+
+        Sem `incluir_atual`, a janela são os `janela` períodos anteriores à
+        linha. As primeiras linhas, sem períodos suficientes, ficam com NaN.
+        """
+        n = len(self.periodos)
+        deslocamento = 0 if incluir_atual else 1
+        primeira = janela - 1 + deslocamento
+        soma = np.empty(self.valores.shape)
+        soma[:primeira] = np.nan
+        if primeira >= n:
+            return soma
+        acumulada = self._acumulada(termo, valores)
+        np.subtract(acumulada[janela:n + 1 - deslocamento], acumulada[:n + 1 - deslocamento - janela],
+                    out=soma[primeira:])
+        return soma
+
+    def media_movel(self, janela):
+        """Média dos últimos `janela` períodos (incluindo o atual)"""
+        soma = self._soma_janela('x', janela)
+        soma /= janela
+        return soma
+
+    def variacao(self, percentual=False):
+        """Diferença (ou variação %) em relação ao mesmo período do ano anterior"""
+        defasagem = min(self.periodos_por_ano, len(self.periodos))
+        resultado = np.full(self.valores.shape, np.nan)
+        atual, anterior = self.valores[defasagem:], self.valores[:len(self.periodos) - defasagem]
+        if percentual:
+            np.divide(atual, anterior, out=resultado[defasagem:], where=anterior != 0)
+            resultado[defasagem:] -= 1
+            resultado[defasagem:] *= 100
+        else:
+            np.subtract(atual, anterior, out=resultado[defasagem:])
+        return resultado
+
+    def zscore(self, janela):
+        """Desvio de cada período em relação à média dos `janela` anteriores, em desvios padrão"""
+        # Com x centrado: sem isso, E[x²] - E[x]² de uma janela quase constante
+        # após valores altos cancela e sobra só o erro de arredondamento
+        centrados = self.valores - self.valores.mean(axis=0)
+        media = self._soma_janela('x', janela, incluir_atual=False, valores=centrados)
+        media /= janela
+        # Desvio padrão populacional: sqrt(E[x²] - E[x]²)
+        desvio = self._soma_janela('x2', janela, incluir_atual=False, valores=centrados)
+        desvio /= janela
+        desvio -= np.square(media)
+        # Erro da subtração de duas somas acumuladas de x²: abaixo dele a janela é constante
+        tolerancia = len(self.periodos) * np.finfo('float64').eps * np.einsum('ij,ij->j', centrados, centrados) / janela
+        constante = ~(desvio > tolerancia)
+        np.sqrt(desvio, out=desvio, where=~constante)
+        centrados -= media
+        z = np.full(self.valores.shape, np.nan)
+        np.divide(centrados, desvio, out=z, where=~constante)
+        return z
+
+    def tendencia(self, janela):
+        """Inclinação (por ano) da reta de mínimos quadrados nos últimos `janela` períodos"""
+        # Somas de t e t² na janela [fim - janela + 1, fim] de cada linha: dependem só da linha
+        fim = np.arange(len(self.periodos), dtype='float64')[:, np.newaxis]
+        inicio = fim - janela + 1
+        soma_t = janela * (inicio + fim) / 2
+        soma_t2 = (fim * (fim + 1) * (2 * fim + 1) - (inicio - 1) * inicio * (2 * inicio - 1)) / 6
+        # inclinação = (n·Σtx - Σt·Σx) / (n·Σt² - (Σt)²)
+        inclinacao = self._soma_janela('tx', janela)
+        inclinacao *= janela
+        soma = self._soma_janela('x', janela)
+        soma *= soma_t
+        inclinacao -= soma
+        inclinacao /= janela * soma_t2 - soma_t ** 2
+        inclinacao *= self.periodos_por_ano
+        return inclinacao
+
+    def calcular(self, metodo, janela=None):
+        """Matriz períodos × locais de um método de METODOS, guardada por (método, janela)"""
+        if metodo not in METODOS:
+            raise ValueError(f"Método desconhecido: {metodo} (disponíveis: {', '.join(METODOS)})")
+        chave = (metodo, janela)
+        if chave not in self._resultados:
+            if metodo == 'variacao':
+                resultado = self.variacao()
+            elif metodo == 'variacao_percentual':
+                resultado = self.variacao(percentual=True)
+            else:
+                if not janela or janela < 2:
+                    raise ValueError(f"'{metodo}' requer uma janela de ao menos 2 períodos")
+                resultado = getattr(self, metodo)(janela)
+            self._resultados[chave] = resultado
+        return self._resultados[chave]
+
+    def tendencia_periodo(self, inicio, fim):
+        """Reta de mínimos quadrados de cada local entre os períodos `inicio` e `fim`
+
+        Retorna um DataFrame com a inclinação (por ano), o intercepto (valor
+        ajustado no primeiro período) e o R² de cada local.
+        """
+        a, b = self.linha(inicio), self.linha(fim) + 1
+        chave = ('tendencia_periodo', a, b)
+        if chave not in self._resultados:
+            y = self.valores[a:b]
+            t = np.arange(b - a, dtype='float64')
+            t_centrado = t - t.mean()
+            y_centrado = y - y.mean(axis=0)
+            variancia_t = (t_centrado ** 2).sum()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                inclinacao = t_centrado @ y_centrado / variancia_t
+                r2 = (t_centrado @ y_centrado) ** 2 / (variancia_t * (y_centrado ** 2).sum(axis=0))
+            self._resultados[chave] = pd.DataFrame({
+                'Local': self.locais,
+                'Inclinação': inclinacao * self.periodos_por_ano,
+                'Intercepto': y.mean(axis=0) - inclinacao * t.mean(),
+                'R²': r2,
+            })
+        return self._resultados[chave]
+
+    def resumo(self, inicio, fim, janela):
+        """Situação de cada local no período `fim`, com a tendência entre `inicio` e `fim`"""
+        i = self.linha(fim)
+        z = self.calcular('zscore', janela)[i]
+        periodo = self.tendencia_periodo(inicio, fim)
+        return pd.DataFrame({
+            'Local': self.locais,
+            'Valor': self.valores[i],
+            'Média móvel': self.calcular('media_movel', janela)[i],
+            'Variação anual (%)': self.calcular('variacao_percentual')[i],
+            'z-score': z,
+            'Anomalia': np.abs(np.nan_to_num(z)) >= LIMIAR_ANOMALIA,
+            'Tendência (por ano)': periodo['Inclinação'].to_numpy(),
+            'R²': periodo['R²'].to_numpy(),
+        })
+
+    def serie(self, metodo, janela=None, locais=None):
+        """DataFrame períodos × locais de um método (opcionalmente só de alguns locais)"""
+        resultado = self.calcular(metodo, janela)
+        colunas = np.arange(len(self.locais)) if locais is None else np.flatnonzero(np.isin(self.locais, locais))
+        return pd.DataFrame(resultado[:, colunas], index=pd.Index(self.periodos, name='Período'),
+                            columns=self.locais[colunas])